@@ -0,0 +1,247 @@
+"""
+Agregados diarios por dimensión para los reportes filtrados del dashboard.
+
+Cada fila de DailyConcertStats/DailySongStats resume los conciertos de un día
+con el mismo artista, gira y ciudad. Los cambios estructurales (crear, mover o
+borrar un concierto, editar su setlist) recalculan las claves afectadas desde
+los contadores de Concert; el interés y las calificaciones, que son el camino
+caliente, se aplican como deltas atómicos igual que en analytics/rollups.py.
+`rebuild()` recalcula todo (lo llama rollups.rebuild()).
+
+Los filtros son los de ReportFilterForm: start/end (fechas del concierto),
+artist, tour, genre (del artista) y country (de la ciudad del concierto).
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Now, TruncDate
+from django.utils import timezone
+
+from conciertos.models import Concert, SetlistEntry
+from core import conditional
+from .models import DailyConcertStats, DailySongStats
+
+_ZERO_INCOME = Value(Decimal(0), output_field=DecimalField())
+
+
+# ----- mantenimiento -----
+def _key(day, artist_id, tour_id, city_id):
+    return {'day': day, 'artist_id': artist_id, 'tour_id': tour_id, 'city_id': city_id}
+
+
+def key_of(start_datetime, artist_id, tour_id, city_id):
+    """Clave del bucket de un concierto; el día es el de la zona horaria del proyecto."""
+    return (timezone.localdate(start_datetime), artist_id, tour_id, city_id)
+
+
+def keys_for(concert_ids):
+    rows = Concert.objects.filter(pk__in=concert_ids).values_list('start_datetime', 'artist_id', 'tour_id', 'venue__city_id')
+    return {key_of(*row) for row in rows}
+
+
+def _refresh_songs(key):
+    deleted, _ = DailySongStats.objects.filter(**key).delete()
+    songs = (
+        SetlistEntry.objects.filter(
+            concert__start_datetime__date=key['day'], concert__artist_id=key['artist_id'],
+            concert__tour_id=key['tour_id'], concert__venue__city_id=key['city_id'],
+        )
+        .values('song_id').annotate(n=Count('pk')).order_by()
+    )
+    created = DailySongStats.objects.bulk_create([DailySongStats(**key, song_id=r['song_id'], play_count=r['n']) for r in songs])
+    if deleted and not created:
+        # las filas nuevas mueven MAX(updated_at); sin ninguna hay que anotar el borrado
+        conditional.record_deletion(DailySongStats)
+
+
+def refresh(keys, concerts=True):
+    """Recalcula por completo las filas de `keys` desde Concert y SetlistEntry.
+
+    Con concerts=False solo se recalculan las canciones (cambios de setlist):
+    las filas de DailyConcertStats no se tocan y su versión no cambia.
+    """
+    for day, artist_id, tour_id, city_id in set(keys):
+        if artist_id is None or city_id is None:
+            continue
+        key = _key(day, artist_id, tour_id, city_id)
+        if not concerts:
+            _refresh_songs(key)
+            continue
+        totals = Concert.objects.filter(
+            start_datetime__date=day, artist_id=artist_id, tour_id=tour_id, venue__city_id=city_id,
+        ).aggregate(
+            concert_count=Count('pk'),
+            total_income=Coalesce(Sum('total_income'), _ZERO_INCOME),
+            rating_sum=Coalesce(Sum('rating_sum'), 0),
+            rating_count=Coalesce(Sum('rating_count'), 0),
+            interest_count=Coalesce(Sum('interest_count'), 0),
+        )
+        deleted, _ = DailyConcertStats.objects.filter(**key).delete()
+        if not totals['concert_count']:
+            DailySongStats.objects.filter(**key).delete()
+            if deleted:
+                # MAX(updated_at) no ve que la fila desapareció
+                conditional.record_deletion(DailyConcertStats)
+                conditional.record_deletion(DailySongStats)
+            continue
+        DailyConcertStats.objects.create(**key, **totals)
+        _refresh_songs(key)
+
+
+def refresh_concerts(concert_ids, concerts=True):
+    refresh(keys_for(concert_ids), concerts=concerts)
+
+
+def _bump(concert_id, **deltas):
+    deltas = {field: d for field, d in deltas.items() if d}
+    if not deltas:
+        return
+    for key in keys_for([concert_id]):
+        # si el bucket aún no existe (datos sin reconstruir) no se crea aquí: lo hará rebuild()
+        DailyConcertStats.objects.filter(**_key(*key)).update(
+            updated_at=Now(), **{field: F(field) + d for field, d in deltas.items()}
+        )
+
+
+def record_interest(concert_id, delta=1):
+    _bump(concert_id, interest_count=delta)
+
+
+def record_rating(concert_id, old_rating, new_rating):
+    _bump(
+        concert_id,
+        rating_sum=(new_rating or 0) - (old_rating or 0),
+        rating_count=(new_rating is not None) - (old_rating is not None),
+    )
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Vacía y vuelve a calcular los buckets diarios."""
+    DailyConcertStats.objects.all().delete()
+    DailySongStats.objects.all().delete()
+    conditional.record_deletion(DailyConcertStats)
+    conditional.record_deletion(DailySongStats)
+    concerts = (
+        Concert.objects.annotate(day=TruncDate('start_datetime'))
+        .values('day', 'artist_id', 'tour_id', city_id=F('venue__city_id'))
+        .annotate(
+            concert_count=Count('pk'),
+            total_income=Coalesce(Sum('total_income'), _ZERO_INCOME),
+            rating_sum=Coalesce(Sum('rating_sum'), 0),
+            rating_count=Coalesce(Sum('rating_count'), 0),
+            interest_count=Coalesce(Sum('interest_count'), 0),
+        )
+        .order_by()
+    )
+    DailyConcertStats.objects.bulk_create([DailyConcertStats(**row) for row in concerts], batch_size=batch_size)
+    songs = (
+        SetlistEntry.objects.annotate(day=TruncDate('concert__start_datetime'))
+        .values(
+            'day', 'song_id', artist_id=F('concert__artist_id'), tour_id=F('concert__tour_id'),
+            city_id=F('concert__venue__city_id'),
+        )
+        .annotate(play_count=Count('pk'))
+        .order_by()
+    )
+    DailySongStats.objects.bulk_create([DailySongStats(**row) for row in songs], batch_size=batch_size)
+    return {'DailyConcertStats': len(concerts), 'DailySongStats': len(songs)}
+
+
+# ----- lecturas filtradas -----
+def bucket_filter(filters):
+    """Q sobre los buckets para un dict de filtros normalizado (ver ReportFilterForm)."""
+    q = Q()
+    if filters.get('start'):
+        q &= Q(day__gte=filters['start'])
+    if filters.get('end'):
+        q &= Q(day__lte=filters['end'])
+    if filters.get('artist'):
+        q &= Q(artist_id=filters['artist'])
+    if filters.get('tour'):
+        q &= Q(tour_id=filters['tour'])
+    if filters.get('genre'):
+        q &= Q(artist__genre__iexact=filters['genre'])
+    if filters.get('country'):
+        q &= Q(city__country__iexact=filters['country'])
+    return q
+
+
+def concert_filter(filters):
+    """Los mismos filtros sobre Concert, con el rango de fechas como rango de datetimes (usa índices)."""
+    q = Q()
+    if filters.get('start'):
+        q &= Q(start_datetime__gte=timezone.make_aware(datetime.datetime.combine(filters['start'], datetime.time.min)))
+    if filters.get('end'):
+        end = filters['end'] + datetime.timedelta(days=1)
+        q &= Q(start_datetime__lt=timezone.make_aware(datetime.datetime.combine(end, datetime.time.min)))
+    if filters.get('artist'):
+        q &= Q(artist_id=filters['artist'])
+    if filters.get('tour'):
+        q &= Q(tour_id=filters['tour'])
+    if filters.get('genre'):
+        q &= Q(artist__genre__iexact=filters['genre'])
+    if filters.get('country'):
+        q &= Q(venue__city__country__iexact=filters['country'])
+    return q
+
+
+def top_songs(filters, limit=10):
+    return (
+        DailySongStats.objects.filter(bucket_filter(filters))
+        .values('song_id', 'song__title')
+        .annotate(play_count=Sum('play_count'))
+        .filter(play_count__gt=0)
+        .order_by('-play_count', 'song_id')[:limit]
+    )
+
+
+def top_cities(filters, limit=10):
+    return (
+        DailyConcertStats.objects.filter(bucket_filter(filters))
+        .values('city_id', 'city__name', 'city__country')
+        .annotate(concert_count=Sum('concert_count'))
+        .filter(concert_count__gt=0)
+        .order_by('-concert_count', 'city_id')[:limit]
+    )
+
+
+def _by_artist(filters):
+    return DailyConcertStats.objects.filter(bucket_filter(filters)).values('artist_id', 'artist__name')
+
+
+def top_artists_by_concerts(filters, limit=10):
+    return (
+        _by_artist(filters).annotate(concert_count=Sum('concert_count'))
+        .filter(concert_count__gt=0)
+        .order_by('-concert_count', 'artist_id')[:limit]
+    )
+
+
+def top_artists_by_rating(filters, limit=10):
+    return (
+        _by_artist(filters)
+        .annotate(rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'))
+        .filter(rating_count__gt=0)
+        .annotate(avg_rating=Cast(F('rating_sum'), FloatField()) / F('rating_count'))
+        .order_by('-avg_rating', 'artist_id')[:limit]
+    )
+
+
+def top_artists_by_income(filters, limit=10):
+    return (
+        _by_artist(filters).annotate(concert_count=Sum('concert_count'), total_income=Sum('total_income'))
+        .filter(concert_count__gt=0)
+        .order_by('-total_income', 'artist_id')[:limit]
+    )
+
+
+def top_expected_concerts(filters, limit=10):
+    # ranking por concierto: no cabe en un bucket diario, pero Concert ya guarda interest_count
+    return (
+        Concert.objects.filter(concert_filter(filters), interest_count__gt=0)
+        .select_related('artist', 'venue__city')
+        .order_by('-interest_count', 'pk')[:limit]
+    )
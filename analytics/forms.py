@@ -0,0 +1,52 @@
+from django import forms
+
+from conciertos.models import Tour
+from core import fanout
+from core.models import Artist, City
+
+INPUT_CLASS = 'form-input h-10 w-full rounded-lg bg-[#232f48] px-3 text-white text-sm'
+
+
+class ReportFilterForm(forms.Form):
+    """Filtros (slicers) de los reportes de analytics, leídos de la querystring.
+
+    Validar no consulta la base de datos; las opciones de los selects se cargan
+    solo al pintar el formulario (`load_choices`).
+    """
+    start = forms.DateField(label='Desde', required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': INPUT_CLASS}))
+    end = forms.DateField(label='Hasta', required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': INPUT_CLASS}))
+    artist = forms.IntegerField(label='Artista', required=False, min_value=1, widget=forms.Select(attrs={'class': INPUT_CLASS}))
+    tour = forms.IntegerField(label='Gira', required=False, min_value=1, widget=forms.Select(attrs={'class': INPUT_CLASS}))
+    genre = forms.CharField(label='Género', required=False, max_length=120, widget=forms.Select(attrs={'class': INPUT_CLASS}))
+    country = forms.CharField(label='País', required=False, max_length=120, widget=forms.Select(attrs={'class': INPUT_CLASS}))
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get('start'), cleaned.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError('La fecha inicial debe ser anterior a la final.')
+        return cleaned
+
+    def normalized(self):
+        """Filtros activos como tupla ordenada: misma clave de caché para la misma consulta."""
+        items = []
+        for name, value in self.cleaned_data.items():
+            if value in (None, ''):
+                continue
+            if isinstance(value, str):
+                # los filtros de texto se comparan sin distinguir mayúsculas
+                value = value.strip().lower()
+            items.append((name, value))
+        return tuple(sorted(items))
+
+    def load_choices(self):
+        # cuatro consultas independientes: en paralelo (core/fanout.py); la que venza queda solo con "Todos"
+        options = fanout.run({
+            'artist': lambda: list(Artist.objects.order_by('name').values_list('id', 'name')),
+            'tour': lambda: list(Tour.objects.order_by('name').values_list('id', 'name')),
+            'genre': lambda: [(g, g) for g in Artist.objects.order_by('genre').values_list('genre', flat=True).distinct()],
+            'country': lambda: [(c, c) for c in City.objects.order_by('country').values_list('country', flat=True).distinct()],
+        }, defaults=dict.fromkeys(('artist', 'tour', 'genre', 'country'), []))
+        for name, choices in options.items():
+            self.fields[name].widget.choices = [('', 'Todos')] + choices
+        return self
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero las tablas de agregados del dashboard de analytics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo compara los agregados guardados con los reales, sin modificarlos.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = rollups.check_consistency()
+            for model, pk, field, have, want in mismatches[:50]:
+                self.stdout.write(f'{model}[{pk}].{field}: guardado={have} real={want}')
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} diferencias encontradas; ejecute rebuild_rollups.')
+            self.stdout.write(self.style.SUCCESS('Los agregados coinciden con las tablas fuente.'))
+            return
+
+        totals = rollups.rebuild()
+        for name, count in totals.items():
+            self.stdout.write(f'{name}: {count} filas')
+        self.stdout.write(self.style.SUCCESS('Agregados recalculados.'))
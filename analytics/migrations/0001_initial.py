@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('conciertos', '0005_alter_concert_total_income_alter_tour_total_income'),
+        ('core', '0002_alter_artist_debut_year_alter_artist_genre'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtistStats',
+            fields=[
+                ('artist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.artist')),
+                ('concert_count', models.PositiveIntegerField(default=0)),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('avg_rating', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-concert_count'], name='artiststats_concert_count_idx'), models.Index(fields=['-total_income'], name='artiststats_income_idx'), models.Index(fields=['-avg_rating'], name='artiststats_avg_rating_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CityConcertStats',
+            fields=[
+                ('city', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='concert_stats', serialize=False, to='core.city')),
+                ('concert_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-concert_count'], name='citystats_concert_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ConcertInterestStats',
+            fields=[
+                ('concert', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='interest_stats', serialize=False, to='conciertos.concert')),
+                ('interest_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-interest_count'], name='concertstats_interest_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SongPlayStats',
+            fields=[
+                ('song', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='play_stats', serialize=False, to='conciertos.song')),
+                ('play_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-play_count'], name='songstats_play_count_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_version_stamps'),
+        ('conciertos', '0010_version_stamps'),
+        ('core', '0003_version_stamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyConcertStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('concert_count', models.PositiveIntegerField(default=0)),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('interest_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.artist')),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.city')),
+                ('tour', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='conciertos.tour')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'artist', 'tour', 'city'), name='dailyconcertstats_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySongStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('play_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.artist')),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.city')),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='conciertos.song')),
+                ('tour', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='conciertos.tour')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'artist', 'tour', 'city', 'song'), name='dailysongstats_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_daily_buckets'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ConcertInterestStats',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:36
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_buckets(apps, schema_editor):
+    # con tour NULL la restricción anterior admitía filas repetidas de la misma clave;
+    # cada una es un recálculo completo, así que basta conservar la primera
+    for model_name, fields in (
+        ('DailyConcertStats', ('day', 'artist', 'tour', 'city')),
+        ('DailySongStats', ('day', 'artist', 'tour', 'city', 'song')),
+    ):
+        model = apps.get_model('analytics', model_name)
+        duplicates = (
+            model.objects.filter(tour__isnull=True).values(*fields)
+            .annotate(n=Count('pk'), keep=Min('pk')).filter(n__gt=1).order_by()
+        )
+        for row in duplicates:
+            key = {field: row[field] for field in fields}
+            model.objects.filter(**key).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_drop_concert_interest_stats'),
+        ('conciertos', '0011_concert_interest_index'),
+        ('core', '0004_row_counts'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailyconcertstats',
+            name='dailyconcertstats_key',
+        ),
+        migrations.RemoveConstraint(
+            model_name='dailysongstats',
+            name='dailysongstats_key',
+        ),
+        migrations.RunPython(drop_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyconcertstats',
+            constraint=models.UniqueConstraint(fields=('day', 'artist', 'tour', 'city'), name='dailyconcertstats_key', nulls_distinct=False),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysongstats',
+            constraint=models.UniqueConstraint(fields=('day', 'artist', 'tour', 'city', 'song'), name='dailysongstats_key', nulls_distinct=False),
+        ),
+    ]
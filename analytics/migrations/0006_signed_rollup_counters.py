@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_buckets_nulls_not_distinct'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='artiststats',
+            name='concert_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='artiststats',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='artiststats',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='cityconcertstats',
+            name='concert_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='dailyconcertstats',
+            name='concert_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='dailyconcertstats',
+            name='interest_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='dailyconcertstats',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='dailyconcertstats',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='dailysongstats',
+            name='play_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='songplaystats',
+            name='play_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
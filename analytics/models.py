@@ -1,3 +1,109 @@
 from django.db import models
+from core.models import Artist, City
+from conciertos.models import Concert, Song, Tour
 
-# Create your models here.
+# Tablas de agregados (rollups) que alimentan el dashboard de analytics.
+# Se mantienen de forma incremental desde analytics/signals.py y se pueden
+# recalcular por completo con `python manage.py rebuild_rollups`.
+# Cada fila usa como clave primaria el objeto agregado, así que la lectura del
+# top 10 es un recorrido corto por un índice ordenado en lugar de un GROUP BY.
+# Los contadores son IntegerField con signo: los deltas negativos de un borrado
+# sobre un agregado desajustado (p. ej. filas creadas con bulk_create sin los
+# signals) no deben hacer fallar la escritura del usuario; el desajuste lo
+# informa `rebuild_rollups --check`.
+
+class SongPlayStats(models.Model):
+    song = models.OneToOneField(Song, on_delete=models.CASCADE, primary_key=True, related_name='play_stats')
+    play_count = models.IntegerField(default=0)
+    # los deltas de rollups._bump lo actualizan en el mismo UPDATE (ver core/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['-play_count'], name='songstats_play_count_idx')]
+
+    def __str__(self):
+        return f"{self.song_id}: {self.play_count}"
+
+
+class CityConcertStats(models.Model):
+    city = models.OneToOneField(City, on_delete=models.CASCADE, primary_key=True, related_name='concert_stats')
+    concert_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['-concert_count'], name='citystats_concert_count_idx')]
+
+    def __str__(self):
+        return f"{self.city_id}: {self.concert_count}"
+
+
+class ArtistStats(models.Model):
+    """Conciertos, ingresos y calificaciones acumuladas por artista."""
+    artist = models.OneToOneField(Artist, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    concert_count = models.IntegerField(default=0)
+    total_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    # rating_sum / rating_count, guardado para poder ordenar por índice
+    avg_rating = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-concert_count'], name='artiststats_concert_count_idx'),
+            models.Index(fields=['-total_income'], name='artiststats_income_idx'),
+            models.Index(fields=['-avg_rating'], name='artiststats_avg_rating_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.artist_id}: {self.concert_count}"
+
+
+# Agregados diarios para los reportes filtrados (analytics/buckets.py). La clave
+# es (día, artista, gira, ciudad): los filtros de género y país salen del artista
+# y la ciudad, y un rango de fechas se responde sumando filas de esta tabla en
+# lugar de recorrer conciertos, asistencias e intereses.
+
+class DailyConcertStats(models.Model):
+    day = models.DateField()
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='+')
+    tour = models.ForeignKey(Tour, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='+')
+    concert_count = models.IntegerField(default=0)
+    total_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    interest_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # su índice (day primero) sirve también para los rangos de fechas; los conciertos
+            # sin gira (tour NULL) comparten un solo bucket (NULLS NOT DISTINCT, PostgreSQL 15+)
+            models.UniqueConstraint(
+                fields=['day', 'artist', 'tour', 'city'], name='dailyconcertstats_key', nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.artist_id}/{self.tour_id}/{self.city_id}: {self.concert_count}"
+
+
+class DailySongStats(models.Model):
+    day = models.DateField()
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='+')
+    tour = models.ForeignKey(Tour, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='+')
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='+')
+    play_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'artist', 'tour', 'city', 'song'], name='dailysongstats_key', nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.song_id}: {self.play_count}"
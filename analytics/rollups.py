@@ -0,0 +1,227 @@
+"""
+Mantenimiento de las tablas de agregados de analytics.
+
+Las funciones `record_*` aplican deltas atómicos (UPDATE ... SET x = x + d) y
+son las que llaman los signals de analytics/signals.py. Los caminos que
+escriben sin signals (bulk_create, queryset.update) deben llamarlas a mano o
+ejecutar `rebuild()` al terminar.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Sum, Value, DecimalField
+from django.db.models.functions import Cast, Coalesce, Now
+
+from conciertos.models import Concert, SetlistEntry
+from core import conditional
+from fans.models import Attendance
+from . import buckets
+from .models import ArtistStats, CityConcertStats, SongPlayStats
+
+
+def _bump(model, pk, **deltas):
+    """Suma `deltas` a la fila `pk` de `model`, creándola si hace falta.
+
+    Solo se crea la fila cuando algún delta es positivo: un decremento sobre una
+    fila inexistente (p.ej. durante un borrado en cascada) no hace nada.
+    """
+    deltas = {field: d for field, d in deltas.items() if d}
+    if pk is None or not deltas:
+        return
+    updates = {field: F(field) + d for field, d in deltas.items()}
+    # update() no aplica auto_now
+    updates['updated_at'] = Now()
+    if model.objects.filter(pk=pk).update(**updates):
+        return
+    if not any(d > 0 for d in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(pk=pk, **{field: max(d, 0) for field, d in deltas.items()})
+    except IntegrityError:
+        # otra transacción creó la fila primero (la FK al objeto agregado se comprueba al
+        # confirmar en PostgreSQL: un objeto borrado no llega aquí, falla el COMMIT)
+        model.objects.filter(pk=pk).update(**updates)
+
+
+def _refresh_avg_rating(artist_id):
+    ArtistStats.objects.filter(pk=artist_id, rating_count__gt=0).update(
+        avg_rating=Cast(F('rating_sum'), FloatField()) / F('rating_count'), updated_at=Now(),
+    )
+    ArtistStats.objects.filter(pk=artist_id, rating_count=0).update(avg_rating=None, updated_at=Now())
+
+
+# ----- hooks -----
+def record_setlist_entry(song_id, delta=1):
+    _bump(SongPlayStats, song_id, play_count=delta)
+
+
+def record_setlist_entries(song_ids):
+    """Una interpretación más de cada canción de `song_ids` (sin repetidas), para inserciones en bloque."""
+    song_ids = set(song_ids)
+    existing = set(SongPlayStats.objects.filter(pk__in=song_ids).values_list('pk', flat=True))
+    SongPlayStats.objects.filter(pk__in=existing).update(play_count=F('play_count') + 1, updated_at=Now())
+    missing = song_ids - existing
+    try:
+        with transaction.atomic():
+            SongPlayStats.objects.bulk_create([SongPlayStats(pk=pk, play_count=1) for pk in missing])
+    except IntegrityError:
+        # otra transacción creó alguna fila primero: fila a fila, como los signals
+        for song_id in missing:
+            _bump(SongPlayStats, song_id, play_count=1)
+
+
+def record_concert(artist_id, city_id, income=None, delta=1):
+    """Suma (delta=1) o resta (delta=-1) un concierto a los agregados de su artista y ciudad."""
+    income = Decimal(income or 0) * delta
+    _bump(ArtistStats, artist_id, concert_count=delta, total_income=income)
+    _bump(CityConcertStats, city_id, concert_count=delta)
+
+
+def record_income(artist_id, delta):
+    _bump(ArtistStats, artist_id, total_income=Decimal(delta or 0))
+
+
+def record_rating(artist_id, old_rating, new_rating):
+    """Aplica el cambio de una calificación (None = sin calificar) al artista."""
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    if not sum_delta and not count_delta:
+        return
+    _bump(ArtistStats, artist_id, rating_sum=sum_delta, rating_count=count_delta)
+    _refresh_avg_rating(artist_id)
+
+
+def move_concert_ratings(concert_id, old_artist_id, new_artist_id):
+    """Traslada las calificaciones de un concierto cuando cambia su artista."""
+    agg = Attendance.objects.filter(concert_id=concert_id, rating__isnull=False).aggregate(
+        total=Coalesce(Sum('rating'), 0), count=Count('pk')
+    )
+    if not agg['count']:
+        return
+    _bump(ArtistStats, old_artist_id, rating_sum=-agg['total'], rating_count=-agg['count'])
+    _bump(ArtistStats, new_artist_id, rating_sum=agg['total'], rating_count=agg['count'])
+    _refresh_avg_rating(old_artist_id)
+    _refresh_avg_rating(new_artist_id)
+
+
+# ----- recálculo completo y verificación -----
+def _live_aggregates():
+    """Calcula los agregados directamente sobre las tablas fuente."""
+    songs = {
+        r['song_id']: {'play_count': r['n']}
+        for r in SetlistEntry.objects.values('song_id').annotate(n=Count('pk'))
+    }
+    cities = {
+        r['venue__city_id']: {'concert_count': r['n']}
+        for r in Concert.objects.values('venue__city_id').annotate(n=Count('pk'))
+    }
+    artists = {}
+    for r in (
+        Concert.objects.values('artist_id')
+        .annotate(n=Count('pk'), income=Coalesce(Sum('total_income'), Value(0, output_field=DecimalField())))
+    ):
+        artists[r['artist_id']] = {
+            'concert_count': r['n'], 'total_income': r['income'],
+            'rating_sum': 0, 'rating_count': 0, 'avg_rating': None,
+        }
+    for r in (
+        Attendance.objects.filter(rating__isnull=False)
+        .values('concert__artist_id')
+        .annotate(total=Sum('rating'), n=Count('pk'))
+    ):
+        row = artists.setdefault(r['concert__artist_id'], {'concert_count': 0, 'total_income': Decimal(0)})
+        row.update(rating_sum=r['total'], rating_count=r['n'], avg_rating=r['total'] / r['n'])
+    return {
+        SongPlayStats: songs,
+        CityConcertStats: cities,
+        ArtistStats: artists,
+    }
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Vacía y vuelve a calcular todas las tablas de agregados, buckets diarios incluidos."""
+    totals = {}
+    for model, rows in _live_aggregates().items():
+        model.objects.all().delete()
+        # si quedan menos filas, MAX(updated_at) no bastaría para ver el cambio
+        conditional.record_deletion(model)
+        model.objects.bulk_create(
+            [model(pk=pk, **values) for pk, values in rows.items()],
+            batch_size=batch_size,
+        )
+        totals[model.__name__] = len(rows)
+    # los buckets diarios de los reportes filtrados también son agregados derivados
+    totals.update(buckets.rebuild(batch_size))
+    return totals
+
+
+def check_consistency():
+    """Compara los agregados guardados con los reales.
+
+    Devuelve una lista de tuplas (modelo, pk, campo, guardado, real); vacía si
+    todo coincide. Las filas guardadas con todos los contadores en cero se
+    consideran equivalentes a que no existan.
+    """
+    mismatches = []
+    for model, live in _live_aggregates().items():
+        fields = [f.name for f in model._meta.concrete_fields if not f.primary_key and f.name not in ('avg_rating', 'updated_at')]
+        stored = {row.pop('pk'): row for row in model.objects.values('pk', *fields)}
+        for pk in set(stored) | set(live):
+            for field in fields:
+                have = stored.get(pk, {}).get(field) or 0
+                want = live.get(pk, {}).get(field) or 0
+                if have != want:
+                    mismatches.append((model.__name__, pk, field, have, want))
+    return mismatches
+
+
+# ----- lecturas para el dashboard -----
+def top_songs(limit=10):
+    return (
+        SongPlayStats.objects.filter(play_count__gt=0)
+        .select_related('song')
+        .order_by('-play_count')[:limit]
+    )
+
+
+def top_cities(limit=10):
+    return (
+        CityConcertStats.objects.filter(concert_count__gt=0)
+        .select_related('city')
+        .order_by('-concert_count')[:limit]
+    )
+
+
+def top_artists_by_concerts(limit=10):
+    return (
+        ArtistStats.objects.filter(concert_count__gt=0)
+        .select_related('artist')
+        .order_by('-concert_count')[:limit]
+    )
+
+
+def top_expected_concerts(limit=10):
+    # Concert.interest_count ya es el contador (fans/counters.py); índice concert_interest_idx
+    return (
+        Concert.objects.filter(interest_count__gt=0)
+        .select_related('artist', 'venue__city')
+        .order_by('-interest_count', 'pk')[:limit]
+    )
+
+
+def top_artists_by_rating(limit=10):
+    return (
+        ArtistStats.objects.filter(rating_count__gt=0)
+        .select_related('artist')
+        .order_by('-avg_rating')[:limit]
+    )
+
+
+def top_artists_by_income(limit=10):
+    return (
+        ArtistStats.objects.filter(concert_count__gt=0)
+        .select_related('artist')
+        .order_by('-total_income')[:limit]
+    )
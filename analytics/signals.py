@@ -0,0 +1,154 @@
+"""
+Signals que mantienen al día las tablas de agregados (ver analytics/rollups.py)
+y los buckets diarios de los reportes filtrados (analytics/buckets.py).
+
+En los pre_save se guarda en la instancia el estado anterior de la fila para
+poder aplicar solo la diferencia en el post_save.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from conciertos.models import Concert, SetlistEntry, Tour
+from core.models import Venue
+from fans.models import Attendance, Interest
+from . import buckets, rollups
+
+
+def _city_id(venue_id):
+    return Venue.objects.filter(pk=venue_id).values_list('city_id', flat=True).first()
+
+
+def _artist_id(concert_id):
+    return Concert.objects.filter(pk=concert_id).values_list('artist_id', flat=True).first()
+
+
+# ----- Concert -----
+@receiver(pre_save, sender=Concert)
+def concert_pre_save(sender, instance, raw=False, **kwargs):
+    instance._rollup_old = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._rollup_old = (
+        Concert.objects.filter(pk=instance.pk)
+        .values('artist_id', 'venue__city_id', 'total_income', 'tour_id', 'start_datetime')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Concert)
+def concert_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    city_id = _city_id(instance.venue_id)
+    old = getattr(instance, '_rollup_old', None)
+    bucket_keys = [buckets.key_of(instance.start_datetime, instance.artist_id, instance.tour_id, city_id)]
+    if old is not None:
+        bucket_keys.append(buckets.key_of(old['start_datetime'], old['artist_id'], old['tour_id'], old['venue__city_id']))
+    buckets.refresh(bucket_keys)
+    if created or old is None:
+        rollups.record_concert(instance.artist_id, city_id, instance.total_income)
+        return
+    if old['artist_id'] != instance.artist_id:
+        rollups.record_concert(old['artist_id'], None, old['total_income'], delta=-1)
+        rollups.record_concert(instance.artist_id, None, instance.total_income)
+        rollups.move_concert_ratings(instance.pk, old['artist_id'], instance.artist_id)
+    elif old['total_income'] != instance.total_income:
+        rollups.record_income(instance.artist_id, (instance.total_income or 0) - (old['total_income'] or 0))
+    if old['venue__city_id'] != city_id:
+        rollups.record_concert(None, old['venue__city_id'], delta=-1)
+        rollups.record_concert(None, city_id)
+
+
+@receiver(post_delete, sender=Concert)
+def concert_post_delete(sender, instance, **kwargs):
+    city_id = _city_id(instance.venue_id)
+    rollups.record_concert(instance.artist_id, city_id, instance.total_income, delta=-1)
+    buckets.refresh([buckets.key_of(instance.start_datetime, instance.artist_id, instance.tour_id, city_id)])
+
+
+# ----- Tour -----
+# al borrar una gira sus conciertos pasan a tour=NULL sin pasar por save(): hay que
+# mover sus buckets a mano (los de la gira borrada caen en cascada)
+@receiver(pre_delete, sender=Tour)
+def tour_pre_delete(sender, instance, **kwargs):
+    instance._bucket_concerts = list(instance.concerts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tour)
+def tour_post_delete(sender, instance, **kwargs):
+    buckets.refresh_concerts(getattr(instance, '_bucket_concerts', []))
+
+
+# ----- SetlistEntry -----
+@receiver(pre_save, sender=SetlistEntry)
+def setlist_entry_pre_save(sender, instance, raw=False, **kwargs):
+    instance._rollup_old_song = instance._bucket_old_concert = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    old = SetlistEntry.objects.filter(pk=instance.pk).values_list('song_id', 'concert_id').first()
+    if old:
+        instance._rollup_old_song, instance._bucket_old_concert = old
+
+
+@receiver(post_save, sender=SetlistEntry)
+def setlist_entry_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_song = getattr(instance, '_rollup_old_song', None)
+    if created or old_song is None:
+        rollups.record_setlist_entry(instance.song_id)
+    elif old_song != instance.song_id:
+        rollups.record_setlist_entry(old_song, delta=-1)
+        rollups.record_setlist_entry(instance.song_id)
+    old_concert = getattr(instance, '_bucket_old_concert', None)
+    if created or old_song != instance.song_id or old_concert != instance.concert_id:
+        buckets.refresh_concerts({instance.concert_id, old_concert} - {None}, concerts=False)
+
+
+@receiver(post_delete, sender=SetlistEntry)
+def setlist_entry_post_delete(sender, instance, **kwargs):
+    rollups.record_setlist_entry(instance.song_id, delta=-1)
+    buckets.refresh_concerts([instance.concert_id], concerts=False)
+
+
+# ----- Interest -----
+@receiver(post_save, sender=Interest)
+def interest_post_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        buckets.record_interest(instance.concert_id)
+
+
+@receiver(post_delete, sender=Interest)
+def interest_post_delete(sender, instance, **kwargs):
+    buckets.record_interest(instance.concert_id, delta=-1)
+
+
+# ----- Attendance -----
+@receiver(pre_save, sender=Attendance)
+def attendance_pre_save(sender, instance, raw=False, **kwargs):
+    instance._rollup_old = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._rollup_old = Attendance.objects.filter(pk=instance.pk).values('concert_id', 'rating').first()
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_rollup_old', None)
+    if old and old['concert_id'] != instance.concert_id:
+        rollups.record_rating(_artist_id(old['concert_id']), old['rating'], None)
+        buckets.record_rating(old['concert_id'], old['rating'], None)
+        old = None
+    old_rating = old['rating'] if old else None
+    if old_rating != instance.rating:
+        rollups.record_rating(_artist_id(instance.concert_id), old_rating, instance.rating)
+        buckets.record_rating(instance.concert_id, old_rating, instance.rating)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_post_delete(sender, instance, **kwargs):
+    if instance.rating is not None:
+        rollups.record_rating(_artist_id(instance.concert_id), instance.rating, None)
+        buckets.record_rating(instance.concert_id, instance.rating, None)
@@ -1,3 +1,153 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Artist, City, Venue
+from conciertos.models import Concert, Song, SetlistEntry, Tour
+from fans.models import Fan, Attendance, Interest
+from . import buckets, rollups
+from .forms import ReportFilterForm
+from .models import ArtistStats, CityConcertStats, DailyConcertStats, DailySongStats, SongPlayStats
+
+
+class RollupMaintenanceTest(TestCase):
+	def setUp(self):
+		self.city = City.objects.create(name='Bogotá', country='Colombia')
+		self.other_city = City.objects.create(name='Lima', country='Peru')
+		self.venue = Venue.objects.create(name='Movistar Arena', city=self.city)
+		self.other_venue = Venue.objects.create(name='Estadio Nacional', city=self.other_city)
+		self.artist = Artist.objects.create(name='Artista A', country='Colombia', genre='Rock')
+		self.other_artist = Artist.objects.create(name='Artista B', country='Peru', genre='Pop')
+		self.concert = Concert.objects.create(
+			artist=self.artist, venue=self.venue, start_datetime=timezone.now(),
+			status='completed', total_income=Decimal('100.00'),
+		)
+		self.song = Song.objects.create(title='Canción 1')
+		self.fan = Fan.objects.create(full_name='Fan Uno', email='fan1@example.com')
+
+	def test_writes_keep_rollups_consistent(self):
+		SetlistEntry.objects.create(concert=self.concert, song=self.song, position=1)
+		Interest.objects.create(fan=self.fan, concert=self.concert)
+		att = Attendance.objects.create(fan=self.fan, concert=self.concert, rating=8)
+		att.rating = 6
+		att.save()
+
+		# cambiar artista, venue (ciudad) e ingresos del concierto
+		self.concert.artist = self.other_artist
+		self.concert.venue = self.other_venue
+		self.concert.total_income = Decimal('250.00')
+		self.concert.save()
+
+		self.assertEqual(rollups.check_consistency(), [])
+		stats = ArtistStats.objects.get(pk=self.other_artist.pk)
+		self.assertEqual((stats.concert_count, stats.total_income, stats.rating_sum, stats.avg_rating), (1, Decimal('250.00'), 6, 6.0))
+		self.assertEqual(CityConcertStats.objects.get(pk=self.other_city.pk).concert_count, 1)
+		self.assertEqual(SongPlayStats.objects.get(pk=self.song.pk).play_count, 1)
+
+		# borrar el concierto cascada sobre setlist, interés y asistencia
+		self.concert.delete()
+		self.assertEqual(rollups.check_consistency(), [])
+
+	def test_drift_does_not_block_deletes(self):
+		entry = SetlistEntry.objects.create(concert=self.concert, song=self.song, position=1)
+		# agregado desajustado, como tras un bulk_create sin signals
+		SongPlayStats.objects.filter(pk=self.song.pk).update(play_count=0)
+		entry.delete()
+		self.assertEqual(SongPlayStats.objects.get(pk=self.song.pk).play_count, -1)
+		self.assertIn(('SongPlayStats', self.song.pk, 'play_count', -1, 0), rollups.check_consistency())
+
+	def test_rebuild_command_repairs_drift(self):
+		SetlistEntry.objects.create(concert=self.concert, song=self.song, position=1)
+		SongPlayStats.objects.all().delete()
+		self.assertNotEqual(rollups.check_consistency(), [])
+		call_command('rebuild_rollups', stdout=StringIO())
+		self.assertEqual(rollups.check_consistency(), [])
+
+	def test_dashboard_shell_links_chart_endpoints(self):
+		resp = self.client.get(reverse('analytics_dashboard'))
+		self.assertEqual(resp.status_code, 200)
+		for name in ('songs', 'cities', 'artists', 'expected', 'ratings', 'income'):
+			self.assertContains(resp, reverse('analytics_chart', args=[name]))
+
+	def test_chart_endpoints_read_rollups(self):
+		SetlistEntry.objects.create(concert=self.concert, song=self.song, position=1)
+		songs = self.client.get(reverse('analytics_chart', args=['songs'])).json()
+		self.assertEqual(songs, {'labels': ['Canción 1'], 'data': [1]})
+		income = self.client.get(reverse('analytics_chart', args=['income'])).json()
+		self.assertEqual(income, {'labels': ['Artista A'], 'data': [100.0]})
+		self.assertEqual(self.client.get(reverse('analytics_chart', args=['nope'])).status_code, 404)
+
+	def test_chart_etags_are_independent(self):
+		songs_url = reverse('analytics_chart', args=['songs'])
+		cities_url = reverse('analytics_chart', args=['cities'])
+		songs, cities = self.client.get(songs_url), self.client.get(cities_url)
+		self.assertEqual(self.client.get(songs_url, HTTP_IF_NONE_MATCH=songs['ETag']).status_code, 304)
+		# una canción nueva en un setlist cambia la gráfica de canciones, no la de ciudades
+		SetlistEntry.objects.create(concert=self.concert, song=self.song, position=1)
+		self.assertEqual(self.client.get(songs_url, HTTP_IF_NONE_MATCH=songs['ETag']).status_code, 200)
+		self.assertEqual(self.client.get(cities_url, HTTP_IF_NONE_MATCH=cities['ETag']).status_code, 304)
+
+	def _bucket_rows(self):
+		concerts = sorted(DailyConcertStats.objects.values_list(
+			'day', 'artist_id', 'tour_id', 'city_id', 'concert_count', 'total_income', 'rating_sum', 'rating_count', 'interest_count',
+		))
+		songs = sorted(DailySongStats.objects.values_list('day', 'artist_id', 'tour_id', 'city_id', 'song_id', 'play_count'))
+		return concerts, songs
+
+	def test_buckets_follow_writes_and_match_rebuild(self):
+		SetlistEntry.objects.create(concert=self.concert, song=self.song, position=1)
+		Interest.objects.create(fan=self.fan, concert=self.concert)
+		Attendance.objects.create(fan=self.fan, concert=self.concert, rating=8)
+		tour = Tour.objects.create(name='Gira 1', artist=self.other_artist)
+		self.concert.artist = self.other_artist
+		self.concert.venue = self.other_venue
+		self.concert.tour = tour
+		self.concert.save()
+
+		incremental = self._bucket_rows()
+		self.assertEqual(len(incremental[0]), 1)
+		self.assertEqual(incremental[0][0][1:], (self.other_artist.pk, tour.pk, self.other_city.pk, 1, Decimal('100.00'), 8, 1, 1))
+		self.assertEqual(len(incremental[1]), 1)
+		buckets.rebuild()
+		self.assertEqual(self._bucket_rows(), incremental)
+
+		tour.delete()
+		self.assertEqual(DailyConcertStats.objects.get().tour_id, None)
+		self.concert.refresh_from_db()
+		self.concert.delete()
+		self.assertEqual(self._bucket_rows(), ([], []))
+
+	@skipUnlessDBFeature('supports_nulls_distinct_unique_constraints')
+	def test_buckets_without_tour_are_unique(self):
+		bucket = DailyConcertStats.objects.get()
+		self.assertIsNone(bucket.tour_id)
+		with self.assertRaises(IntegrityError), transaction.atomic():
+			DailyConcertStats.objects.create(day=bucket.day, artist=self.artist, city=self.city, concert_count=1)
+
+	def test_filtered_charts_slice_buckets(self):
+		Concert.objects.create(
+			artist=self.other_artist, venue=self.other_venue, start_datetime=timezone.now() - timezone.timedelta(days=30),
+			status='completed', total_income=Decimal('40.00'),
+		)
+		url = reverse('analytics_chart', args=['income'])
+		self.assertEqual(self.client.get(url).json()['labels'], ['Artista A', 'Artista B'])
+		self.assertEqual(self.client.get(url, {'country': 'peru'}).json(), {'labels': ['Artista B'], 'data': [40.0]})
+		today = timezone.localdate().isoformat()
+		self.assertEqual(self.client.get(url, {'start': today}).json(), {'labels': ['Artista A'], 'data': [100.0]})
+		self.assertEqual(self.client.get(url, {'artist': self.artist.pk, 'genre': 'POP'}).json(), {'labels': [], 'data': []})
+
+	def test_invalid_filters_are_rejected(self):
+		url = reverse('analytics_chart', args=['songs'])
+		self.assertEqual(self.client.get(url, {'start': '2025-02-01', 'end': '2025-01-01'}).status_code, 400)
+		self.assertEqual(self.client.get(url, {'artist': 'x'}).status_code, 400)
+
+	def test_equivalent_filters_share_cache_key(self):
+		a = ReportFilterForm({'country': ' Peru', 'genre': '', 'end': '2025-01-01'})
+		b = ReportFilterForm({'end': '2025-01-01', 'country': 'PERU'})
+		self.assertTrue(a.is_valid() and b.is_valid())
+		self.assertEqual(a.normalized(), b.normalized())
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.AnalyticsDashboardView.as_view(), name='analytics_dashboard'),
+    path('charts/<slug:chart>/', views.chart_data, name='analytics_chart'),
 ]
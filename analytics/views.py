@@ -1,101 +1,119 @@
 from django.views.generic import TemplateView
 from django.utils.decorators import method_decorator
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Avg, Sum, Value, DecimalField
-from django.db.models.functions import Coalesce
-from django.shortcuts import render
-import json
+from django.http import Http404, JsonResponse
 
-from conciertos.models import Concert, SetlistEntry
-from fans.models import Interest, Attendance
+from conciertos.models import Concert, Song
+from core import caching
+from core.conditional import conditional
+from core.models import Artist, City, Venue
+from . import buckets, rollups
+from .forms import ReportFilterForm
+from .models import (
+	ArtistStats, CityConcertStats, DailyConcertStats, DailySongStats, SongPlayStats,
+)
 
 
+# Cada gráfica devuelve (labels, data). Sin filtros lee su tabla de agregados
+# (analytics/rollups.py), ya ordenada por índice: 10 filas, sin GROUP BY. Con
+# filtros suma los buckets diarios (analytics/buckets.py) del rango pedido.
+
+#Canciones más interpretadas (Setlist frequency)
+def songs_chart(filters):
+	if filters:
+		rows = buckets.top_songs(filters)
+		return [r['song__title'] for r in rows], [r['play_count'] for r in rows]
+	rows = rollups.top_songs()
+	return [r.song.title for r in rows], [r.play_count for r in rows]
+
+
+#Conciertos por ciudad
+def cities_chart(filters):
+	if filters:
+		rows = buckets.top_cities(filters)
+		return [f"{r['city__name']}, {r['city__country']}" for r in rows], [r['concert_count'] for r in rows]
+	rows = rollups.top_cities()
+	return [f"{r.city.name}, {r.city.country}" for r in rows], [r.concert_count for r in rows]
+
+
+#Artistas con más conciertos
+def artists_chart(filters):
+	if filters:
+		rows = buckets.top_artists_by_concerts(filters)
+		return [r['artist__name'] for r in rows], [r['concert_count'] for r in rows]
+	rows = rollups.top_artists_by_concerts()
+	return [r.artist.name for r in rows], [r.concert_count for r in rows]
+
+
+#Conciertos mas esperados (por numero de interest)
+def expected_chart(filters):
+	rows = buckets.top_expected_concerts(filters) if filters else rollups.top_expected_concerts()
+	return [f"{c.artist.name} — {c.venue.city.name}" for c in rows], [c.interest_count for c in rows]
+
+
+#Promedio de calificaciones por artista
+def ratings_chart(filters):
+	if filters:
+		rows = buckets.top_artists_by_rating(filters)
+		return [r['artist__name'] for r in rows], [round(float(r['avg_rating'] or 0), 2) for r in rows]
+	rows = rollups.top_artists_by_rating()
+	return [r.artist.name for r in rows], [round(float(r.avg_rating or 0), 2) for r in rows]
+
+
+#Ingresos totales por artista en conciertos (ya ordenado por -total_income)
+def income_chart(filters):
+	if filters:
+		rows = buckets.top_artists_by_income(filters)
+		return [r['artist__name'] for r in rows], [float(r['total_income'] or 0) for r in rows]
+	rows = rollups.top_artists_by_income()
+	return [r.artist.name for r in rows], [float(r.total_income or 0) for r in rows]
+
+
+# gráfica -> (datos, tablas de las que dependen; su versión da el ETag de la gráfica
+# y la clave de caché del resultado)
+CHARTS = {
+	'songs': (songs_chart, (SongPlayStats, DailySongStats, Song)),
+	'cities': (cities_chart, (CityConcertStats, DailyConcertStats, City)),
+	'artists': (artists_chart, (ArtistStats, DailyConcertStats, Artist)),
+	'expected': (expected_chart, (Concert, Artist, Venue, City)),
+	'ratings': (ratings_chart, (ArtistStats, DailyConcertStats, Artist)),
+	'income': (income_chart, (ArtistStats, DailyConcertStats, Artist)),
+}
+
+
+def _chart_view(name, func):
+	def view(request, chart):
+		form = ReportFilterForm(request.GET)
+		if not form.is_valid():
+			return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+		filters = form.normalized()
+		# misma combinación de filtros y mismas versiones de las tablas -> mismo resultado
+		labels, data = caching.cached(
+			f'chart:{name}', (filters, request.conditional_versions), (), lambda: func(dict(filters)),
+		)
+		return JsonResponse({'labels': labels, 'data': data})
+	return view
+
+
+# una vista por gráfica, cada una con su propio ETag
+CHART_VIEWS = {name: conditional(*models)(_chart_view(name, func)) for name, (func, models) in CHARTS.items()}
+
+
+def chart_data(request, chart):
+	"""JSON {labels, data} de una gráfica del dashboard, con los filtros de ReportFilterForm
+	en la querystring; 304 si sus tablas no cambiaron."""
+	view = CHART_VIEWS.get(chart)
+	if view is None:
+		raise Http404('Gráfica desconocida')
+	return view(request, chart=chart)
+
 
 class AnalyticsDashboardView(TemplateView):
+	# solo la estructura de la página: cada gráfica pide sus datos en paralelo a chart_data,
+	# así una agregación lenta no retrasa el primer byte ni las demás gráficas
 	template_name = 'analytics/dashboard.html'
 
-	def get(self, request, *args, **kwargs):
-		#Canciones más interpretadas (Setlist frequency)
-		songs_qs = (
-			SetlistEntry.objects.values('song__id', 'song__title')
-			.annotate(count=Count('pk'))
-			.order_by('-count')[:10]
-		)
-		songs_labels = [row['song__title'] for row in songs_qs]
-		songs_data = [row['count'] for row in songs_qs]
-
-		#Conciertos por ciudad
-		concerts_by_city = (
-			Concert.objects.filter(venue__city__name__isnull=False)
-			.values('venue__city__name', 'venue__city__country')
-			.annotate(count=Count('pk'))
-			.order_by('-count')[:10]
-		)
-		city_labels = [f"{r['venue__city__name']}, {r['venue__city__country']}" for r in concerts_by_city]
-		city_data = [r['count'] for r in concerts_by_city]
-
-		#Artistas con más conciertos
-		artists_qs = (
-			Concert.objects.values('artist__id', 'artist__name')
-			.annotate(count=Count('pk'))
-			.order_by('-count')[:10]
-		)
-		artist_labels = [r['artist__name'] for r in artists_qs]
-		artist_data = [r['count'] for r in artists_qs]
-
-		#Conciertos mas esperados (por numero de interest)
-		expected_qs = (
-			Interest.objects.values('concert__id', 'concert__artist__name', 'concert__venue__city__name', 'concert__start_datetime')
-			.annotate(count=Count('pk'))
-			.order_by('-count')[:10]
-		)
-		expected_labels = [f"{r['concert__artist__name']} — {r['concert__venue__city__name']}" for r in expected_qs]
-		expected_data = [r['count'] for r in expected_qs]
-
-		#Promedio de calificaciones por artista
-		ratings_qs = (
-			Attendance.objects.filter(rating__isnull=False)
-			.values('concert__artist__id', 'concert__artist__name')
-			.annotate(avg_rating=Avg('rating'), count=Count('pk'))
-			.order_by('-avg_rating')[:10]
-		)
-		ratings_labels = [r['concert__artist__name'] for r in ratings_qs]
-		ratings_data = [round(float(r['avg_rating'] or 0), 2) for r in ratings_qs]
-
-		#Ingresos totales por artista en conciertos
-		income_qs = (
-			Concert.objects.values('artist__id', 'artist__name')
-			# asegurarse de que Coalesce devuelva un tipo compatible con Decimal al darle a Value una salida DecimalField
-			.annotate(total_income=Coalesce(Sum('total_income'), Value(0, output_field=DecimalField())))
-			.order_by('-total_income')[:10]
-		)
-		income_labels = [r['artist__name'] for r in income_qs]
-		# asegurarse de que los floats sean numéricos y ordenar de forma descendente por total_income
-		income_list = [(r['artist__name'], float(r['total_income'] or 0)) for r in income_qs]
-		#ya ordenado por -total_income, pero por seguridad de errores
-		income_list.sort(key=lambda x: x[1], reverse=True)
-		income_labels = [x[0] for x in income_list]
-		income_data = [x[1] for x in income_list]
-
-		#labels y data para las gráficas de reportes
-		context = {
-			'songs_labels': json.dumps(songs_labels, ensure_ascii=False),
-			'songs_data': json.dumps(songs_data),
-			'songs_count': len(songs_data),
-			'city_labels': json.dumps(city_labels, ensure_ascii=False),
-			'city_data': json.dumps(city_data),
-			'city_count': len(city_data),
-			'artist_labels': json.dumps(artist_labels, ensure_ascii=False),
-			'artist_data': json.dumps(artist_data),
-			'artist_count': len(artist_data),
-			'expected_labels': json.dumps(expected_labels, ensure_ascii=False),
-			'expected_data': json.dumps(expected_data),
-			'expected_count': len(expected_data),
-			'ratings_labels': json.dumps(ratings_labels, ensure_ascii=False),
-			'ratings_data': json.dumps(ratings_data),
-			'ratings_count': len(ratings_data),
-			'income_labels': json.dumps(income_labels, ensure_ascii=False),
-			'income_data': json.dumps(income_data),
-			'income_count': len(income_data),
-		}
-		return render(request, self.template_name, context)
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		context['filter_form'] = ReportFilterForm(self.request.GET or None).load_choices()
+		return context
@@ -1,23 +1,28 @@
 from django.contrib import admin
+from core.admin import EstimatedCountAdmin
 from .models import Tour, Concert, Song, SetlistEntry
 
 # Register your models here.
 @admin.register(Tour)
-class TourAdmin(admin.ModelAdmin):
+class TourAdmin(EstimatedCountAdmin):
     list_display = ('artist', 'name', 'start_date', 'end_date', 'status', 'total_income')
+    list_select_related = ('artist',)
     search_fields = ('name', 'artist__name')
     
 @admin.register(Concert)
-class ConcertAdmin(admin.ModelAdmin):
+class ConcertAdmin(EstimatedCountAdmin):
     list_display = ('artist', 'venue', 'tour', 'start_datetime', 'status', 'total_income')
+    list_select_related = ('artist', 'venue__city', 'tour__artist')
     search_fields = ('artist__name', 'venue__name', 'tour__name')
 
 @admin.register(Song)
-class SongAdmin(admin.ModelAdmin):
+class SongAdmin(EstimatedCountAdmin):
     list_display = ('title', 'original_artist', 'release_year')
+    list_select_related = ('original_artist',)
     search_fields = ('title', 'original_artist__name') 
     
 @admin.register(SetlistEntry)
-class SetlistEntryAdmin(admin.ModelAdmin):
+class SetlistEntryAdmin(EstimatedCountAdmin):
     list_display = ('concert', 'song', 'position', 'section', 'is_cover')
+    list_select_related = ('concert__artist', 'concert__venue', 'song')
     search_fields = ('concert__artist__name', 'song__title')
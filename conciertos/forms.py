@@ -1,15 +1,16 @@
 from django import forms
 from django.utils import timezone
 from .models import Concert, Tour
-from core.models import Artist, Venue
-from .models import SetlistEntry, Song
+from core.choices import CatalogChoiceField, CatalogSelect
+from .models import SetlistEntry
+from .setlists import FORMATS
 
 
 class TourForm(forms.ModelForm):
-    artist = forms.ModelChoiceField(
-        queryset=Artist.objects.order_by('name'),
+    artist = CatalogChoiceField(
+        'artist',
         required=True,
-        widget=forms.Select(attrs={
+        widget=CatalogSelect(attrs={
             'class': 'form-input h-14 w-full rounded-lg bg-[#232f48] p-4 text-white'
         })
     )
@@ -90,29 +91,31 @@ class ConcertForm(forms.ModelForm):
     """Formulario para crear/editar Concert con estilo similar al form de Artista.
 
     El campo `artist` es un ModelChoiceField que sólo permite seleccionar
-    artistas ya registrados (sin posibilidad de texto libre).
+    artistas ya registrados (sin posibilidad de texto libre). Artista, venue y
+    gira usan CatalogChoiceField: lista cacheada o buscador según el tamaño
+    del catálogo (core/choices.py).
     """
 
-    artist = forms.ModelChoiceField(
-        queryset=Artist.objects.order_by('name'),
+    artist = CatalogChoiceField(
+        'artist',
         required=True,
-        widget=forms.Select(attrs={
+        widget=CatalogSelect(attrs={
             'class': 'form-input h-14 w-full flex-1 rounded-lg border-none bg-[#232f48] p-4 text-base text-white placeholder:text-[#92a4c9] focus:ring-2 focus:ring-primary'
         })
     )
 
-    venue = forms.ModelChoiceField(
-        queryset=Venue.objects.order_by('name'),
+    venue = CatalogChoiceField(
+        'venue',
         required=True,
-        widget=forms.Select(attrs={
+        widget=CatalogSelect(attrs={
             'class': 'form-input h-14 w-full flex-1 rounded-lg border-none bg-[#232f48] p-4 text-base text-white placeholder:text-[#92a4c9] focus:ring-2 focus:ring-primary'
         })
     )
 
-    tour = forms.ModelChoiceField(
-        queryset=Tour.objects.order_by('name'),
+    tour = CatalogChoiceField(
+        'tour',
         required=False,
-        widget=forms.Select(attrs={
+        widget=CatalogSelect(attrs={
             'class': 'form-input h-14 w-full flex-1 rounded-lg border-none bg-[#232f48] p-4 text-base text-white placeholder:text-[#92a4c9] focus:ring-2 focus:ring-primary'
         })
     )
@@ -179,60 +182,72 @@ class ConcertForm(forms.ModelForm):
 
 
 class SetlistEntryForm(forms.ModelForm):
+    song = CatalogChoiceField(
+        'song',
+        widget=CatalogSelect(attrs={'class': 'form-input h-14 w-full rounded-lg bg-[#232f48] p-4 text-white'})
+    )
+
     def __init__(self, *args, **kwargs):
-        # aceptar un kwarg `concert` para validar la unicidad de `position` dentro de ese concierto
+        # aceptar un kwarg `concert`: el concierto de la entrada (una posición ocupada no es un
+        # error, conciertos/setlists.py desplaza las entradas siguientes)
         self._concert = kwargs.pop('concert', None)
         super().__init__(*args, **kwargs)
         # si el formulario se instanció con una instancia, asegurarse de tener el concierto
         if not self._concert and hasattr(self, 'instance') and getattr(self.instance, 'concert', None):
             self._concert = self.instance.concert
+        # al agregar, sin posición la entrada va al final (conciertos/setlists.py)
+        if not self.instance.pk:
+            self.fields['position'].required = False
 
     class Meta:
         model = SetlistEntry
         fields = ['song', 'position', 'section', 'is_cover']
         widgets = {
-            'song': forms.Select(attrs={'class': 'form-input h-14 w-full rounded-lg bg-[#232f48] p-4 text-white'}),
             'position': forms.NumberInput(attrs={'class': 'form-input h-14 w-full rounded-lg bg-[#232f48] p-4 text-white'}),
             'section': forms.TextInput(attrs={'class': 'form-input h-14 w-full rounded-lg bg-[#232f48] p-4 text-white'}),
             'is_cover': forms.CheckboxInput(attrs={'class': 'ml-2'}),
         }
 
-        # Validar unicidad de `position` dentro del concierto
-        def clean_position(self):
-            pos = self.cleaned_data.get('position')
-            if pos is None:
-                return pos
-
-            concert = self._concert
-            if not concert:
-                # si no conocemos el concierto aún, omitir la verificación de unicidad (la vista debería pasar el concierto)
-                return pos
-
-            # Validar unicidad de `song` dentro del concierto
-            def clean_song(self):
-                song = self.cleaned_data.get('song')
-                if not song:
-                    return song
-
-                concert = self._concert
-                if not concert:
-                    # Si no conocemos el concierto aún, omitir la verificación de unicidad (la vista debería pasar el concierto)
-                    return song
-
-                # Verificar si la canción ya está en el setlist para este concierto
-                qs = SetlistEntry.objects.filter(concert=concert, song=song)
-                if self.instance and self.instance.pk:
-                    qs = qs.exclude(pk=self.instance.pk)
-                if qs.exists():
-                    raise forms.ValidationError('Esta canción ya está en el setlist para este concierto.')
-                return song
-
-            qs = SetlistEntry.objects.filter(concert=concert, position=pos)
-            # excluir self al editar
-            if self.instance and self.instance.pk:
-                qs = qs.exclude(pk=self.instance.pk)
-            if qs.exists():
-                raise forms.ValidationError('Ya existe una canción en esa posición para este concierto.')
-            return pos
 
+class SetlistImportForm(forms.Form):
+    """Setlist completo pegado o subido como fichero (ver conciertos/setlists.py)."""
+    MAX_UPLOAD = 256 * 1024
 
+    text = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={
+            'rows': 14,
+            'class': 'form-input w-full rounded-lg bg-[#232f48] p-4 text-white font-mono text-sm',
+            'placeholder': '# Main\nCanción 1\nCanción 2 | Artista original\n# Encore\nCanción 3',
+        })
+    )
+    file = forms.FileField(
+        required=False,
+        widget=forms.ClearableFileInput(attrs={'accept': '.txt,.csv,.json', 'class': 'text-sm text-[#92a4c9]'})
+    )
+    format = forms.ChoiceField(
+        choices=FORMATS,
+        required=False,
+        initial='auto',
+        widget=forms.Select(attrs={'class': 'form-input h-14 w-full rounded-lg bg-[#232f48] p-4 text-white'})
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        upload = cleaned.get('file')
+        fmt = cleaned.get('format') or 'auto'
+        if upload:
+            if upload.size > self.MAX_UPLOAD:
+                raise forms.ValidationError('El fichero es demasiado grande.')
+            try:
+                cleaned['content'] = upload.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise forms.ValidationError('El fichero debe estar en UTF-8.')
+            if fmt == 'auto' and upload.name.lower().endswith('.csv'):
+                fmt = 'csv'
+        else:
+            cleaned['content'] = cleaned.get('text', '')
+        if not cleaned['content'].strip():
+            raise forms.ValidationError('Pega el setlist o sube un fichero.')
+        cleaned['format'] = fmt
+        return cleaned
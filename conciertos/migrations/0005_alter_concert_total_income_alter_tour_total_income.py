@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:24
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0004_setlistentry_unique_concert_song'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='concert',
+            name='total_income',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='tour',
+            name='total_income',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
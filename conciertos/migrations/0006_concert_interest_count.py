@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_interest_count(apps, schema_editor):
+    Concert = apps.get_model('conciertos', 'Concert')
+    Interest = apps.get_model('fans', 'Interest')
+    counts = (
+        Interest.objects.filter(concert=OuterRef('pk'))
+        .order_by().values('concert')
+        .annotate(n=Count('pk')).values('n')
+    )
+    Concert.objects.update(interest_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0005_alter_concert_total_income_alter_tour_total_income'),
+        ('fans', '0004_fan_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='concert',
+            name='interest_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_interest_count, migrations.RunPython.noop),
+    ]
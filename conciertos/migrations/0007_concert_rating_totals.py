@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_rating_totals(apps, schema_editor):
+    Concert = apps.get_model('conciertos', 'Concert')
+    Attendance = apps.get_model('fans', 'Attendance')
+    rated = Attendance.objects.filter(concert=OuterRef('pk'), rating__isnull=False).order_by().values('concert')
+    Concert.objects.update(
+        rating_sum=Coalesce(Subquery(rated.annotate(total=Sum('rating')).values('total')), Value(0)),
+        rating_count=Coalesce(Subquery(rated.annotate(n=Count('pk')).values('n')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0006_concert_interest_count'),
+        ('fans', '0004_fan_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='concert',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='concert',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0007_concert_rating_totals'),
+        ('core', '0002_alter_artist_debut_year_alter_artist_genre'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='setlistentry',
+            name='song',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='conciertos.song'),
+        ),
+        migrations.AddIndex(
+            model_name='concert',
+            index=models.Index(fields=['status', 'start_datetime'], name='concert_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='setlistentry',
+            index=models.Index(fields=['song', 'concert'], name='setlistentry_song_idx'),
+        ),
+    ]
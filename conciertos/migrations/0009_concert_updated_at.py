@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='concert',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0010_version_stamps'),
+        ('core', '0004_row_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='concert',
+            index=models.Index(fields=['-interest_count', 'id'], name='concert_interest_idx'),
+        ),
+    ]
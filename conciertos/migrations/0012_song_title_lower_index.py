@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:43
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0011_concert_interest_index'),
+        ('core', '0005_artist_name_lower_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='song_title_lower_idx'),
+        ),
+    ]
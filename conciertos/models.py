@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.core.validators import MinValueValidator
 from core.models import Artist, Venue
 
@@ -11,6 +12,7 @@ class Tour(models.Model):
     status = models.CharField(max_length=20, choices=[('planned','Planned'),('ongoing','Ongoing'),('finished','Finished')], default='planned')
     total_income = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
                                        validators=[MinValueValidator(0)])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.name} - {self.artist.name}"
@@ -24,9 +26,48 @@ class Concert(models.Model):
     total_income = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
                                        validators=[MinValueValidator(0)])
     img = models.URLField(null=True, blank=True)  # URL de la imagen promocional del concierto
+    # contador desnormalizado de fans interesados; lo mantiene fans/counters.py en la misma
+    # transacción que crea/borra el Interest (reparar con `manage.py rebuild_concert_counters`)
+    interest_count = models.PositiveIntegerField(default=0, editable=False)
+    # suma y número de calificaciones de los asistentes, ajustados por deltas desde fans/counters.py
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    # sello de versión: cambia en cada save(), pero no con los incrementos de contadores
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # lo mueven fans/counters.py junto con los contadores (interés, calificaciones)
+    counters_updated_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    # campos que solo se modifican con incrementos F(); un save() normal (formularios, admin)
+    # no debe sobrescribirlos con el valor que tenía la instancia al cargarse
+    COUNTER_FIELDS = ('interest_count', 'rating_sum', 'rating_count', 'counters_updated_at')
+    # columnas cuyo máximo da la versión de la tabla (core/conditional.py)
+    VERSION_FIELDS = ('updated_at', 'counters_updated_at')
+
+    class Meta:
+        indexes = [
+            # próximos conciertos del dashboard: status = %s AND start_datetime >= %s ORDER BY start_datetime
+            models.Index(fields=['status', 'start_datetime'], name='concert_status_start_idx'),
+            # gráfica de conciertos más esperados: ORDER BY interest_count DESC LIMIT 10
+            models.Index(fields=['-interest_count', 'id'], name='concert_interest_idx'),
+        ]
     
     def __str__(self):
         return f"{self.artist.name} @ {self.venue.name} - {self.start_datetime.date()}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def avg_rating(self):
+        """Calificación promedio (None si nadie ha calificado)."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
     
 class Song(models.Model):
     title = models.CharField(max_length=300)
@@ -35,13 +76,21 @@ class Song(models.Model):
     original_artist = models.ForeignKey(Artist, on_delete=models.SET_NULL, null=True, blank=True)
     original_artist_name = models.CharField(max_length=200, null=True, blank=True)
     release_year = models.PositiveSmallIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # búsqueda por título sin distinguir mayúsculas (importación de setlists)
+            models.Index(Lower('title'), name='song_title_lower_idx'),
+        ]
 
     def __str__(self):
         return self.title
     
 class SetlistEntry(models.Model):
     concert = models.ForeignKey(Concert, on_delete=models.CASCADE, related_name='setlist_entries')
-    song = models.ForeignKey(Song, on_delete=models.PROTECT)
+    # sin índice propio: lo cubre setlistentry_song_idx (song, concert)
+    song = models.ForeignKey(Song, on_delete=models.PROTECT, db_index=False)
     position = models.PositiveIntegerField()
     section = models.CharField(max_length=50, blank=True) 
     is_cover = models.BooleanField(default=False)
@@ -52,6 +101,10 @@ class SetlistEntry(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['concert', 'song'], name='unique_concert_song')
         ]
+        indexes = [
+            # conteo de interpretaciones por canción (GROUP BY song) y búsqueda de la canción en conciertos
+            models.Index(fields=['song', 'concert'], name='setlistentry_song_idx'),
+        ]
         ordering = ['position']
         
     def __str__(self):
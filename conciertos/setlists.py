@@ -0,0 +1,313 @@
+"""
+Importación de un setlist completo en una sola transacción.
+
+Formatos aceptados (`parse`):
+
+- texto: una canción por línea, opcionalmente `Título | Artista original`
+  (se marca como cover); una línea `# Sección` (p. ej. `# Encore`) aplica
+  esa sección a las siguientes.
+- CSV: columnas title, artist, section, is_cover (la cabecera es opcional).
+- JSON: lista de objetos con esas claves, o de títulos.
+
+`import_setlist` resuelve todas las canciones y artistas originales con una
+consulta cada uno, crea las canciones que faltan con bulk_create y añade las
+entradas al final del setlist. Si alguna línea tiene errores no se guarda
+nada. Como bulk_create no dispara signals, actualiza a mano los agregados de
+analytics y los contadores de filas.
+
+`append`, `move` y `reorder` cambian posiciones con sentencias sobre todo el
+concierto, sin reintentos ni un UPDATE por fila. Como (concert, position) es
+único y la restricción se comprueba fila a fila, primero se llevan las filas
+afectadas por encima de la última posición y después a su sitio. Todas estas
+operaciones bloquean la fila del concierto: dos editores a la vez se ordenan
+en lugar de calcular la misma posición.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Case, F, Max, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Lower
+
+from analytics import buckets, rollups
+from core import caching, counts
+from core.models import Artist
+from search import autocomplete
+from .models import Concert, SetlistEntry, Song
+
+FORMATS = (('auto', 'Detectar'), ('text', 'Texto'), ('csv', 'CSV'), ('json', 'JSON'))
+# columnas del CSV cuando no trae cabecera
+CSV_COLUMNS = ('title', 'artist', 'section', 'is_cover')
+MAX_LINES = 200
+
+# campos donde se guarda cada parte de una línea (para validar su longitud)
+_TITLE = (Song, 'title')
+_ARTIST = (Song, 'original_artist_name')
+_SECTION = (SetlistEntry, 'section')
+
+_TRUE = {'1', 'true', 'yes', 'si', 'sí', 'x', 'cover'}
+
+
+@dataclass
+class Line:
+    number: int
+    title: str
+    artist: str = ''
+    section: str = ''
+    is_cover: bool = False
+
+
+class ImportErrors(Exception):
+    """Errores por línea: [(número de línea, mensaje), ...]."""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} líneas con errores')
+        self.errors = errors
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in _TRUE
+
+
+def _parse_text(text):
+    lines, section = [], ''
+    for number, raw in enumerate(text.splitlines(), 1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        if raw.startswith('#'):
+            section = raw.lstrip('#').strip()
+            continue
+        title, _, artist = raw.partition('|')
+        lines.append(Line(number, title.strip(), artist.strip(), section, bool(artist.strip())))
+    return lines
+
+
+def _parse_csv(text):
+    rows = list(csv.reader(io.StringIO(text)))
+    header = [c.strip().lower() for c in rows[0]] if rows else []
+    start = 1 if 'title' in header else 0
+    columns = header if start else CSV_COLUMNS
+    lines = []
+    for number, row in enumerate(rows[start:], start + 1):
+        if not any(c.strip() for c in row):
+            continue
+        data = dict(zip(columns, (c.strip() for c in row)))
+        lines.append(Line(number, data.get('title', ''), data.get('artist', ''), data.get('section', ''), _flag(data.get('is_cover'))))
+    return lines
+
+
+def _parse_json(text):
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise ImportErrors([(exc.lineno, f'JSON inválido: {exc.msg}')])
+    if not isinstance(items, list):
+        raise ImportErrors([(1, 'Se esperaba una lista de canciones.')])
+    lines = []
+    for number, item in enumerate(items, 1):
+        if isinstance(item, str):
+            item = {'title': item}
+        if not isinstance(item, dict):
+            raise ImportErrors([(number, 'Cada elemento debe ser un título o un objeto con "title".')])
+        lines.append(Line(
+            number, str(item.get('title') or '').strip(), str(item.get('artist') or '').strip(),
+            str(item.get('section') or '').strip(), _flag(item.get('is_cover')),
+        ))
+    return lines
+
+
+def parse(text, fmt='auto'):
+    """Lista de Line; lanza ImportErrors si el texto no se puede leer."""
+    if fmt == 'auto':
+        stripped = text.lstrip()
+        fmt = 'json' if stripped.startswith(('[', '{')) else 'text'
+    lines = {'text': _parse_text, 'csv': _parse_csv, 'json': _parse_json}[fmt](text)
+    if not lines:
+        raise ImportErrors([(1, 'El setlist está vacío.')])
+    if len(lines) > MAX_LINES:
+        raise ImportErrors([(lines[MAX_LINES].number, f'Como máximo {MAX_LINES} canciones por importación.')])
+    return lines
+
+
+def _lock(concert):
+    # serializa los cambios de posiciones del mismo concierto hasta el final de la transacción
+    Concert.objects.select_for_update().filter(pk=concert.pk).exists()
+
+
+def _key(value):
+    return value.strip().lower()
+
+
+def resolve_artists(names):
+    """{nombre en minúsculas: Artist} de los `names` registrados, en una consulta.
+
+    Compara sin distinguir mayúsculas (Lower('name'), con índice); si dos
+    artistas comparten nombre gana el más antiguo.
+    """
+    keys = {_key(name) for name in names if name and name.strip()}
+    if not keys:
+        return {}
+    artists = Artist.objects.annotate(name_key=Lower('name')).filter(name_key__in=keys).order_by('-pk')
+    return {artist.name_key: artist for artist in artists}
+
+
+def _resolve_songs(lines):
+    """{(título, artista): Song} de las canciones ya registradas, en una consulta."""
+    titles = {_key(line.title) for line in lines}
+    found = {}
+    songs = (
+        Song.objects.annotate(title_key=Lower('title')).filter(title_key__in=titles)
+        .select_related('original_artist').order_by('pk')
+    )
+    for song in songs:
+        artist = song.original_artist.name if song.original_artist else (song.original_artist_name or '')
+        # la primera (más antigua) gana; sin artista en la línea vale cualquier versión del título
+        found.setdefault((song.title_key, _key(artist)), song)
+        found.setdefault((song.title_key, None), song)
+    return found
+
+
+def import_setlist(concert, lines):
+    """Añade `lines` al final del setlist de `concert`.
+
+    Devuelve (entradas creadas, canciones nuevas). Lanza ImportErrors sin
+    guardar nada si alguna línea no es válida.
+    """
+    errors = []
+    for line in lines:
+        if not line.title:
+            errors.append((line.number, 'Falta el título.'))
+        for value, (model, field), message in (
+            (line.title, _TITLE, 'Título demasiado largo'),
+            (line.artist, _ARTIST, 'Artista original demasiado largo'),
+            (line.section, _SECTION, 'Sección demasiado larga'),
+        ):
+            limit = model._meta.get_field(field).max_length
+            if len(value) > limit:
+                errors.append((line.number, f'{message} (máximo {limit} caracteres).'))
+    if errors:
+        raise ImportErrors(errors)
+
+    with transaction.atomic():
+        _lock(concert)
+        existing = _resolve_songs(lines)
+        artists = resolve_artists(line.artist for line in lines)
+
+        songs, new_songs = [], {}
+        for line in lines:
+            key = (_key(line.title), _key(line.artist) if line.artist else None)
+            song = existing.get(key) or new_songs.get(key)
+            if song is None:
+                artist = artists.get(key[1]) if key[1] else None
+                song = new_songs[key] = Song(
+                    title=line.title, original_artist=artist,
+                    original_artist_name=line.artist if line.artist and artist is None else None,
+                )
+            songs.append(song)
+
+        taken = set(SetlistEntry.objects.filter(concert=concert).values_list('song_id', flat=True))
+        seen = {}
+        for line, song in zip(lines, songs):
+            # las canciones nuevas aún no tienen pk: se distinguen por identidad
+            if song.pk in taken:
+                errors.append((line.number, f'"{song.title}" ya está en el setlist.'))
+            elif id(song) in seen:
+                errors.append((line.number, f'"{song.title}" está repetida (línea {seen[id(song)]}).'))
+            seen.setdefault(id(song), line.number)
+        if errors:
+            raise ImportErrors(errors)
+
+        Song.objects.bulk_create(new_songs.values())
+
+        start = SetlistEntry.objects.filter(concert=concert).aggregate(Max('position'))['position__max'] or 0
+        entries = SetlistEntry.objects.bulk_create([
+            SetlistEntry(concert=concert, song=song, position=start + i, section=line.section, is_cover=line.is_cover)
+            for i, (line, song) in enumerate(zip(lines, songs), 1)
+        ])
+        _after_bulk_insert(concert, [song.pk for song in songs], [song.pk for song in new_songs.values()])
+    return entries, list(new_songs.values())
+
+
+def _after_bulk_insert(concert, song_ids, new_song_ids):
+    # lo que harían los signals de post_save de cada entrada y canción
+    rollups.record_setlist_entries(song_ids)
+    buckets.refresh_concerts([concert.pk], concerts=False)
+    counts.add(SetlistEntry, len(song_ids))
+    counts.add(Song, len(new_song_ids))
+    if new_song_ids:
+        caching.bump(Song)
+        transaction.on_commit(lambda: autocomplete.refresh('song', new_song_ids))
+
+
+# ----- posiciones -----
+def append(concert, song, position=None, section='', is_cover=False):
+    """Añade `song` al setlist y devuelve la entrada.
+
+    Sin `position` va al final: la posición la calcula el propio INSERT. Con
+    `position` se desplazan una posición las entradas desde ahí. Lanza
+    IntegrityError si la canción ya está en el setlist.
+    """
+    entries = SetlistEntry.objects.filter(concert=concert)
+    with transaction.atomic():
+        _lock(concert)
+        if position is None:
+            last = entries.order_by().values('concert').annotate(last=Max('position')).values('last')
+            position = Coalesce(Subquery(last), 0) + 1
+        else:
+            last = entries.aggregate(Max('position'))['position__max'] or 0
+            if position <= last:
+                offset = last + 1
+                entries.filter(position__gte=position).update(position=F('position') + offset)
+                entries.filter(position__gt=last).update(position=F('position') - offset + 1)
+        entry = SetlistEntry.objects.create(concert=concert, song=song, position=position, section=section, is_cover=is_cover)
+    if not isinstance(entry.position, int):
+        entry.refresh_from_db(fields=['position'])
+    return entry
+
+
+def move(entry, position, **fields):
+    """Guarda `entry` con los cambios de `fields` (canción, sección...) en `position`.
+
+    Las entradas entre la posición actual y la nueva se desplazan una posición;
+    `position` se ajusta a 1..última. Lanza IntegrityError si la canción ya
+    está en el setlist.
+    """
+    entries = SetlistEntry.objects.filter(concert_id=entry.concert_id)
+    with transaction.atomic():
+        _lock(entry.concert)
+        current = entries.filter(pk=entry.pk).values_list('position', flat=True).get()
+        last = entries.aggregate(Max('position'))['position__max']
+        position = min(max(position, 1), last)
+        if position != current:
+            low, high = sorted((current, position))
+            offset = last + 1
+            step = 1 if position < current else -1
+            entries.filter(position__gte=low, position__lte=high).update(position=F('position') + offset)
+            entries.filter(position__gt=last).update(position=Case(
+                When(pk=entry.pk, then=Value(position)), default=F('position') - offset + step,
+            ))
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        entry.position = position
+        entry.save()
+    return entry
+
+
+def reorder(concert, entry_ids):
+    """Reescribe las posiciones (1..n) en el orden de `entry_ids`, que debe incluir todas las entradas."""
+    entries = SetlistEntry.objects.filter(concert=concert)
+    with transaction.atomic():
+        _lock(concert)
+        current = dict(entries.values_list('pk', 'position'))
+        if len(entry_ids) != len(current) or set(entry_ids) != set(current):
+            raise ValueError('El nuevo orden debe incluir cada entrada del setlist una sola vez.')
+        if not current:
+            return
+        entries.update(position=F('position') + max(current.values()) + len(current) + 1)
+        entries.update(position=Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(entry_ids, 1)]))
@@ -1,3 +1,373 @@
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import caching
+from core.models import Artist, City, Venue
+from fans.models import Fan, Interest
+from search import autocomplete
+from . import setlists
+from .models import Concert, SetlistEntry, Song, Tour
+
+
+class ListQueryCountTest(TestCase):
+	"""El número de consultas de cada página no debe crecer con el número de filas."""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.city = City.objects.create(name='Bogotá', country='Colombia')
+		cls.tour = Tour.objects.create(artist=Artist.objects.create(name='Gira', country='Colombia', genre='Rock'), name='Gira 0')
+
+	setlist_concert = None
+
+	def seed(self, n):
+		"""Añade hasta `n` conciertos (cada uno con artista, venue y gira propios) y `n` canciones al setlist."""
+		start = Concert.objects.count()
+		artists = Artist.objects.bulk_create([
+			Artist(name=f'Artista {i}', country='Colombia', genre='Rock') for i in range(start, n)
+		])
+		venues = Venue.objects.bulk_create([Venue(name=f'Venue {i}', city=self.city) for i in range(start, n)])
+		tours = Tour.objects.bulk_create([
+			Tour(artist=a, name=f'Gira {i}', start_date=datetime.date(2024, 1, 1)) for i, a in enumerate(artists, start)
+		])
+		when = timezone.now() + datetime.timedelta(days=10)
+		Concert.objects.bulk_create([
+			Concert(artist=a, venue=v, tour=self.tour if i % 2 else t, start_datetime=when)
+			for i, (a, v, t) in enumerate(zip(artists, venues, tours))
+		])
+		concert = self.setlist_concert or Concert.objects.order_by('id').first()
+		self.setlist_concert = concert
+		songs = Song.objects.bulk_create([
+			Song(title=f'Canción {i}', original_artist=a) for i, a in enumerate(artists, start)
+		])
+		SetlistEntry.objects.bulk_create([
+			SetlistEntry(concert=concert, song=s, position=i + 1) for i, s in enumerate(songs, start)
+		])
+		# bulk_create no dispara signals: invalidar las listas cacheadas
+		caching.bump_all()
+
+	def count_queries(self, url):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def assertConstantQueries(self, url_for):
+		self.seed(10)
+		small = self.count_queries(url_for())
+		self.seed(500)
+		self.assertEqual(self.count_queries(url_for()), small)
+
+	def test_concert_list(self):
+		self.assertConstantQueries(lambda: reverse('concert_list'))
+
+	def test_concert_list_as_fan(self):
+		user = User.objects.create_user('fan', password='x')
+		fan = Fan.objects.create(user=user, full_name='Fan', email='fan@example.com')
+		self.client.force_login(user)
+		self.seed(10)
+		Interest.objects.bulk_create([Interest(fan=fan, concert=c) for c in Concert.objects.all()])
+		small = self.count_queries(reverse('concert_list'))
+		self.seed(500)
+		self.assertEqual(self.count_queries(reverse('concert_list')), small)
+
+	def test_tour_list(self):
+		self.assertConstantQueries(lambda: reverse('tour_list'))
+
+	def test_tour_detail(self):
+		self.assertConstantQueries(lambda: reverse('tour_detail', args=[self.tour.pk]))
+
+	def test_concert_detail(self):
+		self.assertConstantQueries(lambda: reverse('concert_detail', args=[self.setlist_concert.pk]))
+
+	def test_concert_setlist(self):
+		self.assertConstantQueries(lambda: reverse('concert_setlist', args=[self.setlist_concert.pk]))
+
+
+class ConcertCardCacheTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		city = City.objects.create(name='Bogotá', country='Colombia')
+		self.artist = Artist.objects.create(name='Aterciopelados', country='Colombia', genre='Rock')
+		venue = Venue.objects.create(name='Movistar Arena', city=city)
+		self.concert = Concert.objects.create(
+			artist=self.artist, venue=venue, start_datetime=timezone.now() + datetime.timedelta(days=10),
+		)
+
+	def test_card_is_reused_until_concert_changes(self):
+		self.client.get(reverse('concert_list'))
+		# update() no pasa por signals ni toca updated_at: la tarjeta sigue en caché
+		Artist.objects.filter(pk=self.artist.pk).update(name='Otro nombre')
+		self.assertContains(self.client.get(reverse('concert_list')), 'Aterciopelados')
+		self.concert.status = 'canceled'
+		self.concert.save()
+		resp = self.client.get(reverse('concert_list'))
+		self.assertContains(resp, 'Otro nombre')
+		self.assertContains(resp, 'Cancelado')
+
+	def test_related_change_invalidates_card(self):
+		self.client.get(reverse('concert_list'))
+		self.artist.name = 'Otro nombre'
+		self.artist.save()
+		self.assertContains(self.client.get(reverse('concert_list')), 'Otro nombre')
+
+	def test_user_specific_parts_are_not_cached(self):
+		user = User.objects.create_user('fan', password='x')
+		fan = Fan.objects.create(user=user, full_name='Fan', email='fan@example.com')
+		Interest.objects.create(fan=fan, concert=self.concert)
+		self.client.force_login(user)
+		self.assertContains(self.client.get(reverse('concert_list')), 'aria-pressed="true"')
+		other = User.objects.create_user('otro', password='x')
+		Fan.objects.create(user=other, full_name='Otro', email='otro@example.com')
+		self.client.force_login(other)
+		resp = self.client.get(reverse('concert_list'))
+		self.assertContains(resp, 'aria-pressed="false"')
+		self.assertNotContains(resp, 'aria-pressed="true"')
+
+
+class ConditionalGetTest(TestCase):
+	def setUp(self):
+		city = City.objects.create(name='Bogotá', country='Colombia')
+		self.artist = Artist.objects.create(name='Aterciopelados', country='Colombia', genre='Rock')
+		self.venue = Venue.objects.create(name='Movistar Arena', city=city)
+		self.concert = Concert.objects.create(
+			artist=self.artist, venue=self.venue, start_datetime=timezone.now() + datetime.timedelta(days=10),
+		)
+
+	def revalidate(self, url, response):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+		return resp, len(ctx.captured_queries)
+
+	def test_unchanged_page_returns_304_without_main_query(self):
+		# versiones de las tablas en una consulta; el detalle lee además la fila del concierto
+		pages = {reverse('concert_list'): 1, reverse('tour_list'): 1, reverse('concert_detail', args=[self.concert.pk]): 2}
+		for url, expected_queries in pages.items():
+			first = self.client.get(url)
+			self.assertEqual(first.status_code, 200)
+			self.assertTrue(first.has_header('Last-Modified'))
+			self.assertIn('no-cache', first['Cache-Control'])
+			resp, queries = self.revalidate(url, first)
+			self.assertEqual(resp.status_code, 304, url)
+			self.assertEqual(queries, expected_queries)
+
+	def test_changes_invalidate_etag(self):
+		url = reverse('concert_list')
+		changes = [
+			lambda: setattr(self.artist, 'name', 'Otro') or self.artist.save(),
+			lambda: Interest.objects.create(fan=Fan.objects.create(full_name='Fan', email='f@example.com'), concert=self.concert),
+			lambda: Concert.objects.create(artist=self.artist, venue=self.venue, start_datetime=timezone.now()).delete(),
+		]
+		for change in changes:
+			first = self.client.get(url)
+			change()
+			resp, _ = self.revalidate(url, first)
+			self.assertEqual(resp.status_code, 200)
+
+	def test_etag_depends_on_user(self):
+		url = reverse('concert_detail', args=[self.concert.pk])
+		anonymous = self.client.get(url)
+		self.client.force_login(User.objects.create_user('fan', password='x'))
+		resp, _ = self.revalidate(url, anonymous)
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('private', resp['Cache-Control'])
+
+
+class SetlistImportTest(TestCase):
+	def setUp(self):
+		city = City.objects.create(name='Bogotá', country='Colombia')
+		self.artist = Artist.objects.create(name='Aterciopelados', country='Colombia', genre='Rock')
+		self.other = Artist.objects.create(name='Soda Stereo', country='Argentina', genre='Rock')
+		venue = Venue.objects.create(name='Movistar Arena', city=city)
+		self.concert = Concert.objects.create(artist=self.artist, venue=venue, start_datetime=timezone.now())
+		self.existing = Song.objects.create(title='Bolero Falaz', original_artist=self.artist)
+		SetlistEntry.objects.create(concert=self.concert, song=Song.objects.create(title='Intro'), position=1)
+		self.url = reverse('setlist_import', args=[self.concert.pk])
+		self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+	def test_text_import_appends_in_one_batch(self):
+		text = 'bolero falaz\nFlorecita Rockera\n# Encore\nDe Música Ligera | soda stereo\nLa Pipa | Otro Artista\n'
+		titles = [f'Canción {i}' for i in range(20)]
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.post(self.url, {'text': text + '\n'.join(titles), 'format': 'auto'})
+		self.assertRedirects(resp, reverse('concert_setlist', args=[self.concert.pk]))
+		# el número de consultas no depende del número de canciones
+		self.assertLess(len(ctx.captured_queries), 30)
+		entries = list(SetlistEntry.objects.filter(concert=self.concert).select_related('song__original_artist'))
+		self.assertEqual([e.position for e in entries], list(range(1, 26)))
+		self.assertEqual(entries[1].song, self.existing)
+		cover = entries[3]
+		self.assertEqual((cover.section, cover.is_cover, cover.song.original_artist), ('Encore', True, self.other))
+		self.assertEqual(entries[4].song.original_artist_name, 'Otro Artista')
+		from analytics import rollups
+		self.assertEqual(rollups.check_consistency(), [])
+
+	def test_errors_are_reported_per_line_and_nothing_is_saved(self):
+		songs = Song.objects.count()
+		resp = self.client.post(self.url, {'text': 'Nueva\nintro\nNueva\n', 'format': 'text'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.context['line_errors'], [(2, '"Intro" ya está en el setlist.'), (3, '"Nueva" está repetida (línea 1).')])
+		self.assertEqual(Song.objects.count(), songs)
+		self.assertEqual(SetlistEntry.objects.filter(concert=self.concert).count(), 1)
+
+	def test_csv_and_json(self):
+		csv_text = 'title,artist,section,is_cover\nUno,,Main,\nDos,Soda Stereo,Main,yes\n'
+		resp = self.client.post(self.url, {'text': csv_text, 'format': 'csv'}, HTTP_ACCEPT='application/json')
+		self.assertEqual(resp.json(), {'success': True, 'entries': 2, 'songs_created': 2})
+		resp = self.client.post(self.url, {'text': '["Tres", {"title": ""}]'}, HTTP_ACCEPT='application/json')
+		self.assertEqual(resp.status_code, 400)
+		self.assertEqual(resp.json()['errors'], [{'line': 2, 'error': 'Falta el título.'}])
+		# cada parte de la línea cabe en su columna o se informa en esa línea
+		resp = self.client.post(self.url, {'text': 'Cuatro | %s\n# %s\nCinco' % ('a' * 201, 's' * 51)}, HTTP_ACCEPT='application/json')
+		self.assertEqual(resp.json()['errors'], [
+			{'line': 1, 'error': 'Artista original demasiado largo (máximo 200 caracteres).'},
+			{'line': 3, 'error': 'Sección demasiado larga (máximo 50 caracteres).'},
+		])
+		self.assertEqual(SetlistEntry.objects.filter(concert=self.concert).count(), 3)
+
+
+class SetlistPositionTest(TestCase):
+	def setUp(self):
+		city = City.objects.create(name='Bogotá', country='Colombia')
+		artist = Artist.objects.create(name='Aterciopelados', country='Colombia', genre='Rock')
+		venue = Venue.objects.create(name='Movistar Arena', city=city)
+		self.concert = Concert.objects.create(artist=artist, venue=venue, start_datetime=timezone.now())
+		self.songs = [Song.objects.create(title=f'Canción {i}') for i in range(5)]
+		self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+	def setlist(self):
+		return list(SetlistEntry.objects.filter(concert=self.concert).values_list('song__title', 'position'))
+
+	def test_append_and_insert_in_the_middle(self):
+		from analytics import rollups
+		for song in self.songs[:3]:
+			entry = setlists.append(self.concert, song)
+		self.assertEqual(entry.position, 3)
+		with CaptureQueriesContext(connection) as ctx:
+			setlists.append(self.concert, self.songs[3], position=2)
+		# el desplazamiento son dos UPDATE, no uno por entrada
+		self.assertEqual(sum('UPDATE "conciertos_setlistentry"' in q['sql'] for q in ctx.captured_queries), 2)
+		self.assertEqual(self.setlist(), [('Canción 0', 1), ('Canción 3', 2), ('Canción 1', 3), ('Canción 2', 4)])
+		with self.assertRaises(IntegrityError):
+			setlists.append(self.concert, self.songs[0], position=1)
+		self.assertEqual(self.setlist()[0], ('Canción 0', 1))
+		self.assertEqual(rollups.check_consistency(), [])
+
+	def test_reorder_endpoint(self):
+		entries = [setlists.append(self.concert, song) for song in self.songs]
+		url = reverse('setlist_reorder', args=[self.concert.pk])
+		order = [e.pk for e in reversed(entries)]
+		resp = self.client.post(url, json.dumps({'order': order}), content_type='application/json')
+		self.assertEqual(resp.json(), {'success': True, 'order': order})
+		self.assertEqual([title for title, _ in self.setlist()], [f'Canción {i}' for i in reversed(range(5))])
+		self.assertEqual([pos for _, pos in self.setlist()], [1, 2, 3, 4, 5])
+		# el orden debe incluir todas las entradas una vez
+		self.assertEqual(self.client.post(url, {'order': ','.join(map(str, order[:-1]))}).status_code, 400)
+		self.assertEqual(self.client.post(url, {'order': 'a,b'}).status_code, 400)
+
+	def test_edit_view_moves_entry_and_shifts_the_rest(self):
+		from analytics import rollups
+		entries = [setlists.append(self.concert, song) for song in self.songs[:4]]
+		url = reverse('setlistentry_edit', args=[entries[3].pk])
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.post(url, {'song': self.songs[3].pk, 'position': 1, 'section': 'Inicio'})
+		self.assertRedirects(resp, reverse('concert_setlist', args=[self.concert.pk]), fetch_redirect_response=False)
+		self.assertEqual(sum('UPDATE "conciertos_setlistentry"' in q['sql'] for q in ctx.captured_queries), 3)
+		self.assertEqual(self.setlist(), [('Canción 3', 1), ('Canción 0', 2), ('Canción 1', 3), ('Canción 2', 4)])
+		# hacia abajo, y una posición fuera de rango va al final
+		self.client.post(url, {'song': self.songs[3].pk, 'position': 99, 'section': 'Inicio'})
+		self.assertEqual(self.setlist(), [('Canción 0', 1), ('Canción 1', 2), ('Canción 2', 3), ('Canción 3', 4)])
+		# cambiar a una canción que ya está solo choca por la canción
+		resp = self.client.post(url, {'song': self.songs[0].pk, 'position': 2, 'section': ''})
+		self.assertContains(resp, 'La canción ya está en el setlist')
+		self.assertEqual(self.setlist()[3], ('Canción 3', 4))
+		self.assertEqual(rollups.check_consistency(), [])
+
+	def test_new_song_links_original_artist_like_the_import(self):
+		stones = Artist.objects.create(name='The Rolling Stones', country='Reino Unido', genre='Rock')
+		# sin índice de autocompletado construido: la consulta va a la base de datos
+		autocomplete.reset()
+		url = reverse('song_create_ajax')
+		resp = self.client.post(url, {'title': 'Angie', 'original_artist': '  the rolling STONES '})
+		song = Song.objects.get(pk=resp.json()['song']['id'])
+		self.assertEqual((song.original_artist, song.original_artist_name), (stones, None))
+		resp = self.client.post(url, {'title': 'Otra', 'original_artist': 'Nadie'})
+		song = Song.objects.get(pk=resp.json()['song']['id'])
+		self.assertEqual((song.original_artist, song.original_artist_name), (None, 'Nadie'))
+		entries, _ = setlists.import_setlist(self.concert, setlists.parse('Satisfaction | THE ROLLING STONES'))
+		self.assertEqual(entries[0].song.original_artist, stones)
+
+	def test_add_view_appends_without_position(self):
+		url = reverse('setlistentry_add', args=[self.concert.pk])
+		for song in self.songs[:2]:
+			resp = self.client.post(url, {'song': song.pk, 'position': '', 'section': ''})
+			self.assertRedirects(resp, reverse('concert_setlist', args=[self.concert.pk]))
+		self.assertEqual(self.setlist(), [('Canción 0', 1), ('Canción 1', 2)])
+		resp = self.client.post(url, {'song': self.songs[0].pk, 'position': '', 'section': ''})
+		self.assertContains(resp, 'La canción ya está en el setlist')
+		# una posición ocupada desplaza las siguientes en lugar de rechazarse
+		self.client.post(url, {'song': self.songs[2].pk, 'position': 1, 'section': ''})
+		self.assertEqual(self.setlist(), [('Canción 2', 1), ('Canción 0', 2), ('Canción 1', 3)])
+
+
+class CatalogChoiceTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		autocomplete.reset()
+		self.city = City.objects.create(name='Bogotá', country='Colombia')
+		self.artist = Artist.objects.create(name='Aterciopelados', country='Colombia', genre='Rock')
+
+	def seed(self, n, start=0):
+		for i in range(start, start + n):
+			artist = Artist.objects.create(name=f'Artista {i}', country='Colombia', genre='Rock')
+			Venue.objects.create(name=f'Venue {i}', city=City.objects.create(name=f'Ciudad {i}', country='Colombia'))
+			Tour.objects.create(name=f'Gira {i}', artist=artist)
+
+	def render_queries(self):
+		from .forms import ConcertForm
+		with CaptureQueriesContext(connection) as ctx:
+			html = str(ConcertForm())
+		return html, len(ctx.captured_queries)
+
+	def test_options_are_cached_and_constant(self):
+		self.seed(2)
+		_, few = self.render_queries()
+		self.seed(5, start=2)
+		html, many = self.render_queries()
+		# una consulta por select (con select_related), no una por venue o gira
+		self.assertEqual(few, many)
+		self.assertIn('Venue 6 (Ciudad 6)', html)
+		self.assertIn('Gira 6 - Artista 6', html)
+		self.assertEqual(self.render_queries()[1], 0)
+		# renombrar la ciudad cambia la etiqueta del venue
+		City.objects.filter(name='Ciudad 6').update(name='Medellín')
+		caching.bump(City)
+		self.assertIn('Venue 6 (Medellín)', self.render_queries()[0])
+
+	def test_large_catalog_switches_to_remote_search(self):
+		from .forms import TourForm
+		self.seed(3)
+		with self.settings(CHOICE_REMOTE_THRESHOLD=2):
+			html = str(TourForm(initial={'artist': self.artist.pk}))
+			self.assertIn('data-autocomplete="%s"' % reverse('autocomplete', args=['artist']), html)
+			self.assertIn('Aterciopelados', html)
+			self.assertNotIn('Artista 0', html)
+			# se valida cualquier pk, aunque su opción no se haya pintado
+			other = Artist.objects.get(name='Artista 2')
+			form = TourForm({'artist': other.pk, 'name': 'Gira', 'status': 'planned'})
+			with self.assertNumQueries(1):
+				self.assertEqual(form.fields['artist'].clean(str(other.pk)), other)
+			self.assertTrue(form.is_valid(), form.errors)
 
-# Create your tests here.
+	def test_autocomplete_endpoint(self):
+		self.seed(3)
+		resp = self.client.get(reverse('autocomplete', args=['venue']), {'q': 'venue 1'})
+		self.assertEqual(resp.json()['results'], [{'id': Venue.objects.get(name='Venue 1').pk, 'label': 'Venue 1 (Ciudad 1)'}])
+		self.assertEqual(self.client.get(reverse('autocomplete', args=['fan']), {'q': 'a'}).status_code, 404)
@@ -17,6 +17,8 @@ urlpatterns = [
     path('tours/<int:pk>/delete/', views.tour_delete, name='tour_delete'),
     # setlist
     path('<int:concert_pk>/setlist/add/', views.setlist_entry_add, name='setlistentry_add'),
+    path('<int:concert_pk>/setlist/import/', views.setlist_import, name='setlist_import'),
+    path('<int:concert_pk>/setlist/reorder/', views.setlist_reorder, name='setlist_reorder'),
     path('setlist/song/add/', views.song_create_ajax, name='song_create_ajax'),
     path('setlist/<int:pk>/edit/', views.setlist_entry_edit, name='setlistentry_edit'),
     path('setlist/<int:pk>/delete/', views.setlist_entry_delete, name='setlistentry_delete'),
@@ -4,36 +4,46 @@ from django.views.generic import ListView, CreateView, UpdateView, DetailView
 from django.urls import reverse_lazy
 from .models import Tour, Concert, Song, SetlistEntry
 from django.utils.decorators import method_decorator
-from core.models import Artist
-from .forms import ConcertForm, SetlistEntryForm, TourForm
+from core.models import Artist, City, Venue
+from .forms import ConcertForm, SetlistEntryForm, SetlistImportForm, TourForm
+from . import setlists
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
-from django.db.models import Q, Max, Avg, Count
+from django.db.models import Count, Max
 import json
 from django.views.generic import DetailView
 from django.db import IntegrityError
+from core.pagination import KeysetPaginationMixin
+from core import caching
+from core.conditional import conditional
+from core.caching import CachedListMixin
+from search import engine as search_engine
 # ----- GIRA -----
-class TourListView(ListView):
+@method_decorator(conditional(Tour, Artist, Concert), name='get')
+class TourListView(CachedListMixin, KeysetPaginationMixin, ListView):
     model = Tour
     template_name = 'conciertos/tour_list.html'
     context_object_name = 'tours'
-    queryset = Tour.objects.all().order_by('start_date')
+    # el número de conciertos se anota en la misma consulta (antes era un COUNT por tarjeta)
+    queryset = Tour.objects.select_related('artist').annotate(concert_count=Count('concerts')).order_by('start_date')
+    paginate_by = 24
+    keyset_fields = ('start_date', 'id')
+    # concert_count depende de los conciertos de la gira
+    cache_models = (Tour, Artist, Concert)
 
     def get_queryset(self):
         qs = super().get_queryset()
-        q = self.request.GET.get('query', '').strip()
         status = self.request.GET.get('status', '').strip()
-        # Filtrar por nombre de artista si se proporciona una query
-        if q:
-            # buscar por nombre de artista O nombre de la gira (contiene, insensible a mayúsculas)
-            qs = qs.filter(
-                Q(artist__name__icontains=q) | Q(name__icontains=q)
-            )
         if status:
             qs = qs.filter(status=status)
         return qs
 
+    def get_search_ranking(self):
+        # buscar por nombre de artista o de la gira en el índice de búsqueda (ordenado por relevancia)
+        q = self.request.GET.get('query', '').strip()
+        return search_engine.query('tour', q) if q else None
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         status_field = Tour._meta.get_field('status')
@@ -41,7 +51,8 @@ class TourListView(ListView):
         context['selected_status'] = self.request.GET.get('status', '')
         context['selected_query'] = self.request.GET.get('query', '').strip()
     # computar marcadores de posición para que la cuadrícula mantenga columnas consistentes en pantallas más grandes
-        total = context.get('object_list').count() if context.get('object_list') is not None else 0
+        # (object_list ya es la lista de la página actual: no hace falta otro COUNT)
+        total = len(context.get('object_list') or [])
     # número de columnas en pantallas grandes es 3; computar cuántos espacios vacíos agregar
         remainder = total % 3
         placeholder_count = (3 - remainder) % 3
@@ -61,6 +72,15 @@ class TourDetailView(DetailView):
     model = Tour
     template_name = 'conciertos/tour_detail.html'
     context_object_name = 'tour'
+    queryset = Tour.objects.select_related('artist').annotate(concert_count=Count('concerts'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # primeros conciertos de la gira con artista y venue en la misma consulta
+        context['tour_concerts'] = list(
+            self.object.concerts.select_related('artist', 'venue').order_by('start_datetime')[:6]
+        )
+        return context
 
 
 @method_decorator(staff_member_required, name='dispatch')
@@ -84,31 +104,31 @@ def tour_delete(request, pk):
     return redirect('tour_list')
 
 # ----- CONCIERTO -----
-class ConcertListView(ListView):
+# la página muestra contadores y el estado de interés del fan: Concert.counters_updated_at cubre ambos
+@method_decorator(conditional(Concert, Artist, Tour, Venue, City), name='get')
+class ConcertListView(KeysetPaginationMixin, ListView):
     model = Concert
     template_name = 'conciertos/concert_list.html'
     context_object_name = 'concerts'
-    queryset = Concert.objects.all().order_by('artist__name')
-    
+    # la tarjeta muestra artista, gira, venue y ciudad: todo en un único JOIN
+    queryset = Concert.objects.select_related('artist', 'tour', 'venue__city').order_by('artist__name')
+    paginate_by = 20
+    keyset_fields = ('artist__name', 'id')
+
     def get_queryset(self):
         qs = super().get_queryset()
-        q = self.request.GET.get('query_concerts', '').strip()
         status = self.request.GET.get('status', '').strip()
-        if q:
-            # Buscar por Artista, venue
-            qs = qs.filter(
-                Q(artist__name__icontains=q)
-                | Q(venue__name__icontains=q)
-                | Q(venue__city__name__icontains=q)
-                | Q(venue__city__country__icontains=q)
-            ).order_by('start_datetime')
         # Filtrar por estado si se pasa en la querystring
         if status:
             qs = qs.filter(status=status)
-    # anotar con la calificación promedio y el recuento de calificaciones
-        qs = qs.annotate(avg_rating=Avg('attendees__rating'), ratings_count=Count('attendees__rating'))
+        # la calificación promedio sale de Concert.rating_sum/rating_count (sin JOIN ni agregado)
         return qs
 
+    def get_search_ranking(self):
+        # Buscar por artista, venue, ciudad o país en el índice de búsqueda (ordenado por relevancia)
+        q = self.request.GET.get('query_concerts', '').strip()
+        return search_engine.query('concert', q) if q else None
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Pasar opciones de estado al template (value, label)
@@ -137,21 +157,37 @@ class ConcertListView(ListView):
                 # también proporcionar JSON para la inicialización del lado del cliente
                 context['user_ratings_json'] = json.dumps(user_ratings)
         context['user_interested_ids'] = user_interested_ids
+        # la parte fija de cada tarjeta sale de la caché (una lectura para toda la página);
+        # lo que depende del usuario y los contadores se pintan en el template sin caché
+        cards = caching.cached_fragments(
+            'concert_card', 'conciertos/partials/concert_card.html', context['concerts'],
+            stamp=lambda c: c.updated_at.timestamp(), models=(Artist, Tour, Venue, City), context_name='concert',
+        )
+        for concert in context['concerts']:
+            concert.card_html = cards[concert.pk]
+        # stream SSE de cambios (solo bajo ASGI con LIVE_UPDATES activo); si no, el template hace polling
+        from fans import live
+        context['live_updates'] = live.is_enabled()
         return context
 
 
+def _concert_version(request, pk):
+    return Concert.objects.filter(pk=pk).values_list('updated_at', 'counters_updated_at').first()
+
+
+@method_decorator(conditional(Artist, Tour, Venue, City, row=_concert_version), name='get')
 class ConcertDetailView(DetailView):
     model = Concert
     template_name = 'conciertos/concert_detail.html'
     context_object_name = 'concert'
+    queryset = Concert.objects.select_related('artist', 'tour', 'venue__city')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        concert = self.get_object()
-        # aggregate ratings
-        agg = concert.attendees.filter(rating__isnull=False).aggregate(avg=Avg('rating'), count=Count('pk'))
-        context['avg_rating'] = agg['avg'] or 0
-        context['ratings_count'] = agg['count'] or 0
+        concert = self.object
+        # totales de calificación mantenidos en el propio concierto
+        context['avg_rating'] = concert.avg_rating or 0
+        context['ratings_count'] = concert.rating_count
         # user's rating if any
         user = self.request.user
         user_rating = None
@@ -194,7 +230,7 @@ class SongListView(ListView):
     model = Song
     template_name = 'conciertos/song_list.html'
     context_object_name = 'songs'
-    queryset = Song.objects.all().order_by('title')
+    queryset = Song.objects.select_related('original_artist').order_by('title')
 
 class SongCreateView(CreateView):
     model = Song
@@ -207,6 +243,7 @@ class SetlistEntryListView(ListView):
     model = SetlistEntry
     template_name = 'conciertos/setlistentry_list.html'
     context_object_name = 'setlist_entries'
+    queryset = SetlistEntry.objects.select_related('song__original_artist')
 
 class SetlistEntryCreateView(CreateView):
     model = SetlistEntry
@@ -217,8 +254,8 @@ class SetlistEntryCreateView(CreateView):
 
 def concert_setlist(request, pk):
     """Vista para mostrar las entradas del setlist de un solo concierto."""
-    concert = get_object_or_404(Concert, pk=pk)
-    entries = SetlistEntry.objects.filter(concert=concert).order_by('position')
+    concert = get_object_or_404(Concert.objects.select_related('artist', 'venue'), pk=pk)
+    entries = SetlistEntry.objects.filter(concert=concert).select_related('song__original_artist').order_by('position')
     return render(request, 'conciertos/setlistentry_list.html', {'setlist_entries': entries, 'concert': concert})
 
 
@@ -232,34 +269,71 @@ def setlist_entry_add(request, concert_pk):
     if request.method == 'POST':
         form = SetlistEntryForm(request.POST, concert=concert)
         if form.is_valid():
-            entry = form.save(commit=False)
-            entry.concert = concert
+            data = form.cleaned_data
             try:
-                entry.save()
-            except IntegrityError as err:
-                # Determinar si el conflicto se debe a canción duplicada o posición duplicada
-                # comprobando filas existentes en la base de datos en lugar de analizar mensajes específicos del motor.
-                conflict_song_qs = SetlistEntry.objects.filter(concert=concert, song=entry.song)
-                conflict_pos_qs = SetlistEntry.objects.filter(concert=concert, position=entry.position)
-                # excluirse a sí mismo (no necesario al añadir pero inofensivo)
-                if entry.pk:
-                    conflict_song_qs = conflict_song_qs.exclude(pk=entry.pk)
-                    conflict_pos_qs = conflict_pos_qs.exclude(pk=entry.pk)
-
-                if conflict_song_qs.exists():
-                    form.add_error('song', 'La canción ya está en el setlist para este concierto.')
-                elif conflict_pos_qs.exists():
-                    form.add_error('position', 'Ya existe una canción en esa posición para este concierto.')
-                else:
-                    # Error genérico por defecto
-                    form.add_error(None, 'Error al guardar la entrada del setlist.')
-                artists = Artist.objects.order_by('name')
-                return render(request, 'conciertos/setlistentry_form.html', {'form': form, 'concert': concert, 'artists': artists, 'suggested_position': suggested_position})
+                # sin posición va al final; con posición ocupada, las siguientes se desplazan
+                setlists.append(concert, data['song'], position=data['position'], section=data['section'], is_cover=data['is_cover'])
+            except IntegrityError:
+                # las posiciones ya no chocan: solo puede repetirse la canción
+                form.add_error('song', 'La canción ya está en el setlist para este concierto.')
+                return render(request, 'conciertos/setlistentry_form.html', {'form': form, 'concert': concert, 'suggested_position': suggested_position})
             return redirect('concert_setlist', pk=concert.pk)
     else:
-        form = SetlistEntryForm(concert=concert, initial={'position': suggested_position})
-    artists = Artist.objects.order_by('name')
-    return render(request, 'conciertos/setlistentry_form.html', {'form': form, 'concert': concert, 'artists': artists, 'suggested_position': suggested_position})
+        form = SetlistEntryForm(concert=concert)
+    return render(request, 'conciertos/setlistentry_form.html', {'form': form, 'concert': concert, 'suggested_position': suggested_position})
+
+
+@staff_member_required
+def setlist_import(request, concert_pk):
+    """Importa un setlist completo (texto, CSV o JSON) en una sola transacción; solo staff.
+
+    Con `Accept: application/json` responde JSON en lugar de redirigir o
+    volver a pintar el formulario.
+    """
+    concert = get_object_or_404(Concert.objects.select_related('artist', 'venue'), pk=concert_pk)
+    wants_json = request.headers.get('Accept', '').startswith('application/json')
+    line_errors = []
+    if request.method == 'POST':
+        form = SetlistImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                lines = setlists.parse(form.cleaned_data['content'], form.cleaned_data['format'])
+                entries, new_songs = setlists.import_setlist(concert, lines)
+            except setlists.ImportErrors as exc:
+                line_errors = exc.errors
+            else:
+                if wants_json:
+                    return JsonResponse({'success': True, 'entries': len(entries), 'songs_created': len(new_songs)})
+                return redirect('concert_setlist', pk=concert.pk)
+        if wants_json:
+            errors = [{'line': number, 'error': message} for number, message in line_errors]
+            return JsonResponse({'success': False, 'errors': errors, 'form_errors': form.errors}, status=400)
+    else:
+        form = SetlistImportForm()
+    return render(request, 'conciertos/setlist_import.html', {'form': form, 'concert': concert, 'line_errors': line_errors})
+
+
+@staff_member_required
+@require_http_methods(['POST'])
+def setlist_reorder(request, concert_pk):
+    """Reordena el setlist completo (solo staff).
+
+    Espera POST con `order`: los ids de todas las entradas en el nuevo orden,
+    separados por comas o como lista JSON en el cuerpo ({"order": [...]}).
+    """
+    concert = get_object_or_404(Concert, pk=concert_pk)
+    try:
+        if request.content_type == 'application/json':
+            order = [int(pk) for pk in json.loads(request.body)['order']]
+        else:
+            order = [int(pk) for pk in request.POST.get('order', '').split(',') if pk.strip()]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'errors': {'order': 'Orden inválido.'}}, status=400)
+    try:
+        setlists.reorder(concert, order)
+    except ValueError as exc:
+        return JsonResponse({'success': False, 'errors': {'order': str(exc)}}, status=400)
+    return JsonResponse({'success': True, 'order': order})
 
 
 @staff_member_required
@@ -270,31 +344,20 @@ def setlist_entry_edit(request, pk):
     if request.method == 'POST':
         form = SetlistEntryForm(request.POST, instance=entry, concert=concert)
         if form.is_valid():
+            data = form.cleaned_data
             try:
-                form.save()
-            except IntegrityError as err:
-                # determinar el tipo de conflicto comprobando filas existentes
-                inst = form.instance
-                conflict_song_qs = SetlistEntry.objects.filter(concert=concert, song=inst.song).exclude(pk=inst.pk)
-                conflict_pos_qs = SetlistEntry.objects.filter(concert=concert, position=inst.position).exclude(pk=inst.pk)
-                if conflict_song_qs.exists():
-                    form.add_error('song', 'La canción ya está en el setlist para este concierto.')
-                elif conflict_pos_qs.exists():
-                    form.add_error('position', 'Ya existe una canción en esa posición para este concierto.')
-                else:
-                    form.add_error(None, 'Error al guardar la entrada del setlist.')
-                artists = Artist.objects.order_by('name')
-                # sugeririr la siguiente posición disponible
-                max_pos = SetlistEntry.objects.filter(concert=concert).aggregate(Max('position'))['position__max'] or 0
-                suggested_position = max_pos + 1
-                return render(request, 'conciertos/setlistentry_form.html', {'form': form, 'concert': concert, 'entry': entry, 'artists': artists, 'suggested_position': suggested_position})
-            return redirect('concert_setlist', pk=concert.pk)
+                # cambiar de posición desplaza las entradas de en medio (conciertos/setlists.py)
+                setlists.move(entry, data['position'], song=data['song'], section=data['section'], is_cover=data['is_cover'])
+            except IntegrityError:
+                # las posiciones ya no chocan: solo puede repetirse la canción
+                form.add_error('song', 'La canción ya está en el setlist para este concierto.')
+            else:
+                return redirect('concert_setlist', pk=concert.pk)
     else:
         form = SetlistEntryForm(instance=entry, concert=concert)
-    artists = Artist.objects.order_by('name')
     max_pos = SetlistEntry.objects.filter(concert=concert).aggregate(Max('position'))['position__max'] or 0
     suggested_position = max_pos + 1
-    return render(request, 'conciertos/setlistentry_form.html', {'form': form, 'concert': concert, 'entry': entry, 'artists': artists, 'suggested_position': suggested_position})
+    return render(request, 'conciertos/setlistentry_form.html', {'form': form, 'concert': concert, 'entry': entry, 'suggested_position': suggested_position})
 
 
 @staff_member_required
@@ -337,15 +400,14 @@ def song_create_ajax(request):
     if errors:
         return JsonResponse({'success': False, 'errors': errors}, status=400)
 
-    # Intentar resolver original_artist a una instancia de Artist por nombre exacto; si no se encuentra,
+    # Intentar resolver original_artist a una instancia de Artist por nombre; si no se encuentra,
     # almacenar el nombre proporcionado en `original_artist_name` (no creamos nuevas filas en Artist).
     artist_obj = None
     artist_name_to_store = None
     if original_artist:
-        try:
-            artist_obj = Artist.objects.get(name__iexact=original_artist)
-        except Artist.DoesNotExist:
-            artist_obj = None
+        # misma regla que la importación de setlists: nombre exacto sin distinguir mayúsculas
+        artist_obj = setlists.resolve_artists([original_artist]).get(original_artist.strip().lower())
+        if artist_obj is None:
             artist_name_to_store = original_artist
 
     song = Song.objects.create(
@@ -1,19 +1,28 @@
 from django.contrib import admin
+from .counts import EstimatedCountPaginator
 from .models import Artist, City, Venue
 
 
+class EstimatedCountAdmin(admin.ModelAdmin):
+    """Changelist sin COUNT(*) de la tabla completa: usa el conteo estimado (core/counts.py)."""
+    paginator = EstimatedCountPaginator
+    # sin el "N en total" junto a los resultados filtrados, que es otro COUNT(*)
+    show_full_result_count = False
+
+
 # Register your models here.
 @admin.register(Artist)
-class ArtistAdmin(admin.ModelAdmin):
+class ArtistAdmin(EstimatedCountAdmin):
     list_display = ('name', 'country', 'debut_year', 'genre')
     search_fields = ('name', 'genre')
 
 @admin.register(City)
-class CityAdmin(admin.ModelAdmin):
+class CityAdmin(EstimatedCountAdmin):
     list_display = ('name', 'country')
     search_fields = ('name',)
 
 @admin.register(Venue)
-class VenueAdmin(admin.ModelAdmin):
+class VenueAdmin(EstimatedCountAdmin):
     list_display = ('name', 'city', 'capacity')
+    list_select_related = ('city',)
     search_fields = ('name',)
@@ -0,0 +1,200 @@
+"""
+Benchmark de vistas: latencia, consultas y memoria por endpoint.
+
+Recorre todas las URL con nombre del proyecto (salvo las de SKIP), las pide
+con el cliente de test de Django sobre datos de generate_dataset a varias
+escalas y compara los resultados con una línea base versionada en
+benchmarks/baseline.json. Se ejecuta con `manage.py benchmark`.
+"""
+import math
+import platform
+import time
+import tracemalloc
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+# tamaño -> factor de escala de generate_dataset
+SIZES = {'small': 0.01, 'medium': 0.1, 'large': 1.0}
+
+# vistas que no se miden: solo POST o con efectos, y streams sin fin
+SKIP = {
+    'logout', 'toggle_interest', 'rate_concert', 'song_create_ajax', 'concert_stream',
+    'concert_delete', 'tour_delete', 'artist_delete', 'setlistentry_delete',
+    'setlist_reorder',
+}
+
+DEFAULT_TOLERANCE = {
+    # p95 actual <= p95 base * ratio + holgura (la holgura evita falsos positivos en vistas de pocos ms)
+    'latency_ratio': 1.5,
+    'latency_slack_ms': 10,
+    # consultas de más permitidas
+    'queries': 0,
+    'memory_ratio': 1.5,
+    'memory_slack_kib': 256,
+}
+
+
+def _pk_model(url_name):
+    from conciertos.models import Concert, SetlistEntry, Tour
+    from core.models import Artist
+
+    models = {'tour': Tour, 'concert': Concert, 'artist': Artist, 'setlistentry': SetlistEntry}
+    return models.get(url_name.split('_')[0])
+
+
+def _sample_pk(model):
+    from conciertos.models import Concert
+
+    # el concierto con más interés: el caso más pesado de detalle/setlist
+    qs = model.objects.order_by('-interest_count') if model is Concert else model.objects.order_by('pk')
+    return qs.values_list('pk', flat=True).first()
+
+
+def discover_endpoints(urlconf=None):
+    """[(nombre, [kwargs de la ruta]), ...] de todas las URL con nombre, sin admin ni SKIP."""
+    endpoints = []
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.namespace != 'admin':
+                    walk(pattern.url_patterns)
+            elif pattern.name and pattern.name not in SKIP:
+                endpoints.append((pattern.name, list(getattr(pattern.pattern, 'converters', {}))))
+
+    walk(get_resolver(urlconf).url_patterns)
+    return endpoints
+
+
+def build_url(name, kwarg_names, chart='income'):
+    """URL concreta para el endpoint, con ids de objetos existentes; None si no hay datos."""
+    from conciertos.models import Concert
+
+    kwargs = {}
+    for kwarg in kwarg_names:
+        if kwarg == 'chart':
+            kwargs[kwarg] = chart
+            continue
+        model = Concert if kwarg in ('concert_id', 'concert_pk') else _pk_model(name)
+        pk = _sample_pk(model) if model else None
+        if pk is None:
+            return None
+        kwargs[kwarg] = pk
+    url = reverse(name, kwargs=kwargs)
+    if name == 'interest_counts':
+        ids = Concert.objects.order_by('-interest_count').values_list('pk', flat=True)[:50]
+        url += '?ids=' + ','.join(map(str, ids))
+    return url
+
+
+def endpoint_urls(name, kwarg_names):
+    """[(clave del resultado, url)] del endpoint.
+
+    Las gráficas del dashboard de analytics hacen todo su trabajo en
+    /analytics/charts/<chart>/: se mide cada una como `analytics_chart:<chart>`.
+    """
+    if 'chart' in kwarg_names:
+        from analytics.views import CHARTS
+
+        urls = [(f'{name}:{chart}', build_url(name, kwarg_names, chart=chart)) for chart in CHARTS]
+    else:
+        urls = [(name, build_url(name, kwarg_names))]
+    return [(key, url) for key, url in urls if url is not None]
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def measure(client, url, iterations):
+    """Pide `url` varias veces y devuelve p50/p95 (ms), consultas, pico de memoria (KiB) y estado."""
+    try:
+        client.get(url)  # calentar cachés e índices en memoria
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        # contar ya: la siguiente petición vacía connection.queries (reset_queries en request_started)
+        query_count = len(queries.captured_queries)
+        # tracemalloc ralentiza la petición: se mide aparte de la latencia
+        tracemalloc.start()
+        try:
+            client.get(url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as exc:
+        return {'status': 'error', 'error': f'{type(exc).__name__}: {exc}'}
+    return {
+        'status': response.status_code,
+        'p50_ms': round(_percentile(timings, 0.5), 2),
+        'p95_ms': round(_percentile(timings, 0.95), 2),
+        'queries': query_count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_size(client, iterations, endpoints=None, stdout=None):
+    results = {}
+    seen = set()
+    for name, kwarg_names in endpoints or discover_endpoints():
+        for key, url in endpoint_urls(name, kwarg_names):
+            # varias URL con nombre pueden resolver a la misma ruta ('' -> dashboard y home)
+            if url in seen:
+                continue
+            seen.add(url)
+            results[key] = {'url': url, **measure(client, url, iterations)}
+            if stdout:
+                r = results[key]
+                stdout.write(f'  {key:<24} {r["status"]!s:>5} p50={r.get("p50_ms", "-")}ms p95={r.get("p95_ms", "-")}ms queries={r.get("queries", "-")}')
+    return results
+
+
+def metadata(iterations):
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'iterations': iterations,
+    }
+
+
+def compare(results, baseline):
+    """Regresiones de `results` frente a `baseline`: lista de mensajes (vacía si todo está en tolerancia)."""
+    tolerances = baseline.get('tolerances', {})
+    regressions = []
+    for size, endpoints in baseline.get('results', {}).items():
+        current = results.get(size)
+        if current is None:
+            continue
+        for name, base in endpoints.items():
+            now = current.get(name)
+            if now is None or base.get('status') == 'error':
+                continue
+            # 'analytics_chart:income' toma las tolerancias de 'analytics_chart' y luego las suyas
+            tol = {
+                **DEFAULT_TOLERANCE, **tolerances.get('default', {}),
+                **tolerances.get(name.split(':')[0], {}), **tolerances.get(name, {}),
+            }
+            label = f'{size}/{name}'
+            if now.get('status') != base.get('status'):
+                regressions.append(f'{label}: estado {base.get("status")} -> {now.get("status")}')
+                continue
+            limit = base['p95_ms'] * tol['latency_ratio'] + tol['latency_slack_ms']
+            if now['p95_ms'] > limit:
+                regressions.append(f'{label}: p95 {now["p95_ms"]}ms > {limit:.1f}ms (base {base["p95_ms"]}ms)')
+            if now['queries'] > base['queries'] + tol['queries']:
+                regressions.append(f'{label}: {now["queries"]} consultas (base {base["queries"]})')
+            limit = base['peak_kib'] * tol['memory_ratio'] + tol['memory_slack_kib']
+            if now['peak_kib'] > limit:
+                regressions.append(f'{label}: memoria {now["peak_kib"]}KiB > {limit:.0f}KiB (base {base["peak_kib"]}KiB)')
+    return regressions
@@ -0,0 +1,102 @@
+"""
+Carga masiva de filas por lotes.
+
+BulkWriter acumula filas (dicts por attname) y las inserta cada `batch_size`
+con bulk_create, o con COPY ... FROM STDIN cuando la base es PostgreSQL y se
+pide `use_copy`. Las filas pasan tal cual: sin signals ni save(), así que
+quien cargue datos así debe recalcular después los contadores, agregados e
+índices de búsqueda que dependen de ellos.
+"""
+import datetime
+import io
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.db import connection
+from django.utils import timezone
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class BulkWriter:
+    def __init__(self, model, batch_size=5000, use_copy=False):
+        self.model = model
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.fields = [f for f in model._meta.concrete_fields]
+        self.timestamps = [f.attname for f in self.fields if getattr(f, 'auto_now_add', False) or getattr(f, 'auto_now', False)]
+        self.rows = []
+        self.total = 0
+
+    def add(self, **values):
+        for name in self.timestamps:
+            values.setdefault(name, timezone.now())
+        self.rows.append(values)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            self._copy(self.rows)
+        else:
+            with explicit_timestamps(self.model):
+                self.model.objects.bulk_create([self.model(**row) for row in self.rows], batch_size=self.batch_size)
+        self.total += len(self.rows)
+        self.rows = []
+
+    def _copy(self, rows):
+        buf = io.StringIO()
+        for row in rows:
+            values = []
+            for field in self.fields:
+                value = row[field.attname] if field.attname in row else field.get_default()
+                values.append(_copy_value(field.get_db_prep_value(value, connection)))
+            buf.write('\t'.join(values))
+            buf.write('\n')
+        buf.seek(0)
+        columns = ', '.join(connection.ops.quote_name(f.column) for f in self.fields)
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buf)
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Respeta los valores dados a campos auto_now_add/auto_now durante la carga."""
+    fields = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now_add', False) or getattr(f, 'auto_now', False)]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def next_pk(model):
+    """Primer pk libre, para asignar ids explícitos y enlazar filas sin releerlas."""
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+def reset_sequences(*models):
+    """Tras insertar ids explícitos, ajustar las secuencias de PostgreSQL al máximo."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
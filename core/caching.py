@@ -0,0 +1,139 @@
+"""
+Caché de resultados de consultas con invalidación por versión de modelo.
+
+Cada modelo del catálogo tiene una versión guardada en la caché; los signals
+de core/signals.py la incrementan en cada post_save/post_delete. Las claves de
+los resultados incluyen las versiones de los modelos de los que dependen, así
+que un cambio no borra nada: simplemente deja de encontrarse la entrada vieja,
+que acaba saliendo por LRU o por timeout.
+
+La caché es la 'default' de settings.CACHES: LocMemCache (LRU por proceso) en
+desarrollo; con varios workers debe apuntarse CACHE_BACKEND a un backend
+compartido (Redis, Memcached) para que todos vean los mismos incrementos.
+Los aciertos y fallos se publican en /metrics (encore_cache_requests_total).
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import metrics
+
+# segundos que se conserva un resultado aunque no cambie nada
+DEFAULT_TIMEOUT = 300
+# los fragmentos llevan la versión en la clave: pueden vivir mucho más
+FRAGMENT_TIMEOUT = 24 * 3600
+
+
+def _version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+
+def _initial_version():
+    # si la caché expulsa la clave de versión, el nuevo valor nunca coincide con uno ya usado
+    return time.time_ns()
+
+
+def model_versions(*models):
+    """Versión actual de cada modelo, en una sola ida a la caché."""
+    keys = [_version_key(m) for m in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _bump(model):
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def bump(*models):
+    """Invalida los resultados que dependen de `models`.
+
+    Se incrementa ya y otra vez al confirmar la transacción: una petición que
+    lea entre el save() y el commit guardaría datos viejos con la versión nueva.
+    """
+    for model in models:
+        _bump(model)
+        transaction.on_commit(lambda model=model: _bump(model))
+
+
+def bump_all():
+    """Invalida todo el catálogo; para cargas masivas que no disparan signals."""
+    from .signals import CATALOG_MODELS
+    bump(*CATALOG_MODELS)
+
+
+def cached(name, key, models, compute, timeout=DEFAULT_TIMEOUT):
+    """Devuelve compute() desde la caché si ninguno de `models` ha cambiado."""
+    versions = '.'.join(str(v) for v in model_versions(*models))
+    digest = hashlib.md5(str(key).encode()).hexdigest()
+    cache_key = f'{name}:{versions}:{digest}'
+    value = cache.get(cache_key)
+    metrics.record_cache(name, hit=value is not None)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+def cached_fragments(name, template_name, objects, stamp, models=(), context_name='object', timeout=FRAGMENT_TIMEOUT):
+    """HTML de `template_name` para cada objeto, {pk: html}, leyendo la caché en una sola ida.
+
+    La clave de cada fragmento lleva `stamp(obj)` (p. ej. updated_at) y las
+    versiones de `models`, los modelos relacionados que también se pintan. Solo
+    se renderizan los que faltan. El template no debe depender del usuario ni
+    de la petición (csrf, permisos): eso se pinta fuera, sin caché.
+    """
+    versions = '.'.join(str(v) for v in model_versions(*models))
+    keys = {obj.pk: f'fragment:{name}:{versions}:{obj.pk}:{stamp(obj)}' for obj in objects}
+    found = cache.get_many(keys.values())
+    rendered, missing = {}, {}
+    for obj in objects:
+        key = keys[obj.pk]
+        html = found.get(key)
+        metrics.record_cache(f'fragment:{name}', hit=html is not None)
+        if html is None:
+            html = missing[key] = render_to_string(template_name, {context_name: obj})
+        rendered[obj.pk] = mark_safe(html)
+    if missing:
+        cache.set_many(missing, timeout)
+    return rendered
+
+
+class CachedListMixin:
+    """Cachea el resultado de la consulta de un ListView (la página, si pagina).
+
+    `cache_models`: modelos cuyo cambio invalida la lista. La clave incluye la
+    URL completa, así que filtros, búsqueda y cursor tienen su propia entrada.
+    """
+    cache_models = ()
+    cache_timeout = DEFAULT_TIMEOUT
+
+    def get_cache_name(self):
+        return f'list:{type(self).__name__}'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_paginate_by(queryset):
+            # se cachea la página en paginate_queryset
+            return queryset
+        return cached(
+            self.get_cache_name(), self.request.get_full_path(), self.cache_models,
+            lambda: list(queryset), self.cache_timeout,
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        return cached(
+            self.get_cache_name(), self.request.get_full_path(), self.cache_models,
+            lambda: super(CachedListMixin, self).paginate_queryset(queryset, page_size), self.cache_timeout,
+        )
@@ -0,0 +1,144 @@
+"""
+Campos de selección de modelos que escalan con el tamaño del catálogo.
+
+`CatalogChoiceField` es un ModelChoiceField sobre una de las entidades de
+SOURCES:
+
+- con pocas filas (hasta CHOICE_REMOTE_THRESHOLD) pinta un <select> completo
+  cuyas opciones [(pk, etiqueta)] se guardan con core/caching.py: una consulta
+  con select_related cuando cambia la versión de los modelos de la entidad y
+  ninguna después;
+- con más filas, `CatalogSelect` pinta solo la opción elegida y un buscador
+  que pide opciones a /api/autocomplete/<entidad>/.
+
+La decisión se guarda junto con las opciones: la consulta trae como mucho
+threshold + 1 filas y, si llegan todas, se anota el modo remoto en lugar de la
+lista. Validar sigue siendo el get(pk=...) de ModelChoiceField.
+"""
+import copy
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from django.urls import reverse
+
+from . import caching
+
+# entidad -> (modelo, select_related, campo de nombre, modelos que cambian la etiqueta)
+SOURCES = {
+    'artist': ('core.Artist', (), 'name', ('core.Artist',)),
+    'city': ('core.City', (), 'name', ('core.City',)),
+    'venue': ('core.Venue', ('city',), 'name', ('core.Venue', 'core.City')),
+    'tour': ('conciertos.Tour', ('artist',), 'name', ('conciertos.Tour', 'core.Artist')),
+    'song': ('conciertos.Song', (), 'title', ('conciertos.Song',)),
+}
+
+# marca de "demasiadas filas" en la caché (None significaría fallo de caché)
+_REMOTE = 'remote'
+
+
+def _threshold():
+    return getattr(settings, 'CHOICE_REMOTE_THRESHOLD', 500)
+
+
+def source_queryset(entity):
+    """Queryset de la entidad con sus select_related, ordenado por nombre."""
+    label, related, name, _ = SOURCES[entity]
+    qs = apps.get_model(label)._default_manager.order_by(name, 'pk')
+    return qs.select_related(*related) if related else qs
+
+
+def cache_models(entity):
+    return [apps.get_model(label) for label in SOURCES[entity][3]]
+
+
+class CatalogChoiceIterator(ModelChoiceIterator):
+    """Opciones desde la caché del campo; en modo remoto, solo la vacía."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from self.field.options() or ()
+
+    def __len__(self):
+        return len(self.field.options() or ()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.options())
+
+
+class CatalogSelect(forms.Select):
+    """Select que, con el campo en modo remoto, pasa a buscar las opciones en el servidor."""
+    remote_template_name = 'core/widgets/remote_select.html'
+
+    def _field(self):
+        return getattr(self.choices, 'field', None)
+
+    def is_remote(self):
+        field = self._field()
+        return field is not None and field.options() is None
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        if self.is_remote():
+            context['widget']['attrs']['data-autocomplete'] = reverse('autocomplete', args=[self._field().entity])
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        if not self.is_remote():
+            return super().optgroups(name, value, attrs)
+        # solo la opción elegida, con una consulta por pk
+        field = self._field()
+        widget = copy.copy(self)
+        widget.choices = [('', field.empty_label or '')] + field.selected_options(value)
+        return super(CatalogSelect, widget).optgroups(name, value, attrs)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        if not self.is_remote():
+            return super().render(name, value, attrs, renderer)
+        return self._render(self.remote_template_name, self.get_context(name, value, attrs), renderer)
+
+
+class CatalogChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField de una entidad de SOURCES; ver el docstring del módulo."""
+    iterator = CatalogChoiceIterator
+    widget = CatalogSelect
+
+    def __init__(self, entity, **kwargs):
+        self.entity = entity
+        self._options = None
+        super().__init__(source_queryset(entity), **kwargs)
+
+    def __deepcopy__(self, memo):
+        result = super().__deepcopy__(memo)
+        # cada formulario lee la caché una vez
+        result._options = None
+        return result
+
+    def options(self):
+        """[(pk, etiqueta)] de todo el catálogo, o None si supera el umbral."""
+        if self._options is None:
+            threshold = _threshold()
+
+            def compute():
+                objects = list(self.queryset[:threshold + 1])
+                if len(objects) > threshold:
+                    return _REMOTE
+                return [(obj.pk, self.label_from_instance(obj)) for obj in objects]
+
+            self._options = caching.cached(
+                f'choices:{self.entity}', (str(self.queryset.query), threshold), cache_models(self.entity), compute,
+            )
+        return None if self._options == _REMOTE else self._options
+
+    def selected_options(self, values):
+        pks = [v for v in values if v not in ('', None)]
+        if not pks:
+            return []
+        try:
+            return [(obj.pk, self.label_from_instance(obj)) for obj in self.queryset.filter(pk__in=pks)]
+        except (ValueError, TypeError, ValidationError):
+            # valor enviado que no es un pk: el error ya lo da la validación
+            return []
@@ -0,0 +1,126 @@
+"""
+GET condicional (ETag / Last-Modified) a partir de versiones por tabla.
+
+La versión de una tabla es el máximo de sus columnas de versión (`updated_at`,
+o las que declare el modelo en VERSION_FIELDS; todas indexadas) junto con la
+última vez que se borraron filas (TableDeletion). Todas las tablas de las que
+depende una página se consultan en una sola sentencia, así que responder 304
+cuesta una consulta de índices en lugar de la consulta principal y el render.
+
+Uso: decorar el método get de la vista con
+
+    @method_decorator(conditional(Concert, Artist), name='get')
+
+Los caminos que escriben sin save() deben mover updated_at a mano (Now()),
+como hacen fans/counters.py y analytics/rollups.py. Las fechas se toman al
+escribir, no al confirmar: una transacción que confirme después de otra más
+reciente no mueve el máximo. Las escrituras de la aplicación son transacciones
+cortas; las cargas largas deben terminar con un cambio (p. ej. rebuild_rollups).
+"""
+import datetime
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import condition
+
+from .models import TableDeletion
+
+
+def version_fields(model):
+    return getattr(model, 'VERSION_FIELDS', ('updated_at',))
+
+
+def _as_datetime(value):
+    # SQL crudo en SQLite devuelve texto; PostgreSQL, datetime con zona
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    value = parse_datetime(value)
+    if value is not None and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, datetime.timezone.utc)
+    return value
+
+
+def table_versions(*models):
+    """{modelo: fecha del último cambio o borrado (None si nunca)}, en una sola consulta."""
+    qn = connection.ops.quote_name
+    parts, params = [], []
+    for model in models:
+        for name in version_fields(model):
+            column = model._meta.get_field(name).column
+            parts.append(f'SELECT %s, MAX({qn(column)}) FROM {qn(model._meta.db_table)}')
+            params.append(model._meta.label_lower)
+    labels = [model._meta.label_lower for model in models]
+    opts = TableDeletion._meta
+    parts.append(
+        f'SELECT {qn(opts.get_field("model").column)}, {qn(opts.get_field("deleted_at").column)} '
+        f'FROM {qn(opts.db_table)} WHERE {qn(opts.get_field("model").column)} IN ({", ".join(["%s"] * len(labels))})'
+    )
+    params.extend(labels)
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(parts), params)
+        rows = cursor.fetchall()
+
+    latest = dict.fromkeys(labels)
+    for label, value in rows:
+        value = _as_datetime(value)
+        if value is not None and (latest[label] is None or value > latest[label]):
+            latest[label] = value
+    return {model: latest[model._meta.label_lower] for model in models}
+
+
+def record_deletion(model):
+    """Anota que se borraron filas de `model` (la llama core/signals.py)."""
+    TableDeletion.objects.update_or_create(model=model._meta.label_lower, defaults={'deleted_at': timezone.now()})
+
+
+def conditional(*models, row=None):
+    """Decorador de vistas GET: ETag fuerte y Last-Modified según las versiones de `models`.
+
+    `row(request, *args, **kwargs)` devuelve versiones propias del objeto de la
+    página (p. ej. su updated_at) para no depender de toda su tabla. El ETag
+    incluye el usuario y su cookie CSRF: las páginas muestran datos de sesión.
+    Las versiones quedan en `request.conditional_versions`; la vista puede
+    usarlas como parte de una clave de caché.
+    """
+    def versions(request, *args, **kwargs):
+        # condition() pide ETag y fecha por separado: una sola consulta por petición
+        if not hasattr(request, 'conditional_versions'):
+            stamps = list(table_versions(*models).values())
+            if row is not None:
+                stamps.extend(row(request, *args, **kwargs) or [None])
+            request.conditional_versions = stamps
+        return request.conditional_versions
+
+    def etag(request, *args, **kwargs):
+        user = request.user
+        parts = [
+            settings.ETAG_SALT,
+            user.pk if user.is_authenticated else '',
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ]
+        parts.extend(v.isoformat() if v is not None else '' for v in versions(request, *args, **kwargs))
+        return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        stamps = [v for v in versions(request, *args, **kwargs) if isinstance(v, datetime.datetime)]
+        return max(stamps) if stamps else None
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # que navegador y CDN revaliden siempre; si hay sesión, que no compartan la copia
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
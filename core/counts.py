@@ -0,0 +1,134 @@
+"""
+Conteos estimados de tablas completas para cifras de cabecera y el admin.
+
+Un COUNT(*) sin filtro recorre toda la tabla en PostgreSQL. Aquí se lee una
+estimación barata:
+
+- PostgreSQL: `pg_class.reltuples`, que mantienen VACUUM/ANALYZE/autovacuum.
+- Otras bases: filas de RowCount que los signals de este módulo actualizan en
+  cada alta y baja de COUNTED_MODELS. Los caminos masivos (bulk_create,
+  QuerySet.delete de muchas filas) deben llamar a `add()` o terminar con
+  `refresh()`.
+
+Si la estimación queda por debajo de ESTIMATED_COUNT_THRESHOLD se cuenta de
+verdad: en tablas pequeñas es barato y la estimación es la más imprecisa.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import cached_property
+
+from .models import RowCount
+
+# tablas grandes con conteo mantenido fuera de PostgreSQL (las del admin y el dashboard)
+COUNTED_MODELS = (
+    'core.Artist', 'core.City', 'core.Venue',
+    'conciertos.Tour', 'conciertos.Concert', 'conciertos.Song', 'conciertos.SetlistEntry',
+    'fans.Fan', 'fans.Interest', 'fans.Attendance',
+)
+
+
+def _counted_labels():
+    return {label.lower() for label in COUNTED_MODELS}
+
+
+def _threshold():
+    return getattr(settings, 'ESTIMATED_COUNT_THRESHOLD', 10000)
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _postgres_estimates(models):
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT relname, reltuples FROM pg_class WHERE oid IN (%s)' % ', '.join(['to_regclass(%s)'] * len(tables)),
+            tables,
+        )
+        found = dict(cursor.fetchall())
+    # reltuples = -1: la tabla aún no se ha analizado
+    return {model: int(found[model._meta.db_table]) for model in models if found.get(model._meta.db_table, -1) >= 0}
+
+
+def _counter_estimates(models):
+    found = dict(RowCount.objects.filter(model__in=[_label(m) for m in models]).values_list('model', 'rows'))
+    return {model: found[_label(model)] for model in models if _label(model) in found}
+
+
+def estimate_many(*models):
+    """{modelo: filas aproximadas}, con una consulta para todas las estimaciones."""
+    if connection.vendor == 'postgresql':
+        estimates = _postgres_estimates(models)
+    else:
+        estimates = _counter_estimates(models)
+    result = {}
+    for model in models:
+        rows = estimates.get(model)
+        if rows is None or rows < _threshold():
+            exact = model._default_manager.count()
+            if rows is None and connection.vendor != 'postgresql' and _label(model) in _counted_labels():
+                # primera lectura: a partir de aquí lo mantienen los signals
+                RowCount.objects.get_or_create(model=_label(model), defaults={'rows': exact})
+            rows = exact
+        result[model] = rows
+    return result
+
+
+def estimate(model):
+    return estimate_many(model)[model]
+
+
+def refresh(*models):
+    """Recalcula los contadores de `models` (todos si no se indica) tras una carga masiva."""
+    if connection.vendor == 'postgresql':
+        return
+    from django.apps import apps
+    for model in models or [apps.get_model(label) for label in COUNTED_MODELS]:
+        RowCount.objects.update_or_create(model=_label(model), defaults={'rows': model._default_manager.count()})
+
+
+def add(model, delta):
+    """Suma `delta` al contador de `model`; para altas y bajas que no disparan signals."""
+    if not delta or connection.vendor == 'postgresql':
+        return
+    # si la fila no existe aún no se crea: la primera lectura cuenta de verdad
+    RowCount.objects.filter(model=_label(model)).update(rows=F('rows') + delta)
+
+
+def _on_save(sender, created, raw=False, **kwargs):
+    if created:
+        add(sender, 1)
+
+
+def _on_delete(sender, **kwargs):
+    add(sender, -1)
+
+
+def connect():
+    """Conecta los signals de los contadores; en PostgreSQL no hacen falta (lo llama CoreConfig.ready)."""
+    if connection.vendor == 'postgresql':
+        return
+    from django.apps import apps
+    for label in COUNTED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_on_save, sender=model, dispatch_uid=f'rowcount-save-{label}')
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f'rowcount-delete-{label}')
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator que usa el conteo estimado cuando la lista no tiene filtros.
+
+    Con una estimación algo alta las últimas páginas pueden salir vacías; el
+    admin lo tolera (redirige a la primera página con ?e=1).
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.distinct and not query.is_sliced:
+            return estimate(self.object_list.model)
+        return super().count
@@ -0,0 +1,103 @@
+"""
+Consultas calientes y comprobación de sus planes de ejecución.
+
+Cada consulta registrada con @hot_query devuelve el queryset tal como lo lanza
+la aplicación; `sequential_scans()` ejecuta EXPLAIN y devuelve las tablas que
+se recorren enteras sin índice. Los tests (core/tests.py) fallan si alguna
+consulta registrada vuelve a un recorrido secuencial.
+
+En PostgreSQL se desactiva enable_seqscan durante el EXPLAIN: con pocas filas
+el planificador prefiere el Seq Scan aunque exista el índice, y lo que se
+quiere comprobar es que el índice *sirve* para la consulta.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+HOT_QUERIES = {}
+
+_PG_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+_SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)')
+
+
+def hot_query(name):
+    def register(func):
+        HOT_QUERIES[name] = func
+        return func
+    return register
+
+
+def sequential_scans(queryset):
+    """Tablas recorridas sin índice en el plan de `queryset`."""
+    tables = set(connection.introspection.table_names())
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        return sorted(set(_PG_SEQ_SCAN.findall(plan)) & tables)
+    plan = queryset.explain()
+    scans = set()
+    for line in plan.splitlines():
+        match = _SQLITE_SCAN.search(line)
+        # "SCAN t USING [COVERING] INDEX" recorre el índice, no la tabla
+        if match and 'USING' not in line and match.group(1) in tables:
+            scans.add(match.group(1))
+    return sorted(scans)
+
+
+@hot_query('dashboard_upcoming_concerts')
+def upcoming_concerts():
+    from conciertos.models import Concert
+    return (
+        Concert.objects.filter(status='scheduled', start_datetime__gte=timezone.now())
+        .select_related('artist', 'venue')
+        .order_by('start_datetime')[:6]
+    )
+
+
+@hot_query('dashboard_recent_interests')
+def recent_interests():
+    from fans.models import Interest
+    return Interest.objects.select_related('fan', 'concert__artist', 'concert__venue').order_by('-created_at')[:3]
+
+
+@hot_query('ratings_by_concert')
+def ratings_by_concert():
+    from fans.models import Attendance
+    return (
+        Attendance.objects.filter(rating__isnull=False)
+        .values('concert_id').annotate(total=Sum('rating'), n=Count('pk')).order_by()
+    )
+
+
+@hot_query('plays_by_song')
+def plays_by_song():
+    from conciertos.models import SetlistEntry
+    return SetlistEntry.objects.values('song_id').annotate(n=Count('pk')).order_by()
+
+
+@hot_query('analytics_expected_concerts')
+def expected_concerts():
+    from analytics import rollups
+    return rollups.top_expected_concerts()
+
+
+@hot_query('setlist_import_songs')
+def setlist_import_songs():
+    # conciertos/setlists.py: _resolve_songs
+    from django.db.models.functions import Lower
+    from conciertos.models import Song
+    return (
+        Song.objects.annotate(title_key=Lower('title')).filter(title_key__in=['intro', 'outro'])
+        .select_related('original_artist').order_by('pk')
+    )
+
+
+@hot_query('setlist_import_artists')
+def setlist_import_artists():
+    from django.db.models.functions import Lower
+    from core.models import Artist
+    return Artist.objects.annotate(name_key=Lower('name')).filter(name_key__in=['artista'])
@@ -0,0 +1,122 @@
+"""
+Ejecución concurrente de consultas independientes de una misma vista.
+
+    counts = fanout.run({
+        'artists': Artist.objects.count,
+        'upcoming': lambda: list(Concert.objects.filter(...)[:6]),
+    }, defaults={'artists': None})
+
+Cada tarea se ejecuta en un pool acotado de hilos (QUERY_FANOUT_WORKERS); cada
+hilo tiene su propia conexión, así que la latencia es la de la consulta más
+lenta y no la suma. Las tareas deben evaluar la consulta (count(), list(...)):
+un QuerySet perezoso se evaluaría luego en el hilo de la vista.
+
+Límite por consulta (QUERY_FANOUT_TIMEOUT, segundos): se fija además
+`statement_timeout` para que PostgreSQL cancele la sentencia y libere el
+hilo. Una tarea que no termina a tiempo toma su valor de `defaults` o, si no
+lo tiene, lanza QueryTimeout; las vistas dan un valor a todas sus tareas.
+
+Se ejecuta todo en el hilo actual, en orden, si QUERY_FANOUT_WORKERS es 0, si
+hay una transacción abierta (otra conexión no vería sus cambios sin confirmar;
+esto incluye los TestCase) o si la base de datos no es PostgreSQL: sin
+statement_timeout una consulta vencida seguiría ocupando su hilo del pool.
+Las conexiones de los hilos se reciclan como las de las peticiones
+(CONN_MAX_AGE); sin conexiones persistentes cada tarea abre una nueva y
+`manage.py check` lo avisa (core.W001). La instrumentación de SQL
+(core/middleware.py) solo ve las consultas del hilo de la vista.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core import checks
+from django.db import OperationalError, close_old_connections, connection, transaction
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class QueryTimeout(Exception):
+    def __init__(self, name, timeout):
+        super().__init__(f'La consulta {name!r} superó {timeout}s')
+        self.name = name
+        self.timeout = timeout
+
+
+def _workers():
+    return getattr(settings, 'QUERY_FANOUT_WORKERS', 4)
+
+
+def _cancellable():
+    # solo PostgreSQL cancela en el servidor la consulta que supera el límite
+    return connection.vendor == 'postgresql'
+
+
+def check_connections(app_configs=None, **kwargs):
+    """Aviso si el pool abre una conexión por tarea (sin CONN_MAX_AGE)."""
+    database = settings.DATABASES['default']
+    if not _workers() or 'postgresql' not in database['ENGINE'] or database.get('CONN_MAX_AGE', 0):
+        return []
+    return [checks.Warning(
+        'QUERY_FANOUT_WORKERS > 0 sin CONN_MAX_AGE: cada tarea de core/fanout.py abre una conexión nueva.',
+        hint='Fijar DATABASES["default"]["CONN_MAX_AGE"] (o usar un pooler) o QUERY_FANOUT_WORKERS = 0.',
+        id='core.W001',
+    )]
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix='fanout')
+        return _pool
+
+
+def _canceled(exc):
+    # statement_timeout: SQLSTATE 57014 (query_canceled); psycopg2 lo expone como pgcode
+    cause = exc.__cause__
+    return getattr(cause, 'sqlstate', None) == '57014' or getattr(cause, 'pgcode', None) == '57014'
+
+
+def _call(task, timeout):
+    close_old_connections()
+    try:
+        if connection.vendor != 'postgresql':
+            return task()
+        with transaction.atomic():
+            # SET LOCAL: el límite desaparece con la transacción y no afecta a la siguiente tarea
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [int(timeout * 1000)])
+            return task()
+    finally:
+        close_old_connections()
+
+
+def run(tasks, timeout=None, defaults=None):
+    """{nombre: resultado} de ejecutar cada callable de `tasks` a la vez.
+
+    La vista espera como mucho `timeout` segundos en total; con más tareas que
+    hilos, las que esperan turno consumen parte de ese tiempo.
+    """
+    timeout = timeout or getattr(settings, 'QUERY_FANOUT_TIMEOUT', 5)
+    defaults = defaults or {}
+    if not _workers() or connection.in_atomic_block or not _cancellable():
+        return {name: task() for name, task in tasks.items()}
+
+    pool = _executor()
+    futures = {name: pool.submit(_call, task, timeout) for name, task in tasks.items()}
+    deadline = time.monotonic() + timeout
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except (TimeoutError, OperationalError) as exc:
+            if isinstance(exc, OperationalError) and not _canceled(exc):
+                raise
+            future.cancel()
+            if name not in defaults:
+                raise QueryTimeout(name, timeout) from exc
+            results[name] = defaults[name]
+    return results
+
@@ -0,0 +1,120 @@
+"""
+Lectura en streaming de volcados de conciertos (JSON lines o CSV) para
+`manage.py import_concerts`.
+
+No importa Django: `parse_chunk` se ejecuta también en los procesos del pool
+del comando, que pueden arrancar sin configurar Django (spawn/forkserver).
+
+Cada registro es un concierto: artist, artist_country, genre, city, country,
+venue, tour, date (ISO 8601; sin zona se toma la del proyecto), status,
+total_income y setlist, una lista de títulos o de objetos {title, artist,
+section, is_cover}. En CSV `setlist` lleva los títulos separados por ';',
+cada uno opcionalmente `Título | Artista original`.
+"""
+import csv
+import datetime
+import json
+from decimal import Decimal, InvalidOperation
+
+# columnas del CSV cuando no trae cabecera
+CSV_COLUMNS = ('artist', 'artist_country', 'genre', 'city', 'country', 'venue', 'tour', 'date', 'status', 'total_income', 'setlist')
+
+
+def _text(record, name, max_length=None, required=False):
+    value = str(record.get(name) or '').strip()
+    if required and not value:
+        raise ValueError(f'falta "{name}"')
+    if max_length and len(value) > max_length:
+        raise ValueError(f'"{name}" supera {max_length} caracteres')
+    return value
+
+
+def _song(item):
+    if isinstance(item, str):
+        title, _, artist = item.partition('|')
+        item = {'title': title, 'artist': artist, 'is_cover': bool(artist.strip())}
+    if not isinstance(item, dict):
+        raise ValueError('cada canción debe ser un título o un objeto con "title"')
+    return (
+        _text(item, 'title', 300, required=True), _text(item, 'artist', 200),
+        _text(item, 'section', 50), str(item.get('is_cover', '')).lower() in ('1', 'true', 'yes', 'si', 'sí'),
+    )
+
+
+def normalize(record, statuses):
+    """Registro del volcado -> dict con los campos ya convertidos; ValueError si no es válido."""
+    if not isinstance(record, dict):
+        raise ValueError('se esperaba un objeto')
+    raw_date = _text(record, 'date', required=True)
+    try:
+        start = datetime.datetime.fromisoformat(raw_date)
+    except ValueError:
+        raise ValueError(f'fecha inválida: {raw_date!r}')
+    status = _text(record, 'status') or 'completed'
+    if status not in statuses:
+        raise ValueError(f'estado desconocido: {status!r}')
+    income = None
+    if str(record.get('total_income') or '').strip():
+        try:
+            income = Decimal(str(record['total_income']).strip())
+        except InvalidOperation:
+            raise ValueError(f'ingresos inválidos: {record["total_income"]!r}')
+        if income < 0:
+            raise ValueError('los ingresos no pueden ser negativos')
+    setlist = record.get('setlist') or []
+    if isinstance(setlist, str):
+        setlist = [s for s in setlist.split(';') if s.strip()]
+    return {
+        'artist': _text(record, 'artist', 200, required=True),
+        'artist_country': _text(record, 'artist_country', 120),
+        'genre': _text(record, 'genre', 120),
+        'city': _text(record, 'city', 120, required=True),
+        'country': _text(record, 'country', 120, required=True),
+        'venue': _text(record, 'venue', 200, required=True),
+        'tour': _text(record, 'tour', 200),
+        'start': start,
+        'status': status,
+        'total_income': income,
+        'setlist': [_song(item) for item in setlist],
+    }
+
+
+def parse_chunk(fmt, chunk, statuses):
+    """[(número, dict normalizado o mensaje de error)] de un bloque de registros crudos."""
+    parsed = []
+    for number, raw in chunk:
+        try:
+            record = json.loads(raw) if fmt == 'jsonl' else raw
+            parsed.append((number, normalize(record, statuses)))
+        except ValueError as exc:
+            # json.JSONDecodeError es un ValueError
+            parsed.append((number, str(exc)))
+    return parsed
+
+
+def read_records(path, fmt, offset):
+    """(número, registro crudo) desde el registro `offset`, leyendo el fichero en streaming."""
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'jsonl':
+            records = ((i, line) for i, line in enumerate((l for l in fh if l.strip()), 1))
+        else:
+            reader = csv.DictReader(fh)
+            if reader.fieldnames and 'artist' not in reader.fieldnames:
+                # sin cabecera: la primera fila es un registro
+                fh.seek(0)
+                reader = csv.DictReader(fh, fieldnames=CSV_COLUMNS)
+            records = enumerate(reader, 1)
+        for number, raw in records:
+            if number > offset:
+                yield number, raw
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,88 @@
+import json
+import logging
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95), consultas y memoria de cada endpoint sobre datos sintéticos '
+        'en una base de datos de test, y compara con la línea base.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(benchmarks.SIZES), help='Tamaños a medir, p. ej. small,medium.')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmarks/results.json')
+        parser.add_argument('--baseline', default='benchmarks/baseline.json')
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Guardar los resultados como nueva línea base (conserva las tolerancias).',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [s.strip() for s in options['sizes'].split(',') if s.strip()]
+        unknown = set(sizes) - set(benchmarks.SIZES)
+        if unknown:
+            raise CommandError(f'Tamaños desconocidos: {", ".join(sorted(unknown))}')
+
+        results = self.run(sizes, options['iterations'], options['seed'])
+        report = {'meta': benchmarks.metadata(options['iterations']), 'results': results}
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n')
+        self.stdout.write(f'Resultados en {output}')
+
+        baseline_path = Path(options['baseline'])
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+        if options['update_baseline']:
+            merged = {**(baseline or {}), 'meta': report['meta']}
+            merged['results'] = {**(baseline or {}).get('results', {}), **results}
+            baseline_path.write_text(json.dumps(merged, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Línea base actualizada en {baseline_path}'))
+            return
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(f'No hay línea base en {baseline_path}; no se compara.'))
+            return
+        regressions = benchmarks.compare(results, baseline)
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(line))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regresiones frente a {baseline_path}')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones frente a la línea base.'))
+
+    def run(self, sizes, iterations, seed):
+        # siempre sobre una base de test desechable, nunca la configurada; con DEBUG el log de
+        # consultas se llena (maxlen 9000) y CaptureQueriesContext dejaría de contarlas
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # los errores de vistas rotas se reportan en los resultados, no como trazas en consola
+        request_logger = logging.getLogger('django.request')
+        request_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            results = {}
+            for size in sorted(sizes, key=benchmarks.SIZES.get):
+                call_command('flush', interactive=False, verbosity=0)
+                cache.clear()
+                self.stdout.write(f'{size}: generando datos (scale={benchmarks.SIZES[size]})')
+                call_command('generate_dataset', scale=benchmarks.SIZES[size], seed=seed, stdout=StringIO())
+                client = Client()
+                client.force_login(User.objects.create_superuser('bench', 'bench@example.com', 'bench'))
+                results[size] = benchmarks.run_size(client, iterations, stdout=self.stdout)
+            return results
+        finally:
+            request_logger.setLevel(request_level)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
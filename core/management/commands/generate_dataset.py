@@ -0,0 +1,330 @@
+import datetime
+import itertools
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from conciertos.models import Concert, SetlistEntry, Song, Tour
+from core import caching, counts
+from core.bulk import BulkWriter, next_pk, reset_sequences
+from core.genres import get_genres
+from core.models import Artist, City, Venue
+from fans.models import Attendance, Fan, Interest
+
+# filas por tabla con --scale 1; el resto escala linealmente
+BASE_COUNTS = {
+    'cities': 40,
+    'artists': 200,
+    'venues': 250,
+    'tours': 400,
+    'concerts': 2500,
+    'songs': 4000,
+    'fans': 10000,
+}
+INTERESTS_PER_FAN = 5  # media
+ATTENDANCES_PER_FAN = 3  # media
+SETLIST_LENGTH = (8, 20)
+# exponente de la distribución de popularidad (Zipf): pocos artistas, ciudades,
+# conciertos y canciones concentran la mayoría de la actividad
+ZIPF_EXPONENT = 1.1
+# los conciertos se reparten entre estas fechas
+FIRST_DATE = datetime.datetime(2018, 1, 1, tzinfo=datetime.timezone.utc)
+LAST_DATE = datetime.datetime(2027, 12, 31, tzinfo=datetime.timezone.utc)
+
+CITIES = [
+    ('Bogotá', 'Colombia'), ('Medellín', 'Colombia'), ('Cali', 'Colombia'), ('Barranquilla', 'Colombia'),
+    ('Cartagena', 'Colombia'), ('Bucaramanga', 'Colombia'), ('Pereira', 'Colombia'), ('Manizales', 'Colombia'),
+    ('Ciudad de México', 'Mexico'), ('Guadalajara', 'Mexico'), ('Monterrey', 'Mexico'), ('Buenos Aires', 'Argentina'),
+    ('Córdoba', 'Argentina'), ('Rosario', 'Argentina'), ('Santiago', 'Chile'), ('Valparaíso', 'Chile'),
+    ('Lima', 'Peru'), ('Arequipa', 'Peru'), ('Quito', 'Ecuador'), ('Guayaquil', 'Ecuador'),
+    ('Caracas', 'Venezuela'), ('Montevideo', 'Uruguay'), ('Asunción', 'Paraguay'), ('La Paz', 'Bolivia'),
+    ('São Paulo', 'Brazil'), ('Rio de Janeiro', 'Brazil'), ('San José', 'Costa Rica'), ('Ciudad de Panamá', 'Panama'),
+    ('San Juan', 'Puerto Rico'), ('Santo Domingo', 'Dominican Republic'), ('La Habana', 'Cuba'), ('Madrid', 'Spain'),
+    ('Barcelona', 'Spain'), ('Sevilla', 'Spain'), ('Lisboa', 'Portugal'), ('Miami', 'United States'),
+    ('Los Angeles', 'United States'), ('New York', 'United States'), ('London', 'United Kingdom'), ('Berlin', 'Germany'),
+]
+NOUNS = [
+    'Tigres', 'Fantasmas', 'Cometas', 'Lobos', 'Espejos', 'Relámpagos', 'Colibríes', 'Volcanes', 'Satélites',
+    'Jaguares', 'Sirenas', 'Cuervos', 'Planetas', 'Cóndores', 'Diamantes', 'Tormentas', 'Piratas', 'Faroles',
+]
+ADJECTIVES = [
+    'Eléctricos', 'Salvajes', 'Dorados', 'Nocturnos', 'Perdidos', 'Azules', 'Del Sur', 'Invisibles', 'Rebeldes',
+    'Tropicales', 'Lunares', 'Errantes', 'De Neón', 'Del Norte', 'Cósmicos', 'Sonoros',
+]
+WORDS = [
+    'amor', 'noche', 'fuego', 'ciudad', 'lluvia', 'camino', 'corazón', 'mar', 'luna', 'sol', 'tiempo', 'sueño',
+    'baile', 'ventana', 'río', 'silencio', 'verano', 'estrella', 'calle', 'recuerdo', 'viento', 'selva', 'cielo',
+]
+VENUE_KINDS = ['Teatro', 'Estadio', 'Arena', 'Coliseo', 'Auditorio', 'Parque', 'Sala', 'Club']
+FIRST_NAMES = [
+    'Ana', 'Luis', 'María', 'Carlos', 'Sofía', 'Andrés', 'Valentina', 'Juan', 'Camila', 'Diego', 'Laura', 'Mateo',
+    'Isabella', 'Santiago', 'Daniela', 'Sebastián', 'Paula', 'Felipe', 'Mariana', 'Nicolás',
+]
+LAST_NAMES = [
+    'García', 'Rodríguez', 'Martínez', 'López', 'González', 'Pérez', 'Sánchez', 'Ramírez', 'Torres', 'Flores',
+    'Rivera', 'Gómez', 'Díaz', 'Reyes', 'Morales', 'Jiménez', 'Ruiz', 'Vargas', 'Castro', 'Ortiz',
+]
+
+
+class ZipfSampler:
+    """Elige elementos con probabilidad proporcional a 1/rango^s (rango aleatorio pero fijo por semilla)."""
+
+    def __init__(self, items, rng, exponent=ZIPF_EXPONENT):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, len(self.items) + 1)))
+        self.rng = rng
+
+    def sample(self, k=1):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights, k=k)
+
+    def one(self):
+        return self.sample(1)[0]
+
+    def distinct(self, k):
+        """Hasta k elementos distintos (menos si la cola es muy larga)."""
+        return list(dict.fromkeys(self.sample(k * 2)))[:k]
+
+
+def _random_datetime(rng, start, end):
+    return start + datetime.timedelta(seconds=rng.randint(0, int((end - start).total_seconds())))
+
+
+class Command(BaseCommand):
+    help = 'Genera un conjunto de datos sintético y reproducible para pruebas de carga (--scale 1 ≈ 100 mil filas).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1, help='Factor de escala (100 ≈ 12 millones de filas).')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla del generador aleatorio.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--no-copy', action='store_true', help='Usar bulk_create también en PostgreSQL.')
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='No recalcular contadores, agregados ni índice de búsqueda al terminar.',
+        )
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        if scale <= 0:
+            raise CommandError('--scale debe ser mayor que cero.')
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.batch_size = options['batch_size']
+        self.use_copy = not options['no_copy']
+        self.counts = {name: max(1, round(base * scale)) for name, base in BASE_COUNTS.items()}
+
+        started = time.monotonic()
+        with transaction.atomic():
+            cities = self.step('cities', self.generate_cities)
+            artists = self.step('artists', self.generate_artists)
+            venues = self.step('venues', self.generate_venues, cities)
+            tours = self.step('tours', self.generate_tours, artists)
+            concerts = self.step('concerts', self.generate_concerts, artists, venues, tours)
+            songs = self.step('songs', self.generate_songs, artists)
+            self.step('setlist', self.generate_setlists, concerts, songs)
+            fans = self.step('fans', self.generate_fans, cities)
+            self.step('interests', self.generate_interests, fans, concerts)
+            self.step('attendances', self.generate_attendances, fans, concerts)
+            reset_sequences(City, Artist, Venue, Tour, Concert, Song, SetlistEntry, Fan, Interest, Attendance)
+        # bulk_create no dispara post_save: invalidar a mano las listas cacheadas y los conteos
+        caching.bump_all()
+        counts.refresh()
+
+        if not options['no_rebuild']:
+            self.step('rebuild', self.rebuild)
+        self.stdout.write(self.style.SUCCESS(f'Datos generados en {time.monotonic() - started:.1f}s.'))
+
+    def step(self, name, func, *args):
+        started = time.monotonic()
+        self.writers = []
+        result = func(*args)
+        rows = sum(w.total for w in self.writers)
+        self.stdout.write(f'{name}: {rows} filas ({time.monotonic() - started:.1f}s)')
+        return result
+
+    def writer(self, model):
+        writer = BulkWriter(model, batch_size=self.batch_size, use_copy=self.use_copy)
+        self.writers.append(writer)
+        return writer
+
+    # ----- dimensiones -----
+    def generate_cities(self):
+        writer, start = self.writer(City), next_pk(City)
+        for i in range(self.counts['cities']):
+            name, country = CITIES[i % len(CITIES)]
+            if i >= len(CITIES):
+                name = f'{name} {i // len(CITIES) + 1}'
+            writer.add(id=start + i, name=name, country=country)
+        writer.flush()
+        return ZipfSampler(range(start, start + writer.total), self.rng)
+
+    def generate_artists(self):
+        rng, genres = self.rng, get_genres()
+        countries = sorted({country for _, country in CITIES})
+        writer, start = self.writer(Artist), next_pk(Artist)
+        for i in range(self.counts['artists']):
+            writer.add(
+                id=start + i,
+                name=f'{rng.choice(["Los ", "Las ", "", ""])}{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)}',
+                country=rng.choice(countries), genre=rng.choice(genres), debut_year=rng.randint(1965, 2024),
+            )
+        writer.flush()
+        return ZipfSampler(range(start, start + writer.total), self.rng)
+
+    def generate_venues(self, cities):
+        rng, seen = self.rng, set()
+        writer, start = self.writer(Venue), next_pk(Venue)
+        capacities = {}
+        for i in range(self.counts['venues']):
+            city_id = cities.one()
+            name = f'{rng.choice(VENUE_KINDS)} {rng.choice(WORDS).capitalize()}'
+            if (name, city_id) in seen:
+                name = f'{name} {i}'
+            seen.add((name, city_id))
+            capacity = min(max(int(rng.lognormvariate(8, 1)), 100), 90000)
+            capacities[start + i] = capacity
+            writer.add(id=start + i, name=name, address=f'Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}',
+                       capacity=capacity, city_id=city_id)
+        writer.flush()
+        sampler = ZipfSampler(capacities, self.rng)
+        sampler.capacities = capacities
+        return sampler
+
+    def generate_tours(self, artists):
+        rng = self.rng
+        writer, start = self.writer(Tour), next_pk(Tour)
+        by_artist = {}
+        today = self.now.date()
+        for i in range(self.counts['tours']):
+            artist_id = artists.one()
+            begin = _random_datetime(rng, FIRST_DATE, LAST_DATE).date()
+            end = begin + datetime.timedelta(days=rng.randint(30, 300))
+            status = 'planned' if begin > today else 'finished' if end < today else 'ongoing'
+            writer.add(
+                id=start + i, artist_id=artist_id, name=f'Gira {rng.choice(WORDS).capitalize()} {begin.year}',
+                start_date=begin, end_date=end, status=status,
+            )
+            by_artist.setdefault(artist_id, []).append((start + i, begin, end))
+        writer.flush()
+        return by_artist
+
+    # ----- hechos -----
+    def generate_concerts(self, artists, venues, tours):
+        rng = self.rng
+        writer, start = self.writer(Concert), next_pk(Concert)
+        # por concierto: (id, artist_id, fecha, estado) para generar setlists, intereses y asistencias
+        concerts = []
+        for i in range(self.counts['concerts']):
+            artist_id, venue_id = artists.one(), venues.one()
+            tour_id = None
+            artist_tours = tours.get(artist_id)
+            if artist_tours and rng.random() < 0.7:
+                tour_id, begin, end = rng.choice(artist_tours)
+                when = _random_datetime(
+                    rng, datetime.datetime.combine(begin, datetime.time(18), datetime.timezone.utc),
+                    datetime.datetime.combine(end, datetime.time(23), datetime.timezone.utc),
+                )
+            else:
+                when = _random_datetime(rng, FIRST_DATE, LAST_DATE)
+            if when > self.now:
+                status, income = 'scheduled', None
+            else:
+                status = 'completed' if rng.random() < 0.92 else 'canceled'
+                income = None
+                if status == 'completed':
+                    sold = venues.capacities[venue_id] * rng.uniform(0.4, 1.0)
+                    income = Decimal(f'{sold * rng.uniform(20, 150):.2f}')
+            writer.add(
+                id=start + i, artist_id=artist_id, venue_id=venue_id, tour_id=tour_id,
+                start_datetime=when, status=status, total_income=income,
+            )
+            concerts.append((start + i, artist_id, when, status))
+        writer.flush()
+        sampler = ZipfSampler(range(len(concerts)), self.rng)
+        sampler.rows = concerts
+        return sampler
+
+    def generate_songs(self, artists):
+        rng = self.rng
+        writer, start = self.writer(Song), next_pk(Song)
+        original = []
+        for i in range(self.counts['songs']):
+            artist_id = artists.one() if rng.random() < 0.9 else None
+            writer.add(
+                id=start + i, title=f'{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}',
+                original_artist_id=artist_id,
+                original_artist_name=None if artist_id else f'{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)}',
+                release_year=rng.randint(1960, 2025),
+            )
+            original.append(artist_id)
+        writer.flush()
+        sampler = ZipfSampler(range(start, start + writer.total), self.rng)
+        sampler.start, sampler.original = start, original
+        return sampler
+
+    def generate_setlists(self, concerts, songs):
+        rng = self.rng
+        writer, pk = self.writer(SetlistEntry), next_pk(SetlistEntry)
+        for concert_id, artist_id, _, status in concerts.rows:
+            if status == 'canceled':
+                continue
+            chosen = songs.distinct(rng.randint(*SETLIST_LENGTH))
+            for position, song_id in enumerate(chosen, 1):
+                writer.add(
+                    id=pk, concert_id=concert_id, song_id=song_id, position=position,
+                    section='Encore' if position > len(chosen) - 2 else '',
+                    is_cover=songs.original[song_id - songs.start] not in (None, artist_id),
+                )
+                pk += 1
+        writer.flush()
+
+    def generate_fans(self, cities):
+        rng = self.rng
+        writer, start = self.writer(Fan), next_pk(Fan)
+        for i in range(self.counts['fans']):
+            writer.add(
+                id=start + i, full_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                email=f'fan{start + i}@example.com', city_id=cities.one() if rng.random() < 0.95 else None,
+                birthdate=datetime.date(rng.randint(1955, 2008), rng.randint(1, 12), rng.randint(1, 28)),
+            )
+        writer.flush()
+        return range(start, start + writer.total)
+
+    def generate_interests(self, fans, concerts):
+        rng = self.rng
+        writer, pk = self.writer(Interest), next_pk(Interest)
+        for fan_id in fans:
+            for index in concerts.distinct(rng.randint(0, INTERESTS_PER_FAN * 2)):
+                concert_id, _, when, _ = concerts.rows[index]
+                created = min(when - datetime.timedelta(days=rng.randint(1, 180)), self.now)
+                writer.add(id=pk, fan_id=fan_id, concert_id=concert_id, created_at=created)
+                pk += 1
+        writer.flush()
+
+    def generate_attendances(self, fans, concerts):
+        rng = self.rng
+        writer, pk = self.writer(Attendance), next_pk(Attendance)
+        for fan_id in fans:
+            for index in concerts.distinct(rng.randint(0, ATTENDANCES_PER_FAN * 2)):
+                concert_id, _, _, status = concerts.rows[index]
+                rating = None
+                if status == 'completed' and rng.random() < 0.85:
+                    rating = rng.choices(range(1, 11), weights=(1, 1, 2, 3, 5, 8, 12, 14, 10, 6))[0]
+                writer.add(id=pk, fan_id=fan_id, concert_id=concert_id, rating=rating)
+                pk += 1
+        writer.flush()
+
+    def rebuild(self):
+        # la carga no pasa por signals: recalcular todo lo desnormalizado
+        from analytics import rollups
+        from fans import counters
+        from search import engine as search_engine
+
+        counters.rebuild_interest_counts()
+        counters.rebuild_rating_totals()
+        rollups.rebuild()
+        search_engine.rebuild()
@@ -0,0 +1,211 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from conciertos.models import Concert, SetlistEntry, Song, Tour
+from core import caching, counts
+from core.ingest import chunked, parse_chunk, read_records
+from core.models import Artist, City, Venue
+
+STATUSES = frozenset(value for value, _ in Concert._meta.get_field('status').choices)
+
+
+def _key(value):
+    return value.strip().lower()
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa conciertos históricos con sus setlists desde un volcado JSON lines o CSV, '
+        'en streaming y por bloques; se puede reanudar desde el último bloque confirmado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichero .jsonl o .csv (un concierto por registro).')
+        parser.add_argument('--format', choices=('jsonl', 'csv'), help='Por defecto, según la extensión.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Conciertos por transacción.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Filas por INSERT de bulk_create.')
+        parser.add_argument('--workers', type=int, default=0, help='Procesos que leen y validan registros (0 = ninguno).')
+        parser.add_argument('--checkpoint', help='Fichero de progreso (por defecto <path>.checkpoint).')
+        parser.add_argument('--resume', action='store_true', help='Continuar desde el último bloque confirmado.')
+        parser.add_argument('--start-offset', type=int, help='Saltar los primeros N registros.')
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='No recalcular agregados ni índice de búsqueda al terminar.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'No existe {path}.')
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size debe ser mayor que cero.')
+        self.batch_size = options['batch_size']
+        self.checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        offset = options['start_offset'] or 0
+        if options['resume'] and options['start_offset'] is None:
+            offset = self.read_checkpoint()
+        if offset:
+            self.stdout.write(f'Reanudando tras el registro {offset}.')
+
+        started = time.monotonic()
+        self.load_maps()
+        self.totals = {'concerts': 0, 'skipped': 0, 'errors': 0}
+        chunks = chunked(read_records(path, fmt, offset), options['chunk_size'])
+        for parsed in self.parse(fmt, chunks, options['workers']):
+            last = parsed[-1][0]
+            with transaction.atomic():
+                self.write(parsed)
+            # solo tras confirmar: al reanudar se repite como mucho el bloque en curso
+            self.write_checkpoint(last)
+            self.stdout.write(f'registro {last}: {self.totals["concerts"]} conciertos importados')
+
+        # la carga no pasa por signals: invalidar cachés y recalcular lo desnormalizado
+        caching.bump_all()
+        counts.refresh()
+        if not options['no_rebuild'] and self.totals['concerts']:
+            self.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.totals["concerts"]} conciertos importados, {self.totals["skipped"]} ya existían, '
+            f'{self.totals["errors"]} registros con errores ({time.monotonic() - started:.1f}s).'
+        ))
+
+    # ----- progreso -----
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint) as fh:
+                return json.load(fh)['offset']
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError):
+            raise CommandError(f'Checkpoint ilegible: {self.checkpoint}.')
+
+    def write_checkpoint(self, offset):
+        tmp = f'{self.checkpoint}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump({'offset': offset, 'at': timezone.now().isoformat()}, fh)
+        # rename atómico: un corte a mitad de escritura no deja un checkpoint roto
+        os.replace(tmp, self.checkpoint)
+
+    def parse(self, fmt, chunks, workers):
+        """Bloques ya validados, en orden; con workers > 0 se validan en paralelo en un pool de procesos."""
+        if workers <= 0:
+            for chunk in chunks:
+                yield parse_chunk(fmt, chunk, STATUSES)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # ventana acotada: no se lee más fichero del que el pool puede procesar
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(parse_chunk, fmt, chunk, STATUSES))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    # ----- mapas de deduplicación -----
+    def load_maps(self):
+        self.cities = {
+            (_key(name), _key(country)): pk for pk, name, country in City.objects.values_list('pk', 'name', 'country')
+        }
+        self.artists = {}
+        for pk, name in Artist.objects.order_by('-pk').values_list('pk', 'name'):
+            # con nombres repetidos gana el más antiguo
+            self.artists[_key(name)] = pk
+        # Venue es único por (name, city) con el nombre exacto; aquí basta con la forma normalizada
+        self.venues = {(_key(name), city_id): pk for pk, name, city_id in Venue.objects.values_list('pk', 'name', 'city_id')}
+        self.tours = {(artist_id, _key(name)): pk for pk, artist_id, name in Tour.objects.values_list('pk', 'artist_id', 'name')}
+        self.songs = {}
+        songs = Song.objects.order_by('-pk').values_list('pk', 'title', 'original_artist__name', 'original_artist_name')
+        for pk, title, artist, artist_name in songs:
+            self.songs[(_key(title), _key(artist or artist_name or ''))] = pk
+        self.concerts = set(Concert.objects.values_list('artist_id', 'venue_id', 'start_datetime'))
+
+    def missing(self, model, mapping, rows):
+        """Crea con bulk_create las filas de `rows` ({clave: kwargs}) que no están en `mapping`."""
+        new = {key: model(**values) for key, values in rows.items() if key not in mapping}
+        model.objects.bulk_create(new.values(), batch_size=self.batch_size)
+        for key, obj in new.items():
+            mapping[key] = obj.pk
+
+    # ----- escritura (un solo proceso) -----
+    def write(self, parsed):
+        records = []
+        for number, record in parsed:
+            if isinstance(record, str):
+                self.totals['errors'] += 1
+                self.stderr.write(f'registro {number}: {record}')
+            else:
+                if timezone.is_naive(record['start']):
+                    record['start'] = timezone.make_aware(record['start'])
+                records.append(record)
+
+        # con varias grafías de la misma clave en el bloque se queda la primera
+        cities, artists, venues, tours, songs = {}, {}, {}, {}, {}
+        for r in records:
+            cities.setdefault((_key(r['city']), _key(r['country'])), {'name': r['city'], 'country': r['country']})
+            artists.setdefault(_key(r['artist']), {'name': r['artist'], 'country': r['artist_country'], 'genre': r['genre']})
+        self.missing(City, self.cities, cities)
+        self.missing(Artist, self.artists, artists)
+        for r in records:
+            city_id = self.cities[(_key(r['city']), _key(r['country']))]
+            venues.setdefault((_key(r['venue']), city_id), {'name': r['venue'], 'city_id': city_id})
+            artist_id = self.artists[_key(r['artist'])]
+            if r['tour']:
+                tours.setdefault((artist_id, _key(r['tour'])), {'name': r['tour'], 'artist_id': artist_id})
+            for title, artist, _, _ in r['setlist']:
+                # sin artista original, la canción es del propio artista del concierto
+                artist = artist or r['artist']
+                songs.setdefault((_key(title), _key(artist)), {
+                    'title': title, 'original_artist_id': self.artists.get(_key(artist)),
+                    'original_artist_name': None if _key(artist) in self.artists else artist,
+                })
+        self.missing(Venue, self.venues, venues)
+        self.missing(Tour, self.tours, tours)
+        self.missing(Song, self.songs, songs)
+
+        concerts, setlists = [], []
+        for r in records:
+            artist_id = self.artists[_key(r['artist'])]
+            venue_id = self.venues[(_key(r['venue']), self.cities[(_key(r['city']), _key(r['country']))])]
+            key = (artist_id, venue_id, r['start'])
+            if key in self.concerts:
+                # ya importado (p. ej. al repetir el bloque que se cortó)
+                self.totals['skipped'] += 1
+                continue
+            self.concerts.add(key)
+            concerts.append(Concert(
+                artist_id=artist_id, venue_id=venue_id, start_datetime=r['start'], status=r['status'],
+                total_income=r['total_income'], tour_id=self.tours.get((artist_id, _key(r['tour']))) if r['tour'] else None,
+            ))
+            setlists.append((r['artist'], r['setlist']))
+        Concert.objects.bulk_create(concerts, batch_size=self.batch_size)
+
+        entries = []
+        for concert, (artist_name, setlist) in zip(concerts, setlists):
+            seen = set()
+            for title, artist, section, is_cover in setlist:
+                song_id = self.songs[(_key(title), _key(artist or artist_name))]
+                # unique_concert_song: una canción repetida en el mismo concierto cuenta una vez
+                if song_id in seen:
+                    continue
+                seen.add(song_id)
+                entries.append(SetlistEntry(
+                    concert=concert, song_id=song_id, position=len(seen), section=section, is_cover=is_cover,
+                ))
+        SetlistEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+        self.totals['concerts'] += len(concerts)
+
+    def rebuild(self):
+        from analytics import rollups
+        from search import engine as search_engine
+
+        rollups.rebuild()
+        search_engine.rebuild()
@@ -0,0 +1,262 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus (servidas en /metrics).
+
+Escritura sin locks: cada hilo incrementa su propio "shard" (un dict, o un
+fichero mmap en modo multiproceso) y /metrics suma todos los shards al leer.
+
+Modo multiproceso (gunicorn con varios workers): con METRICS_MULTIPROC_DIR
+apuntando a un directorio vacío y escribible, cada hilo de cada worker escribe
+en su propio fichero `<pid>-<n>-<hilo>.db` mapeado en memoria y /metrics agrega todos
+los ficheros del directorio, sea cual sea el worker que atiende la petición.
+El directorio debe vaciarse al arrancar el servidor (los ficheros de workers
+muertos se siguen sumando, como hacen los contadores de Prometheus).
+
+    from core import metrics
+    metrics.record_cache('interest_counts', hit=True)
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+# cabecera: bytes usados del fichero; cada entrada: longitud de la clave, clave
+# (rellenada a múltiplos de 8) y el valor como double
+_HEADER = struct.Struct('<Q')
+_KEY_LEN = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+
+def _multiproc_dir():
+    return getattr(settings, 'METRICS_MULTIPROC_DIR', '') or ''
+
+
+class DictShard:
+    def __init__(self):
+        self.values = {}
+
+    def inc(self, key, amount):
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def items(self):
+        # list(dict.items()) se hace sin soltar el GIL: lectura consistente sin lock
+        return list(self.values.items())
+
+
+class MmapShard:
+    """Valores de un solo hilo escritor en un fichero compartido con los demás procesos."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._offsets = {key: offset for key, _, offset in _read_entries(self._map, self._used)}
+
+    def _add_entry(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (-(_KEY_LEN.size + len(encoded)) % 8)
+        size = _KEY_LEN.size + padded + _VALUE.size
+        while self._used + size > len(self._map):
+            self._map.resize(len(self._map) * 2)
+        offset = self._used
+        _KEY_LEN.pack_into(self._map, offset, len(encoded))
+        self._map[offset + _KEY_LEN.size:offset + _KEY_LEN.size + len(encoded)] = encoded
+        value_offset = offset + _KEY_LEN.size + padded
+        _VALUE.pack_into(self._map, value_offset, 0.0)
+        # la cabecera se actualiza al final: un lector nunca ve una entrada a medias
+        self._used += size
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._offsets[key] = value_offset
+        return value_offset
+
+    def inc(self, key, amount):
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._add_entry(key)
+        _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def items(self):
+        return [(key, value) for key, value, _ in _read_entries(self._map, self._used)]
+
+
+def _read_entries(buf, used):
+    offset = _HEADER.size
+    while offset < used:
+        length = _KEY_LEN.unpack_from(buf, offset)[0]
+        key = bytes(buf[offset + _KEY_LEN.size:offset + _KEY_LEN.size + length]).decode()
+        value_offset = offset + _KEY_LEN.size + length + (-(_KEY_LEN.size + length) % 8)
+        yield key, _VALUE.unpack_from(buf, value_offset)[0], value_offset
+        offset = value_offset + _VALUE.size
+
+
+def read_multiproc_dir(path):
+    """Suma los valores de todos los ficheros de métricas del directorio."""
+    totals = {}
+    for file in Path(path).glob('*.db'):
+        with open(file, 'rb') as fh:
+            data = fh.read()
+        if len(data) < _HEADER.size:
+            continue
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        for key, value, _ in _read_entries(data, used):
+            totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._local = threading.local()
+        self._shards = []
+        self._pid = os.getpid()
+
+    def shard(self):
+        shard = getattr(self._local, 'shard', None)
+        pid = os.getpid()
+        if shard is None or self._local.pid != pid:
+            if pid != self._pid:
+                # proceso hijo tras un fork: los shards del padre no son suyos
+                self._pid, self._shards = pid, []
+            directory = _multiproc_dir()
+            if directory:
+                shard = MmapShard(os.path.join(directory, f'{pid}-{len(self._shards)}-{threading.get_ident()}.db'))
+            else:
+                shard = DictShard()
+            self._local.shard, self._local.pid = shard, pid
+            # list.append es atómico: no hace falta lock para registrar el shard
+            self._shards.append(shard)
+        return shard
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collect(self):
+        directory = _multiproc_dir()
+        if directory:
+            return read_multiproc_dir(directory)
+        totals = {}
+        for shard in list(self._shards):
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self):
+        values = {}
+        for key, value in self.collect().items():
+            sample, labels = json.loads(key)
+            values.setdefault(sample, []).append((labels, value))
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(values))
+        return '\n'.join(lines) + '\n'
+
+
+def _sample_key(sample, labels):
+    return json.dumps([sample, sorted(labels.items())], separators=(',', ':'))
+
+
+def _series(labels):
+    # las etiquetas llegan de JSON como listas [nombre, valor]
+    return tuple(tuple(pair) for pair in labels)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(sample, labels, value):
+    if labels:
+        inner = ','.join(f'{name}="{_escape(v)}"' for name, v in labels)
+        sample = f'{sample}{{{inner}}}'
+    return f'{sample} {value!r}' if value != int(value) else f'{sample} {int(value)}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        self.registry.shard().inc(_sample_key(self.name, labels), amount)
+
+    def samples(self, values):
+        return [_format(self.name, labels, value) for labels, value in sorted(values.get(self.name, []))]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def observe(self, value, **labels):
+        shard = self.registry.shard()
+        # se guarda el conteo de cada cubeta por separado; el acumulado se calcula al leer
+        le = next((b for b in self.buckets if value <= b), '+Inf')
+        shard.inc(_sample_key(f'{self.name}_bucket', {**labels, 'le': str(le)}), 1)
+        shard.inc(_sample_key(f'{self.name}_sum', labels), value)
+        shard.inc(_sample_key(f'{self.name}_count', labels), 1)
+
+    def samples(self, values):
+        lines = []
+        buckets = {}
+        for labels, value in values.get(f'{self.name}_bucket', []):
+            series = dict(labels)
+            le = series.pop('le')
+            buckets.setdefault(tuple(sorted(series.items())), {})[le] = value
+        sums = {_series(labels): value for labels, value in values.get(f'{self.name}_sum', [])}
+        counts = {_series(labels): value for labels, value in values.get(f'{self.name}_count', [])}
+        for series in sorted(counts):
+            per_bucket = buckets.get(series, {})
+            cumulative = 0
+            for le in [str(b) for b in self.buckets] + ['+Inf']:
+                cumulative += per_bucket.get(le, 0)
+                lines.append(_format(f'{self.name}_bucket', list(series) + [('le', le)], cumulative))
+            lines.append(_format(f'{self.name}_sum', series, sums.get(series, 0)))
+            lines.append(_format(f'{self.name}_count', series, counts[series]))
+        return lines
+
+
+REGISTRY = Registry()
+
+REQUESTS = Counter('encore_http_requests_total', 'Peticiones HTTP por vista, método y estado.')
+REQUEST_LATENCY = Histogram('encore_http_request_duration_seconds', 'Latencia de las peticiones por vista.')
+IN_FLIGHT = Gauge('encore_http_requests_in_flight', 'Peticiones en curso.')
+DB_QUERIES = Histogram(
+    'encore_db_queries_per_request', 'Consultas SQL por petición y vista.',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_TIME = Counter('encore_db_query_seconds_total', 'Tiempo acumulado de SQL por vista.')
+CACHE_REQUESTS = Counter('encore_cache_requests_total', 'Lecturas de caché por caché y resultado (hit/miss).')
+
+
+def record_cache(cache_name, hit):
+    """Contabiliza una lectura de caché; la tasa de aciertos es hit / (hit + miss)."""
+    CACHE_REQUESTS.inc(cache=cache_name, result='hit' if hit else 'miss')
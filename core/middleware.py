@@ -0,0 +1,239 @@
+"""
+Middlewares de observabilidad.
+
+Instrumentación de SQL por petición.
+
+SQLInstrumentationMiddleware envuelve las conexiones con
+`connection.execute_wrapper` mientras dura la vista y registra:
+
+- número de consultas y tiempo total de SQL,
+- las consultas más lentas,
+- sentencias repetidas (misma huella) por encima de un umbral: el síntoma
+  típico de un N+1,
+- para cada consulta por encima de SQL_SLOW_QUERY_MS, la pila Python del
+  proyecto que la lanzó y el template que se estaba renderizando.
+
+El resultado se envía como cabecera `Server-Timing` y como una línea JSON en
+el logger 'encoreanalytics.sql'. Se activa con SQL_INSTRUMENTATION=True (ver
+settings.py); queda en `request.sql_stats` para otros middlewares.
+
+Ambos middlewares admiten peticiones síncronas y asíncronas: delante de una
+vista async (el stream SSE de fans) no fuerzan la adaptación a sync ni retienen
+un hilo mientras dura la respuesta. Las respuestas en streaming no cuentan en
+la latencia: la vista devuelve enseguida y el cuerpo se envía después.
+"""
+import json
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+from . import metrics
+
+logger = logging.getLogger('encoreanalytics.sql')
+
+# listas IN de longitud variable y literales que no llegan como parámetros
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def fingerprint(sql):
+    """Forma normalizada de la sentencia: iguales salvo por los valores concretos."""
+    sql = _NUMBER.sub('%s', _STRING.sub('%s', sql))
+    return ' '.join(_IN_LIST.sub('(...)', sql).split())
+
+
+def _caller_stack(limit=8):
+    """Frames del proyecto (sin Django ni librerías) y el template en curso, de dentro hacia fuera."""
+    base = str(settings.BASE_DIR)
+    frames, template = [], None
+    for frame, lineno in traceback.walk_stack(None):
+        if template is None and isinstance(frame.f_locals.get('self'), Template):
+            template = frame.f_locals['self'].origin.name
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and 'site-packages' not in filename and filename != __file__:
+            if len(frames) < limit:
+                frames.append(f'{filename[len(base) + 1:]}:{lineno} in {frame.f_code.co_name}')
+    return frames, template
+
+
+def _wrap_connections(wrapper):
+    """ExitStack con `wrapper` instalado en todas las conexiones del hilo actual."""
+    stack = ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(wrapper))
+    return stack
+
+
+class AsyncCapableMiddleware:
+    """Base para middlewares que envuelven las conexiones mientras corre la vista.
+
+    `start()` devuelve el wrapper para execute_wrapper (con el estado de la petición)
+    y `finish()` lo recibe junto con la respuesta.
+
+    En modo async las conexiones viven en el hilo de sync_to_async (thread-sensitive),
+    el mismo que usa el ORM de la vista, así que el wrapper se instala allí.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = self.start(request)
+        with _wrap_connections(state):
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        stack = await sync_to_async(_wrap_connections)(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, state)
+
+
+class QueryCollector:
+    """Wrapper para execute_wrapper que acumula las métricas de una petición."""
+
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self.started = time.perf_counter()
+        self.count = 0
+        self.total_ms = 0.0
+        self.queries = []
+        self.fingerprints = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += elapsed
+            self.queries.append((elapsed, sql))
+            key = fingerprint(sql)
+            self.fingerprints[key] = self.fingerprints.get(key, 0) + 1
+            if self.slow_ms is not None and elapsed >= self.slow_ms:
+                stack, template = _caller_stack()
+                self.slow.append({'sql': sql[:500], 'ms': round(elapsed, 2), 'template': template, 'stack': stack})
+
+    def slowest(self, n):
+        return [
+            {'sql': sql[:200], 'ms': round(ms, 2)}
+            for ms, sql in sorted(self.queries, key=lambda q: q[0], reverse=True)[:n]
+        ]
+
+    def repeated(self, threshold):
+        return [
+            {'sql': sql[:200], 'count': count}
+            for sql, count in sorted(self.fingerprints.items(), key=lambda kv: kv[1], reverse=True)
+            if count >= threshold
+        ]
+
+
+class SQLInstrumentationMiddleware(AsyncCapableMiddleware):
+    def start(self, request):
+        collector = QueryCollector(getattr(settings, 'SQL_SLOW_QUERY_MS', 100))
+        request.sql_stats = collector
+        return collector
+
+    def finish(self, request, response, collector):
+        total_ms = (time.perf_counter() - collector.started) * 1000
+
+        repeated = collector.repeated(getattr(settings, 'SQL_REPEATED_QUERY_THRESHOLD', 5))
+        timing = [f'db;dur={collector.total_ms:.2f};desc="{collector.count} queries"']
+        if repeated:
+            timing.append(f'db-repeated;desc="{len(repeated)} repeated statements"')
+        # en streaming solo se mide hasta las cabeceras: no es la duración de la petición
+        if not response.streaming:
+            timing.append(f'total;dur={total_ms:.2f}')
+        response.headers['Server-Timing'] = ', '.join(timing)
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': collector.count,
+            'sql_ms': round(collector.total_ms, 2),
+            'total_ms': None if response.streaming else round(total_ms, 2),
+            'streaming': response.streaming,
+            'slowest': collector.slowest(getattr(settings, 'SQL_INSTRUMENTATION_TOP', 3)),
+            'repeated': repeated,
+            'slow': collector.slow,
+        }
+        level = logging.WARNING if repeated or collector.slow else logging.INFO
+        logger.log(level, json.dumps(record, default=str))
+        return response
+
+
+class QueryTimer:
+    """Wrapper para execute_wrapper que solo cuenta consultas y tiempo de SQL."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Latencia, consultas SQL y peticiones en curso por vista para /metrics (ver core/metrics.py)."""
+
+    def __call__(self, request):
+        metrics.IN_FLIGHT.inc()
+        if self.async_mode:
+            return self._track_async(request)
+        try:
+            return super().__call__(request)
+        finally:
+            metrics.IN_FLIGHT.dec()
+
+    async def _track_async(self, request):
+        try:
+            return await self.__acall__(request)
+        finally:
+            metrics.IN_FLIGHT.dec()
+
+    def start(self, request):
+        return QueryTimer()
+
+    def finish(self, request, response, state):
+        elapsed = time.perf_counter() - state.started
+        match = getattr(request, 'resolver_match', None)
+        # solo el nombre de la URL como etiqueta: la ruta con ids dispararía la cardinalidad
+        view = (match.view_name if match else None) or 'unresolved'
+        metrics.REQUESTS.inc(view=view, method=request.method, status=str(response.status_code))
+        # un stream devuelve la respuesta enseguida y envía el cuerpo después: no es latencia
+        if not response.streaming:
+            metrics.REQUEST_LATENCY.observe(elapsed, view=view)
+        metrics.DB_QUERIES.observe(state.queries, view=view)
+        metrics.DB_TIME.inc(state.db_time, view=view)
+        return response
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_version_stamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowCount',
+            fields=[
+                ('model', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('rows', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:43
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_row_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='artist_name_lower_idx'),
+        ),
+    ]
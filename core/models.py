@@ -1,10 +1,13 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 # Create your models here.
 class City(models.Model):
     name = models.CharField(max_length=120)
     country = models.CharField(max_length=120)
-    
+    # versión de la fila para GET condicional (core/conditional.py); indexado para MAX() barato
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
     def __str__(self):
         return f"{self.name}, {self.country}"
 
@@ -13,6 +16,14 @@ class Artist(models.Model):
     country = models.CharField(max_length=120)
     debut_year = models.PositiveSmallIntegerField(null=True)
     genre = models.CharField(max_length=120)
+    # versión de la fila para GET condicional (core/conditional.py); indexado para MAX() barato
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # búsqueda por nombre sin distinguir mayúsculas (importación de setlists)
+            models.Index(Lower('name'), name='artist_name_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -22,9 +33,33 @@ class Venue(models.Model):
     address = models.CharField(max_length=300, blank=True)
     capacity = models.PositiveIntegerField(null=True, blank=True)
     city = models.ForeignKey(City, on_delete=models.PROTECT, related_name='venues') #relaciona el venue con la ciudad, si se borra la ciudad no se borran los venues asociados
+    # versión de la fila para GET condicional (core/conditional.py); indexado para MAX() barato
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         unique_together = ('name', 'city') #asegura que no haya dos venues con el mismo nombre en la misma ciudad
 
     def __str__(self):
-        return f"{self.name} ({self.city.name})"
\ No newline at end of file
+        return f"{self.name} ({self.city.name})"
+
+
+class TableDeletion(models.Model):
+    """Última vez que se borraron filas de una tabla.
+
+    MAX(updated_at) no cambia cuando desaparece una fila; core/signals.py
+    anota aquí los borrados de las tablas versionadas.
+    """
+    model = models.CharField(max_length=100, primary_key=True)  # app_label.model
+    deleted_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.model}: {self.deleted_at}"
+
+
+class RowCount(models.Model):
+    """Filas de una tabla donde no hay estadísticas de PostgreSQL (ver core/counts.py)."""
+    model = models.CharField(max_length=100, primary_key=True)  # app_label.model
+    rows = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.model}: {self.rows}"
@@ -0,0 +1,215 @@
+"""
+Paginación por cursor (keyset) para los ListView.
+
+En lugar de OFFSET/LIMIT y un COUNT(*) total, cada página se pide con un
+cursor opaco que codifica los valores de orden de la última (o primera) fila
+vista, y la consulta filtra con `WHERE (a, id) > (x, y)`. El coste de una
+página no depende de su profundidad.
+
+Uso: heredar de KeysetPaginationMixin antes que ListView y declarar
+`keyset_fields` con el orden de la vista; el último campo debe ser único
+(normalmente 'id'). Un '-' delante indica orden descendente. Los valores NULL
+se ordenan siempre al final.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+
+
+def _json_default(value):
+    # isoformat completo: DjangoJSONEncoder recorta los microsegundos y rompería la igualdad
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} no serializable en un cursor')
+
+
+def encode_cursor(values, direction):
+    raw = json.dumps({'v': values, 'd': direction}, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Devuelve (valores, dirección) o None si el cursor no es válido."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = data['v'], data['d']
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != size:
+        return None
+    return values, direction
+
+
+def _model_field(model, path):
+    """Campo de `model` al final de una ruta como 'artist__name'."""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def cursor_values(model, names, values):
+    """Valores del cursor convertidos al tipo de cada campo, o None si alguno no es válido."""
+    converted = []
+    for name, value in zip(names, values):
+        if isinstance(value, (list, dict)):
+            return None
+        try:
+            converted.append(_model_field(model, name).to_python(value))
+        except (ValidationError, TypeError, ValueError, FieldDoesNotExist):
+            return None
+    return converted
+
+
+def _after(field, value, descending):
+    """Filas que van después de `value` en la columna `field` (NULL al final)."""
+    if value is None:
+        return Q(pk__in=[])
+    op = 'lt' if descending else 'gt'
+    return Q(**{f'{field}__{op}': value}) | Q(**{f'{field}__isnull': True})
+
+
+def _before(field, value, descending):
+    if value is None:
+        return Q(**{f'{field}__isnull': False})
+    op = 'gt' if descending else 'lt'
+    return Q(**{f'{field}__{op}': value})
+
+
+def _equal(field, value):
+    if value is None:
+        return Q(**{f'{field}__isnull': True})
+    return Q(**{field: value})
+
+
+class KeysetPage:
+    """Página de resultados; imita la parte de Page que usan los templates."""
+
+    def __init__(self, object_list, has_next, has_previous, next_query=None, previous_query=None, result_limit=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_query = next_query
+        self.previous_query = previous_query
+        # tope de la búsqueda si se alcanzó (puede haber más coincidencias que no se muestran)
+        self.result_limit = result_limit
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginationMixin:
+    paginate_by = 25
+    keyset_fields = ('id',)
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_fields(self):
+        return self.keyset_fields
+
+    def get_search_ranking(self):
+        """pks ordenados por relevancia si hay una búsqueda activa; None para el orden normal."""
+        return None
+
+    def get_search_limit(self):
+        """Tope de resultados de get_search_ranking(); con tantos pks la búsqueda se cortó."""
+        return getattr(settings, 'SEARCH_RESULT_LIMIT', 1000)
+
+    def paginate_queryset(self, queryset, page_size):
+        ranking = self.get_search_ranking()
+        if ranking is not None:
+            return self._paginate_ranking(queryset, ranking, page_size)
+
+        fields = [(f.lstrip('-'), f.startswith('-')) for f in self.get_keyset_fields()]
+        keys = {f'_keyset_{i}': F(name) for i, (name, _) in enumerate(fields)}
+        queryset = queryset.annotate(**keys)
+
+        decoded = decode_cursor(self.request.GET.get(self.cursor_kwarg, ''), len(fields))
+        if decoded:
+            # el cursor viene del cliente: un valor del tipo equivocado lleva a la primera página
+            values = cursor_values(queryset.model, [name for name, _ in fields], decoded[0])
+            decoded = (values, decoded[1]) if values is not None else None
+        values, direction = decoded if decoded else (None, 'next')
+        backwards = direction == 'prev'
+
+        if values is not None:
+            compare = _before if backwards else _after
+            condition = Q(pk__in=[])
+            for i, (name, desc) in enumerate(fields):
+                term = compare(name, values[i], desc)
+                for prev_name, prev_value in zip((n for n, _ in fields[:i]), values[:i]):
+                    term &= _equal(prev_name, prev_value)
+                condition |= term
+            queryset = queryset.filter(condition)
+
+        ordering = []
+        for name, desc in fields:
+            # al ir hacia atrás se invierte el orden completo, incluidos los NULL
+            nulls = {'nulls_first': True} if backwards else {'nulls_last': True}
+            expr = F(name)
+            ordering.append(expr.desc(**nulls) if desc != backwards else expr.asc(**nulls))
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        page = KeysetPage(
+            rows, has_next, has_previous,
+            next_query=self._cursor_query([getattr(rows[-1], k) for k in keys], 'next') if rows and has_next else None,
+            previous_query=self._cursor_query([getattr(rows[0], k) for k in keys], 'prev') if rows and has_previous else None,
+        )
+        return None, page, rows, page.has_other_pages()
+
+    def _paginate_ranking(self, queryset, ranking, page_size):
+        """Pagina una lista de resultados ya ordenada (búsqueda); el cursor es la posición."""
+        # aplicar al ranking los demás filtros de la vista (estado, permisos...)
+        allowed = set(queryset.filter(pk__in=ranking).values_list('pk', flat=True))
+        ranked = [pk for pk in ranking if pk in allowed]
+
+        decoded = decode_cursor(self.request.GET.get(self.cursor_kwarg, ''), 1)
+        start = 0
+        if decoded and isinstance(decoded[0][0], int):
+            position, direction = decoded[0][0], decoded[1]
+            start = max(position - page_size, 0) if direction == 'prev' else max(position, 0)
+        page_ids = ranked[start:start + page_size]
+        objects = queryset.in_bulk(page_ids)
+        rows = [objects[pk] for pk in page_ids if pk in objects]
+        end = start + len(page_ids)
+
+        limit = self.get_search_limit()
+        page = KeysetPage(
+            rows, end < len(ranked), start > 0,
+            next_query=self._cursor_query([end], 'next') if end < len(ranked) else None,
+            previous_query=self._cursor_query([start], 'prev') if start > 0 else None,
+            result_limit=limit if len(ranking) >= limit else None,
+        )
+        return None, page, rows, page.has_other_pages()
+
+    def _cursor_query(self, values, direction):
+        params = self.request.GET.copy()
+        params[self.cursor_kwarg] = encode_cursor(values, direction)
+        return params.urlencode()
@@ -0,0 +1,44 @@
+"""
+Invalidación de la caché del catálogo (core/caching.py) y registro de borrados
+para el GET condicional (core/conditional.py).
+
+Cualquier alta, cambio o baja de estos modelos incrementa su versión; las
+listas que dependen de ellos dejan de encontrar sus entradas en caché.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from conciertos.models import Concert, Song, Tour
+from . import conditional
+from .caching import bump
+from .models import Artist, City, Venue
+
+CATALOG_MODELS = (Artist, City, Venue, Tour, Concert, Song)
+
+
+# receptores por modelo: uno genérico haría que Django no pudiera usar el borrado
+# rápido (DELETE sin cargar filas) en ninguna tabla
+@receiver(post_save, sender=Artist)
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Venue)
+@receiver(post_save, sender=Tour)
+@receiver(post_save, sender=Concert)
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=Venue)
+@receiver(post_delete, sender=Tour)
+@receiver(post_delete, sender=Concert)
+@receiver(post_delete, sender=Song)
+def bump_catalog_version(sender, **kwargs):
+    bump(sender)
+
+
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=Venue)
+@receiver(post_delete, sender=Tour)
+@receiver(post_delete, sender=Concert)
+@receiver(post_delete, sender=Song)
+def record_table_deletion(sender, **kwargs):
+    conditional.record_deletion(sender)
@@ -1,3 +1,586 @@
-from django.test import TestCase
+import datetime
+import json
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import benchmarks, caching, counts, explain, fanout, metrics
+from .middleware import MetricsMiddleware, SQLInstrumentationMiddleware, fingerprint
+from .pagination import encode_cursor
+from .models import Artist, City, RowCount, Venue
+from conciertos.models import Concert, Tour
+from fans.models import Attendance, Fan, Interest
+from conciertos.models import SetlistEntry, Song
+from search import engine
+
+
+class KeysetPaginationTest(TestCase):
+	def walk(self, url, key):
+		"""Recorre todas las páginas hacia delante y luego hacia atrás."""
+		forward, pages = [], []
+		resp = self.client.get(url)
+		while True:
+			page = resp.context['page_obj']
+			pages.append(page)
+			forward.extend(obj.pk for obj in resp.context[key])
+			if not page.has_next():
+				break
+			resp = self.client.get(url + '?' + page.next_query)
+		backward = []
+		while page.has_previous():
+			resp = self.client.get(url + '?' + page.previous_query)
+			page = resp.context['page_obj']
+			backward = [obj.pk for obj in resp.context[key]] + backward
+		return forward, backward, len(pages)
+
+	def test_artist_pages_follow_sort_order(self):
+		# nombres repetidos para que el desempate por id importe
+		for i in range(60):
+			Artist.objects.create(name=f'Artista {i % 7}', country='Colombia', genre='Rock')
+		expected = list(Artist.objects.order_by('name', 'id').values_list('pk', flat=True))
+		forward, backward, pages = self.walk(reverse('artist_list'), 'artists')
+		self.assertEqual(forward, expected)
+		self.assertEqual(backward, expected[:-(len(expected) % 25 or 25)])
+		self.assertEqual(pages, 3)
+
+	def test_tour_pages_with_null_dates(self):
+		artist = Artist.objects.create(name='Artista', country='Colombia', genre='Rock')
+		for i in range(30):
+			start = None if i % 4 == 0 else f'2024-01-{i % 9 + 1:02d}'
+			Tour.objects.create(artist=artist, name=f'Gira {i}', start_date=start)
+		tours = sorted(Tour.objects.all(), key=lambda t: (t.start_date is None, t.start_date or 0, t.pk))
+		forward, backward, pages = self.walk(reverse('tour_list'), 'tours')
+		self.assertEqual(forward, [t.pk for t in tours])
+		self.assertEqual(backward, [t.pk for t in tours][:24])
+		self.assertEqual(pages, 2)
+
+	@override_settings(SEARCH_RESULT_LIMIT=3)
+	def test_search_cap_is_shown(self):
+		engine.get_backend().reset()
+		for i in range(4):
+			Artist.objects.create(name=f'Banda {i}', country='Colombia', genre='Rock')
+		resp = self.client.get(reverse('artist_list'), {'query_artists': 'banda'})
+		self.assertEqual(len(resp.context['artists']), 3)
+		self.assertEqual(resp.context['page_obj'].result_limit, 3)
+		self.assertContains(resp, 'Se muestran los 3 resultados más relevantes')
+		resp = self.client.get(reverse('artist_list'), {'query_artists': 'banda 1'})
+		self.assertIsNone(resp.context['page_obj'].result_limit)
+
+	def test_invalid_cursor_falls_back_to_first_page(self):
+		Artist.objects.create(name='Artista', country='Colombia', genre='Rock')
+		resp = self.client.get(reverse('artist_list'), {'cursor': 'no-es-un-cursor'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(len(resp.context['artists']), 1)
+
+	def test_mistyped_cursor_falls_back_to_first_page(self):
+		artist = Artist.objects.create(name='Artista', country='Colombia', genre='Rock')
+		Tour.objects.create(artist=artist, name='Gira', start_date='2024-01-01')
+		for url, key in ((reverse('artist_list'), 'artists'), (reverse('tour_list'), 'tours')):
+			for values in (['ayer', {'x': 1}], [['a'], 'b'], ['2024-01-01', 'no-es-un-id']):
+				resp = self.client.get(url, {'cursor': encode_cursor(values, 'next')})
+				self.assertEqual(resp.status_code, 200)
+				self.assertEqual(len(resp.context[key]), 1)
+
+
+class ListQueryCountTest(TestCase):
+	"""El número de consultas de cada página no debe crecer con el número de filas."""
+
+	def seed(self, n):
+		start = Artist.objects.count()
+		artists = Artist.objects.bulk_create([
+			Artist(name=f'Artista {i}', country='Colombia', genre='Rock') for i in range(start, n)
+		])
+		cities = City.objects.bulk_create([City(name=f'Ciudad {i}', country='Colombia') for i in range(start, n)])
+		venues = Venue.objects.bulk_create([Venue(name=f'Venue {i}', city=c) for i, c in enumerate(cities, start)])
+		when = timezone.now() + datetime.timedelta(days=10)
+		concerts = Concert.objects.bulk_create([
+			Concert(artist=a, venue=v, start_datetime=when) for a, v in zip(artists, venues)
+		])
+		fans = Fan.objects.bulk_create([
+			Fan(full_name=f'Fan {i}', email=f'fan{i}@example.com', city=c) for i, c in enumerate(cities, start)
+		])
+		Interest.objects.bulk_create([Interest(fan=f, concert=c) for f, c in zip(fans, concerts)])
+		# bulk_create no dispara signals: invalidar las listas cacheadas y los conteos
+		caching.bump_all()
+		counts.refresh()
+
+	def count_queries(self, url):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def assertConstantQueries(self, url):
+		self.seed(10)
+		small = self.count_queries(url)
+		self.seed(500)
+		self.assertEqual(self.count_queries(url), small)
+
+	def test_artist_list(self):
+		self.assertConstantQueries(reverse('artist_list'))
+
+	def test_city_list(self):
+		self.assertConstantQueries(reverse('city_list'))
+
+	def test_venue_list(self):
+		self.assertConstantQueries(reverse('venue_list'))
+
+	def test_dashboard(self):
+		self.assertConstantQueries(reverse('dashboard'))
+
+
+class CatalogCacheTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.city = City.objects.create(name='Medellín', country='Colombia')
+		Venue.objects.create(name='Movistar Arena', city=self.city)
+
+	def get(self, url):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		return resp, len(ctx.captured_queries)
+
+	def test_second_request_skips_list_query(self):
+		_, first = self.get(reverse('venue_list'))
+		_, second = self.get(reverse('venue_list'))
+		self.assertLess(second, first)
+
+	def test_save_invalidates_dependent_lists(self):
+		resp, _ = self.get(reverse('venue_list'))
+		self.assertEqual(len(resp.context['venues']), 1)
+		Venue.objects.create(name='Teatro Metropolitano', city=self.city)
+		resp, _ = self.get(reverse('venue_list'))
+		self.assertEqual(len(resp.context['venues']), 2)
+		# la lista de venues muestra la ciudad: cambiarla también invalida
+		self.city.name = 'Envigado'
+		self.city.save()
+		resp, _ = self.get(reverse('venue_list'))
+		self.assertEqual(resp.context['venues'][0].city.name, 'Envigado')
+
+	def test_delete_invalidates_paginated_list(self):
+		artist = Artist.objects.create(name='Artista', country='Colombia', genre='Rock')
+		resp, _ = self.get(reverse('artist_list'))
+		self.assertEqual(len(resp.context['artists']), 1)
+		artist.delete()
+		resp, _ = self.get(reverse('artist_list'))
+		self.assertEqual(len(resp.context['artists']), 0)
+
+	@override_settings(METRICS_TOKEN='s3cret')
+	def test_hits_and_misses_are_counted(self):
+		self.get(reverse('city_list'))
+		self.get(reverse('city_list'))
+		body = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').content.decode()
+		self.assertIn('encore_cache_requests_total{cache="list:CityListView",result="hit"}', body)
+		self.assertIn('encore_cache_requests_total{cache="list:CityListView",result="miss"}', body)
+
+
+class SQLInstrumentationTest(TestCase):
+	def run_view(self, view):
+		middleware = SQLInstrumentationMiddleware(view)
+		with self.assertLogs('encoreanalytics.sql') as logs:
+			response = middleware(RequestFactory().get('/x/'))
+		return response, json.loads(logs.records[-1].getMessage())
+
+	def test_fingerprint_ignores_values(self):
+		self.assertEqual(
+			fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) AND n = 3'),
+			fingerprint('SELECT * FROM t WHERE id IN (%s) AND n = 41'),
+		)
+
+	def test_counts_queries_and_flags_repeated_statements(self):
+		artists = Artist.objects.bulk_create([Artist(name=f'A{i}', country='Colombia', genre='Rock') for i in range(6)])
+
+		def view(request):
+			for artist in artists:
+				Artist.objects.get(pk=artist.pk)
+			return HttpResponse('ok')
+
+		response, record = self.run_view(view)
+		self.assertIn('db;dur=', response['Server-Timing'])
+		self.assertIn('6 queries', response['Server-Timing'])
+		self.assertIn('db-repeated', response['Server-Timing'])
+		self.assertEqual(record['queries'], 6)
+		self.assertEqual(record['repeated'][0]['count'], 6)
+
+	@override_settings(SQL_SLOW_QUERY_MS=0)
+	def test_slow_queries_capture_project_stack(self):
+		def view(request):
+			Artist.objects.count()
+			return HttpResponse('ok')
+
+		_, record = self.run_view(view)
+		self.assertEqual(len(record['slow']), 1)
+		self.assertTrue(any('core/tests.py' in frame for frame in record['slow'][0]['stack']))
+
+
+	def test_async_view_counts_queries_without_sync_adaptation(self):
+		artist = Artist.objects.create(name='Async', country='Colombia', genre='Rock')
+
+		async def view(request):
+			await Artist.objects.aget(pk=artist.pk)
+			return StreamingHttpResponse(iter(['a']))
+
+		middleware = SQLInstrumentationMiddleware(view)
+		self.assertTrue(iscoroutinefunction(middleware))
+		with self.assertLogs('encoreanalytics.sql') as logs:
+			response = async_to_sync(middleware)(RequestFactory().get('/x/'))
+		record = json.loads(logs.records[-1].getMessage())
+		self.assertEqual(record['queries'], 1)
+		self.assertTrue(record['streaming'])
+		self.assertIsNone(record['total_ms'])
+		self.assertNotIn('total;dur=', response['Server-Timing'])
+
+class MetricsEndpointTest(TestCase):
+	def setUp(self):
+		self.client.force_login(User.objects.create_user('ops', password='x', is_staff=True))
+
+	def sample(self, text, line_prefix):
+		for line in text.splitlines():
+			if line.startswith(line_prefix):
+				return float(line.rsplit(' ', 1)[1])
+		return 0
+
+	def test_requests_are_counted_per_url_name(self):
+		key = 'encore_http_requests_total{method="GET",status="200",view="city_list"}'
+		before = self.sample(self.client.get(reverse('metrics')).content.decode(), key)
+		self.client.get(reverse('city_list'))
+		self.client.get(reverse('city_list'))
+		text = self.client.get(reverse('metrics')).content.decode()
+		self.assertEqual(self.sample(text, key), before + 2)
+		self.assertIn('# TYPE encore_http_request_duration_seconds histogram', text)
+		self.assertIn('encore_http_request_duration_seconds_bucket{view="city_list",le="+Inf"}', text)
+		self.assertIn('encore_db_queries_per_request_count{view="city_list"}', text)
+		# la propia petición a /metrics está en curso mientras se renderiza
+		self.assertEqual(self.sample(text, 'encore_http_requests_in_flight '), 1)
+
+	@override_settings(METRICS_ENABLED=False)
+	def test_disabled_endpoint_is_404(self):
+		self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+	@override_settings(METRICS_TOKEN='s3cret')
+	def test_anonymous_needs_the_bearer_token(self):
+		self.client.logout()
+		self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+		self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer nope').status_code, 403)
+		self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+		self.client.force_login(User.objects.create_user('fan', password='x'))
+		self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+	def test_multiprocess_files_are_aggregated(self):
+		registry = metrics.Registry()
+		hits = metrics.Counter('test_hits_total', 'Prueba.', registry=registry)
+		latency = metrics.Histogram('test_latency_seconds', 'Prueba.', buckets=(0.1, 1), registry=registry)
+		with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+			hits.inc(view='a')
+			latency.observe(0.5, view='a')
+			# otro "worker" con su propio fichero
+			other = metrics.MmapShard(f'{directory}/99999-0-1.db')
+			for _ in range(200):
+				other.inc(metrics._sample_key('test_hits_total', {'view': 'a'}), 1)
+			text = registry.render()
+		self.assertIn('test_hits_total{view="a"} 201', text)
+		self.assertIn('test_latency_seconds_bucket{view="a",le="0.1"} 0', text)
+		self.assertIn('test_latency_seconds_bucket{view="a",le="1"} 1', text)
+		self.assertIn('test_latency_seconds_count{view="a"} 1', text)
+
+
+	def test_async_streaming_view_skips_latency(self):
+		artist = Artist.objects.create(name='Async', country='Colombia', genre='Rock')
+
+		async def view(request):
+			await Artist.objects.aget(pk=artist.pk)
+
+			async def events():
+				yield 'data: 1\n\n'
+			return StreamingHttpResponse(events(), content_type='text/event-stream')
+
+		middleware = MetricsMiddleware(view)
+		self.assertTrue(iscoroutinefunction(middleware))
+		in_flight = self.sample(metrics.REGISTRY.render(), 'encore_http_requests_in_flight ')
+		request = RequestFactory().get('/stream/')
+		request.resolver_match = mock.Mock(view_name='test_stream')
+		response = async_to_sync(middleware)(request)
+		self.assertTrue(response.streaming)
+		text = metrics.REGISTRY.render()
+		self.assertNotIn('encore_http_request_duration_seconds_count{view="test_stream"}', text)
+		self.assertEqual(self.sample(text, 'encore_db_queries_per_request_count{view="test_stream"}'), 1)
+		self.assertEqual(self.sample(text, 'encore_http_requests_in_flight '), in_flight)
+
+class HotQueryPlanTest(TestCase):
+	"""Ninguna consulta registrada en core/explain.py debe recorrer una tabla entera."""
+
+	@classmethod
+	def setUpTestData(cls):
+		city = City.objects.create(name='Bogotá', country='Colombia')
+		artists = Artist.objects.bulk_create([Artist(name=f'A{i}', country='Colombia', genre='Rock') for i in range(50)])
+		venues = Venue.objects.bulk_create([Venue(name=f'V{i}', city=city) for i in range(50)])
+		now = timezone.now()
+		concerts = Concert.objects.bulk_create([
+			Concert(
+				artist=artists[i % 50], venue=venues[i % 50], start_datetime=now + datetime.timedelta(days=i - 100),
+				status=('scheduled', 'completed', 'canceled')[i % 3],
+			)
+			for i in range(300)
+		])
+		fans = Fan.objects.bulk_create([Fan(full_name=f'F{i}', email=f'f{i}@example.com') for i in range(100)])
+		Interest.objects.bulk_create([Interest(fan=fans[i % 100], concert=concerts[i]) for i in range(300)])
+		Attendance.objects.bulk_create([
+			Attendance(fan=fans[i % 100], concert=concerts[i], rating=(i % 10) + 1 if i % 4 else None) for i in range(300)
+		])
+		songs = Song.objects.bulk_create([Song(title=f'S{i}') for i in range(40)])
+		SetlistEntry.objects.bulk_create([
+			SetlistEntry(concert=concerts[i // 10], song=songs[i % 40], position=i % 10 + 1) for i in range(1000)
+		])
+
+	def test_hot_queries_use_indexes(self):
+		self.assertTrue(explain.HOT_QUERIES)
+		for name, build in explain.HOT_QUERIES.items():
+			with self.subTest(query=name):
+				self.assertEqual(explain.sequential_scans(build()), [])
+
+	def test_detects_sequential_scan(self):
+		# img no tiene índice: el harness debe señalar la tabla
+		self.assertEqual(explain.sequential_scans(Concert.objects.filter(img='x')), ['conciertos_concert'])
+
+
+class GenerateDatasetTest(TestCase):
+	def generate(self, seed=7):
+		call_command('generate_dataset', scale=0.02, seed=seed, stdout=StringIO())
+
+	def test_generates_consistent_data(self):
+		from analytics import rollups
+
+		self.generate()
+		self.assertEqual(Concert.objects.count(), 50)
+		self.assertEqual(Fan.objects.count(), 200)
+		self.assertTrue(Interest.objects.exists())
+		self.assertTrue(SetlistEntry.objects.exists())
+		# contadores, agregados y búsqueda recalculados tras la carga masiva
+		self.assertEqual(rollups.check_consistency(), [])
+		concert = Concert.objects.order_by('-interest_count').first()
+		self.assertEqual(concert.interest_count, concert.interested.count())
+		# los ids explícitos no rompen los inserts normales posteriores
+		Artist.objects.create(name='Nuevo', country='Colombia', genre='Rock')
+
+	def test_same_seed_same_data(self):
+		self.generate()
+		first = list(Concert.objects.order_by('pk').values_list('artist__name', 'venue__name', 'start_datetime'))
+		Concert.objects.all().delete()
+		self.generate()
+		second = list(Concert.objects.order_by('pk').values_list('artist__name', 'venue__name', 'start_datetime'))
+		self.assertEqual(first, second)
+
+
+class ImportConcertsTest(TestCase):
+	RECORDS = [
+		{'artist': 'Aterciopelados', 'genre': 'Rock', 'city': 'Bogotá', 'country': 'Colombia', 'venue': 'Movistar Arena',
+		 'tour': 'Gira 1', 'date': '2019-05-04T20:00:00', 'total_income': '1000.50',
+		 'setlist': ['Bolero Falaz', {'title': 'De Música Ligera', 'artist': 'Soda Stereo', 'is_cover': True, 'section': 'Encore'}]},
+		{'artist': 'aterciopelados', 'city': 'bogotá', 'country': 'Colombia', 'venue': 'movistar arena',
+		 'tour': 'gira 1', 'date': '2019-05-05T20:00:00', 'setlist': ['bolero falaz', 'Florecita Rockera', 'Florecita Rockera']},
+		{'artist': 'Soda Stereo', 'city': 'Buenos Aires', 'country': 'Argentina', 'venue': 'River', 'date': 'ayer'},
+		{'artist': 'Soda Stereo', 'city': 'Buenos Aires', 'country': 'Argentina', 'venue': 'River', 'date': '2007-10-19', 'setlist': 'De Música Ligera'},
+	]
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.addCleanup(self.dir.cleanup)
+
+	def dump(self, name, text):
+		path = f'{self.dir.name}/{name}'
+		with open(path, 'w', encoding='utf-8') as fh:
+			fh.write(text)
+		return path
+
+	def jsonl(self):
+		return self.dump('conciertos.jsonl', '\n'.join(json.dumps(r) for r in self.RECORDS) + '\n')
+
+	def run_import(self, path, *args):
+		out, err = StringIO(), StringIO()
+		call_command('import_concerts', path, *args, stdout=out, stderr=err)
+		return out.getvalue(), err.getvalue()
+
+	def test_import_deduplicates_and_reports_errors(self):
+		_, err = self.run_import(self.jsonl(), '--chunk-size', '2')
+		self.assertIn('registro 3: fecha inválida', err)
+		self.assertEqual((Artist.objects.count(), City.objects.count(), Venue.objects.count(), Tour.objects.count()), (2, 2, 2, 1))
+		self.assertEqual(Concert.objects.count(), 3)
+		# la canción propia se resuelve igual en los dos conciertos; la repetida en un setlist cuenta una vez
+		self.assertEqual(Song.objects.count(), 3)
+		second = Concert.objects.get(start_datetime__day=5)
+		self.assertEqual(list(second.setlist_entries.values_list('song__title', 'position')), [('Bolero Falaz', 1), ('Florecita Rockera', 2)])
+		cover = SetlistEntry.objects.get(song__title='De Música Ligera', concert__artist__name='Aterciopelados')
+		# Soda Stereo aún no existía como artista: se guarda el nombre, como en el alta manual
+		self.assertEqual((cover.is_cover, cover.section, cover.song.original_artist_name), (True, 'Encore', 'Soda Stereo'))
+		# y su concierto posterior reutiliza la misma canción
+		self.assertEqual(Song.objects.filter(title='De Música Ligera').count(), 1)
+		from analytics import rollups
+		self.assertEqual(rollups.check_consistency(), [])
+
+		# repetir la importación no duplica nada
+		out, _ = self.run_import(self.jsonl())
+		self.assertIn('0 conciertos importados, 3 ya existían', out)
+		self.assertEqual(Concert.objects.count(), 3)
+
+	def test_resume_from_checkpoint(self):
+		path = self.jsonl()
+		with open(f'{path}.checkpoint', 'w') as fh:
+			json.dump({'offset': 3}, fh)
+		self.run_import(path, '--resume', '--no-rebuild')
+		self.assertEqual(list(Concert.objects.values_list('artist__name', flat=True)), ['Soda Stereo'])
+		with open(f'{path}.checkpoint') as fh:
+			self.assertEqual(json.load(fh)['offset'], 4)
+
+	def test_csv_with_process_pool(self):
+		path = self.dump('conciertos.csv', (
+			'artist,artist_country,genre,city,country,venue,tour,date,status,total_income,setlist\n'
+			'Bomba Estéreo,Colombia,Electro,Cali,Colombia,Arena,,2020-01-01T21:00:00,completed,,Fuego;Soy Yo | Otra\n'
+			'Bomba Estéreo,Colombia,Electro,Cali,Colombia,Arena,,2020-01-02T21:00:00,scheduled,,\n'
+		))
+		self.run_import(path, '--workers', '2', '--chunk-size', '1', '--no-rebuild')
+		self.assertEqual(Concert.objects.count(), 2)
+		song = Song.objects.get(title='Soy Yo')
+		self.assertEqual((song.original_artist, song.original_artist_name), (None, 'Otra'))
+
+
+class BenchmarkTest(TestCase):
+	def test_discovers_project_endpoints(self):
+		names = {name for name, _ in benchmarks.discover_endpoints()}
+		self.assertIn('concert_list', names)
+		self.assertIn('analytics_dashboard', names)
+		self.assertIn('concert_detail', names)
+		self.assertFalse(names & benchmarks.SKIP)
+		# una URL por gráfica del dashboard de analytics
+		charts = dict(benchmarks.endpoint_urls('analytics_chart', ['chart']))
+		self.assertEqual(charts['analytics_chart:songs'], reverse('analytics_chart', args=['songs']))
+		self.assertEqual(len(charts), 6)
+
+	def test_measures_endpoint(self):
+		Artist.objects.create(name='Artista', country='Colombia', genre='Rock')
+		# una lista sin caché: con la caché caliente artist_list no hace consultas
+		result = benchmarks.measure(self.client, reverse('concert_list'), iterations=3)
+		self.assertEqual(result['status'], 200)
+		self.assertGreater(result['queries'], 0)
+		self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+	def test_compare_flags_regressions(self):
+		base = {'status': 200, 'p50_ms': 10, 'p95_ms': 20, 'queries': 4, 'peak_kib': 100}
+		baseline = {
+			'tolerances': {
+				'concert_list': {'latency_ratio': 1.2, 'latency_slack_ms': 0},
+				'analytics_chart': {'latency_ratio': 1.2, 'latency_slack_ms': 0},
+			},
+			'results': {'small': {'concert_list': base, 'tour_list': base, 'analytics_chart:income': base}},
+		}
+		within = {'small': {'concert_list': {**base, 'p95_ms': 23}, 'tour_list': {**base, 'p95_ms': 35}}}
+		self.assertEqual(benchmarks.compare(within, baseline), [])
+		slower = {'small': {
+			'concert_list': {**base, 'p95_ms': 25}, 'tour_list': {**base, 'queries': 5},
+			'analytics_chart:income': {**base, 'p95_ms': 25},
+		}}
+		regressions = benchmarks.compare(slower, baseline)
+		self.assertEqual(len(regressions), 3)
+		self.assertTrue(regressions[0].startswith('small/concert_list: p95'))
+		self.assertTrue(regressions[2].startswith('small/analytics_chart:income: p95'))
+
+
+@override_settings(ESTIMATED_COUNT_THRESHOLD=2)
+class EstimatedCountTest(TestCase):
+	def test_counters_follow_writes(self):
+		Artist.objects.bulk_create([Artist(name=f'A{i}', country='Chile', genre='Rock') for i in range(3)])
+		# primera lectura: cuenta de verdad y crea el contador
+		self.assertEqual(counts.estimate(Artist), 3)
+		artist = Artist.objects.create(name='Otro', country='Chile', genre='Pop')
+		with self.assertNumQueries(1):
+			self.assertEqual(counts.estimate(Artist), 4)
+		artist.delete()
+		Artist.objects.filter(name='A0').delete()
+		self.assertEqual(counts.estimate(Artist), 2)
+		# las cargas masivas no disparan signals: refresh() resincroniza
+		Artist.objects.bulk_create([Artist(name='B', country='Chile', genre='Rock')])
+		self.assertEqual(counts.estimate(Artist), 2)
+		counts.refresh(Artist)
+		self.assertEqual(counts.estimate(Artist), 3)
+
+	def test_below_threshold_counts_exactly(self):
+		City.objects.create(name='Quito', country='Ecuador')
+		counts.refresh(City)
+		City.objects.bulk_create([City(name='Cuenca', country='Ecuador')])
+		self.assertEqual(counts.estimate(City), 2)
+
+	def test_admin_changelist_uses_estimate(self):
+		user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+		self.client.force_login(user)
+		Artist.objects.bulk_create([Artist(name=f'A{i}', country='Chile', genre='Rock') for i in range(5)])
+		counts.refresh(Artist)
+		# el contador manda aunque no coincida con la tabla
+		RowCount.objects.filter(model='core.artist').update(rows=7)
+		resp = self.client.get(reverse('admin:core_artist_changelist'))
+		self.assertEqual(resp.context['cl'].result_count, 7)
+		resp = self.client.get(reverse('admin:core_artist_changelist'), {'q': 'A1'})
+		self.assertEqual(resp.context['cl'].result_count, 1)
+
+
+@mock.patch.object(fanout, '_cancellable', return_value=True)
+class QueryFanoutTest(SimpleTestCase):
+	def slow(self, value, seconds=0.2):
+		def task():
+			time.sleep(seconds)
+			return value, threading.current_thread().name
+		return task
+
+	def test_tasks_run_concurrently(self, _):
+		start = time.monotonic()
+		results = fanout.run({'a': self.slow(1), 'b': self.slow(2), 'c': self.slow(3)})
+		self.assertLess(time.monotonic() - start, 0.5)
+		self.assertEqual({name: value for name, (value, _) in results.items()}, {'a': 1, 'b': 2, 'c': 3})
+		self.assertTrue(all(thread.startswith('fanout') for _, thread in results.values()))
+
+	def test_timeout_uses_default_or_raises(self, _):
+		results = fanout.run({'fast': self.slow(1, 0), 'slow': self.slow(2, 0.3)}, timeout=0.05, defaults={'slow': None})
+		self.assertEqual(results['fast'][0], 1)
+		self.assertIsNone(results['slow'])
+		with self.assertRaises(fanout.QueryTimeout):
+			fanout.run({'slow': self.slow(2, 0.3)}, timeout=0.05)
+
+	@override_settings(QUERY_FANOUT_WORKERS=0)
+	def test_disabled_runs_in_order(self, _):
+		results = fanout.run({'a': self.slow(1, 0)})
+		self.assertEqual(results['a'], (1, threading.current_thread().name))
+
+	def test_runs_in_order_without_statement_timeout(self, cancellable):
+		# una consulta vencida no se podría cancelar y seguiría ocupando un hilo del pool
+		cancellable.return_value = False
+		results = fanout.run({'a': self.slow(1, 0)})
+		self.assertEqual(results['a'], (1, threading.current_thread().name))
+
+	def test_check_warns_without_persistent_connections(self, _):
+		database = {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'encore'}
+		with override_settings(DATABASES={'default': database}):
+			self.assertEqual([w.id for w in fanout.check_connections()], ['core.W001'])
+		with override_settings(DATABASES={'default': {**database, 'CONN_MAX_AGE': 60}}):
+			self.assertEqual(fanout.check_connections(), [])
+		with override_settings(DATABASES={'default': database}, QUERY_FANOUT_WORKERS=0):
+			self.assertEqual(fanout.check_connections(), [])
+
+
+class QueryFanoutAtomicTest(TestCase):
+	def test_open_transaction_runs_in_calling_thread(self):
+		# otra conexión no vería el artista sin confirmar
+		Artist.objects.create(name='Solo aquí', country='Chile', genre='Rock')
+		results = fanout.run({'count': Artist.objects.count, 'thread': lambda: threading.current_thread().name})
+		self.assertEqual(results, {'count': 1, 'thread': threading.current_thread().name})
@@ -14,4 +14,6 @@ urlpatterns = [
     # venues 
     path('venues/', views.VenueListView.as_view(), name='venue_list'),
     path('venues/add/', views.VenueCreateView.as_view(), name='venue_add'),
+    # opciones de los selects con catálogos grandes (core/choices.py)
+    path('api/autocomplete/<str:entity>/', views.autocomplete, name='autocomplete'),
 ]
\ No newline at end of file
@@ -1,36 +1,42 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponseNotAllowed
+import hmac
+
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse
 from django.views.generic import ListView, CreateView, UpdateView
 from django.urls import reverse_lazy
 from .models import Artist, City, Venue
 from .forms import ArtistForm
 from .countries import get_countries
 from .genres import get_genres
-from django.db.models import Q
+from django.conf import settings
 from django.utils import timezone
 from conciertos.models import Concert
 from fans.models import Fan, Interest
+from .pagination import KeysetPaginationMixin
+from .caching import CachedListMixin
+from . import choices, counts, fanout
+from . import metrics as app_metrics
+from search import autocomplete as autocomplete_index
+from search import engine as search_engine
 
 # Create your views here.
 def HomeView(request):
     return render(request, 'base.html')
 
 # Artist views
-class ArtistListView(ListView):
+class ArtistListView(CachedListMixin, KeysetPaginationMixin, ListView):
     model = Artist
     template_name = 'core/artist_list.html'
     context_object_name = 'artists'
     queryset = Artist.objects.all().order_by('name')
+    keyset_fields = ('name', 'id')
+    cache_models = (Artist,)
 
-    def get_queryset(self):
-        qs = super().get_queryset()
+    def get_search_ranking(self):
+        # Buscar por nombre, país o género en el índice de búsqueda (ordenado por relevancia)
         q = self.request.GET.get('query_artists', '').strip()
-        if q:
-            # Buscar por nombre, país o género (case-insensitive)
-            qs = qs.filter(
-                Q(name__icontains=q) | Q(country__icontains=q) | Q(genre__icontains=q)
-            ).order_by('name')
-        return qs
+        return search_engine.query('artist', q) if q else None
 
 class ArtistCreateView(CreateView):
     model = Artist
@@ -74,38 +80,38 @@ def artist_delete(request, pk):
 
 def dashboard(request):
     """Render the dashboard with simple metrics and upcoming concerts."""
-    # conteos básicos
-    artists_count = Artist.objects.count()
-    concerts_count = Concert.objects.count()
-    fans_count = Fan.objects.count()
-
-    # próximos conciertos: programados y con fecha >= ahora
     now = timezone.now()
-    upcoming_concerts = (
-        Concert.objects.filter(status='scheduled', start_datetime__gte=now)
-        .select_related('artist', 'venue')
-        .order_by('start_datetime')[:6]
-    )
-
-    context = {
-        'artists_count': artists_count,
-        'concerts_count': concerts_count,
-        'fans_count': fans_count,
-        'upcoming_concerts': upcoming_concerts,
+    # las consultas son independientes: se lanzan a la vez (core/fanout.py)
+    context = fanout.run({
+        # conteos básicos, estimados en tablas grandes (core/counts.py); sin valor si tardan demasiado
+        'counts': lambda: counts.estimate_many(Artist, Concert, Fan),
+        # próximos conciertos: programados y con fecha >= ahora
+        'upcoming_concerts': lambda: list(
+            Concert.objects.filter(status='scheduled', start_datetime__gte=now)
+            .select_related('artist', 'venue')
+            .order_by('start_datetime')[:6]
+        ),
         # últimas expresiones de interés (fans interesados en conciertos)
-        'recent_interests': (
+        'recent_interests': lambda: list(
             Interest.objects.select_related('fan', 'concert', 'concert__artist', 'concert__venue')
             .order_by('-created_at')[:3]
         ),
-    }
+    }, defaults={'counts': {}, 'upcoming_concerts': [], 'recent_interests': []})
+    estimated = context.pop('counts')
+    context.update({
+        'artists_count': estimated.get(Artist),
+        'concerts_count': estimated.get(Concert),
+        'fans_count': estimated.get(Fan),
+    })
     return render(request, 'dashboard.html', context)
     
 # City views
-class CityListView(ListView):
+class CityListView(CachedListMixin, ListView):
     model = City
     template_name = 'core/city_list.html'
     context_object_name = 'cities'
     queryset = City.objects.all().order_by('name')
+    cache_models = (City,)
 
 class CityCreateView(CreateView):
     model = City
@@ -114,14 +120,47 @@ class CityCreateView(CreateView):
     success_url = reverse_lazy('city_list')
     
 # Venue views
-class VenueListView(ListView):
+class VenueListView(CachedListMixin, ListView):
     model = Venue
     template_name = 'core/venue_list.html'
     context_object_name = 'venues'
     queryset = Venue.objects.select_related('city').all().order_by('name')
+    cache_models = (Venue, City)
 
 class VenueCreateView(CreateView):
     model = Venue
     template_name = 'core/venue_form.html'
     fields = ['name', 'address', 'capacity', 'city']
-    success_url = reverse_lazy('venue_list')
\ No newline at end of file
+    success_url = reverse_lazy('venue_list')
+
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+        return True
+    return request.user.is_active and request.user.is_staff
+
+
+def metrics(request):
+    """Métricas en formato de texto de Prometheus (ver core/metrics.py).
+
+    Solo para staff o para quien envíe `Authorization: Bearer <METRICS_TOKEN>`
+    (el scraper de Prometheus).
+    """
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404
+    if not _metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(app_metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def autocomplete(request, entity):
+    """Opciones {id, label} de `entity` con una palabra que empieza por ?q=, las más populares primero.
+
+    Sale del índice en memoria de search/autocomplete.py, sin consultas salvo
+    la primera vez que el proceso lo construye.
+    """
+    if entity not in choices.SOURCES:
+        raise Http404
+    return JsonResponse({'results': autocomplete_index.query(entity, request.GET.get('q', ''))})
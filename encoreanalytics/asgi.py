@@ -3,6 +3,10 @@ ASGI config for encoreanalytics project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through this entry point (e.g. ``uvicorn encoreanalytics.asgi:application``)
+with ``LIVE_UPDATES=True`` enables the Server-Sent Events stream in fans/live.py;
+each open stream is a long-lived connection handled without blocking a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -41,6 +41,8 @@ INSTALLED_APPS = [
     'core',
     'conciertos',
     'fans',
+    'analytics',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -85,6 +87,9 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
+        # conexiones persistentes: los hilos de core/fanout.py reutilizan la suya entre peticiones
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -136,3 +141,87 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Redirigir al login tras cerrar sesión
 LOGOUT_REDIRECT_URL = 'login'
+
+# Actualizaciones en vivo (SSE) de interés y calificaciones; requiere servir con
+# encoreanalytics.asgi. Ver fans/live.py para los backends disponibles.
+LIVE_UPDATES = config('LIVE_UPDATES', default=False, cast=bool)
+LIVE_UPDATES_BACKEND = config('LIVE_UPDATES_BACKEND', default='fans.live.LocalBackend')
+# FileBackend: el archivo de eventos se rota (una generación, <archivo>.1) al pasar de este tamaño
+LIVE_UPDATES_SPOOL_MAX_BYTES = config('LIVE_UPDATES_SPOOL_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+
+# Backend de búsqueda: 'auto' usa índices trigram de PostgreSQL si la base es
+# PostgreSQL y un índice invertido en memoria en otro caso (ver search/backends.py).
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='auto')
+# Resultados máximos de una búsqueda; las listas avisan cuando se llega al tope.
+SEARCH_RESULT_LIMIT = config('SEARCH_RESULT_LIMIT', default=1000, cast=int)
+# Similitud mínima de palabra (pg_trgm.word_similarity_threshold, 0-1) de cada término en PostgreSQL.
+SEARCH_WORD_SIMILARITY = config('SEARCH_WORD_SIMILARITY', default=0.6, cast=float)
+
+# Instrumentación de SQL por petición (cabecera Server-Timing + línea JSON en el
+# logger 'encoreanalytics.sql'); ver core/middleware.py. Desactivada por defecto.
+SQL_INSTRUMENTATION = config('SQL_INSTRUMENTATION', default=False, cast=bool)
+# consultas más lentas que esto (ms) guardan la pila de la vista/template que las lanzó
+SQL_SLOW_QUERY_MS = config('SQL_SLOW_QUERY_MS', default=100, cast=int)
+# a partir de cuántas repeticiones de la misma sentencia se reporta como posible N+1
+SQL_REPEATED_QUERY_THRESHOLD = config('SQL_REPEATED_QUERY_THRESHOLD', default=5, cast=int)
+if SQL_INSTRUMENTATION:
+    # primero, para medir también el SQL de sesiones y autenticación
+    MIDDLEWARE.insert(0, 'core.middleware.SQLInstrumentationMiddleware')
+
+# Caché de listas y catálogo (core/caching.py). Por defecto LocMemCache: LRU por proceso,
+# expulsa las entradas menos usadas al llegar a CACHE_MAX_ENTRIES. Con varios workers usar un
+# backend compartido para que la invalidación llegue a todos, p. ej.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='encoreanalytics'),
+    },
+}
+if CACHE_BACKEND.rsplit('.', 1)[-1] in ('LocMemCache', 'FileBasedCache', 'DatabaseCache'):
+    # solo estos backends aceptan MAX_ENTRIES; Redis/Memcached gestionan su propia memoria
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)}
+
+# GET condicional (ETag/Last-Modified) de listas, detalle y dashboards; ver core/conditional.py.
+# Cambiarlo en cada despliegue que modifique templates (p. ej. el commit desplegado) para que
+# los ETag ya emitidos dejen de coincidir.
+ETAG_SALT = config('ETAG_SALT', default='')
+
+# Consultas independientes de los dashboards en paralelo (core/fanout.py): hilos del pool
+# (0 = en serie) y segundos máximos por consulta. Solo en PostgreSQL, que puede cancelarlas;
+# sin CONN_MAX_AGE (ni un pooler) cada tarea abre conexión y `check` lo avisa (core.W001).
+QUERY_FANOUT_WORKERS = config('QUERY_FANOUT_WORKERS', default=4, cast=int)
+QUERY_FANOUT_TIMEOUT = config('QUERY_FANOUT_TIMEOUT', default=5, cast=float)
+
+# Conteos de tabla completa del dashboard y del admin (core/counts.py): por debajo de estas
+# filas estimadas se hace un COUNT(*) exacto.
+ESTIMATED_COUNT_THRESHOLD = config('ESTIMATED_COUNT_THRESHOLD', default=10000, cast=int)
+
+# Selects de artista, venue, gira y canción (core/choices.py): con más filas que esto pintan un
+# buscador contra /api/autocomplete/ en lugar de la lista completa.
+CHOICE_REMOTE_THRESHOLD = config('CHOICE_REMOTE_THRESHOLD', default=500, cast=int)
+# /api/autocomplete/ (search/autocomplete.py): resultados por consulta y segundos tras los que
+# cada proceso reconstruye su índice (recoge escrituras de otros procesos y la popularidad).
+AUTOCOMPLETE_LIMIT = config('AUTOCOMPLETE_LIMIT', default=20, cast=int)
+AUTOCOMPLETE_MAX_AGE = config('AUTOCOMPLETE_MAX_AGE', default=300, cast=int)
+
+# Endpoint /metrics (formato Prometheus) y el middleware que lo alimenta; ver core/metrics.py.
+# Con varios workers (gunicorn) apuntar METRICS_MULTIPROC_DIR a un directorio vacío compartido.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+# /metrics solo responde a staff o a `Authorization: Bearer <METRICS_TOKEN>` (vacío: solo staff)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'core.middleware.MetricsMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'encoreanalytics.sql': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
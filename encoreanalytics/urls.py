@@ -21,6 +21,7 @@ from core import views as core_views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', core_views.dashboard, name='dashboard'),
+    path('metrics', core_views.metrics, name='metrics'),
     path('', include('core.urls')), #home y modelos base
     path('fans/', include('fans.urls')),
     path('concerts/', include('conciertos.urls')),
@@ -1,21 +1,25 @@
 from django.contrib import admin
+from core.admin import EstimatedCountAdmin
 from .models import Fan, Attendance, Interest
 
 # Register your models here.
 @admin.register(Fan)
-class FanAdmin(admin.ModelAdmin):
+class FanAdmin(EstimatedCountAdmin):
     list_display = ('full_name', 'email', 'city', 'birthdate')
+    list_select_related = ('city',)
     search_fields = ('full_name', 'email')
     list_filter = ('city',)
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(EstimatedCountAdmin):
     list_display = ('fan', 'concert', 'rating')
+    list_select_related = ('fan', 'concert__artist', 'concert__venue')
     search_fields = ('fan__full_name', 'concert__artist__name', 'concert__venue__name')
     list_filter = ('concert',)
 
 @admin.register(Interest)
-class InterestAdmin(admin.ModelAdmin):
+class InterestAdmin(EstimatedCountAdmin):
     list_display = ('fan', 'concert', 'created_at')
+    list_select_related = ('fan', 'concert__artist', 'concert__venue')
     search_fields = ('fan__full_name', 'concert__artist__name', 'concert__venue__name')
     list_filter = ('created_at',)
\ No newline at end of file
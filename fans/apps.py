@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fans'
+
+    def ready(self):
+        # registrar los signals que mantienen los contadores de Concert
+        from . import signals  # noqa: F401
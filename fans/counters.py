@@ -0,0 +1,58 @@
+"""
+Contadores desnormalizados sobre Concert que dependen de tablas de fans.
+
+Se actualizan con incrementos atómicos (F()) desde fans/signals.py, por lo que
+quedan dentro de la misma transacción que la escritura que los origina. Cada
+UPDATE mueve también Concert.counters_updated_at, la versión que usa el GET
+condicional de las páginas que muestran estos contadores.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
+
+from conciertos.models import Concert
+from .models import Attendance, Interest
+
+
+def add_interest(concert_id, delta=1):
+    qs = Concert.objects.filter(pk=concert_id)
+    if delta < 0:
+        # nunca bajar de cero aunque el contador se haya desincronizado
+        qs = qs.filter(interest_count__gte=-delta)
+    qs.update(interest_count=F('interest_count') + delta, counters_updated_at=Now())
+
+
+def apply_rating(concert_id, old_rating, new_rating):
+    """Aplica a Concert el cambio de una calificación (None = sin calificar)."""
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    if not sum_delta and not count_delta:
+        return
+    qs = Concert.objects.filter(pk=concert_id)
+    if sum_delta < 0 or count_delta < 0:
+        # nunca bajar de cero aunque los totales se hayan desincronizado
+        qs = qs.filter(rating_sum__gte=-min(sum_delta, 0), rating_count__gte=-min(count_delta, 0))
+    qs.update(
+        rating_sum=F('rating_sum') + sum_delta,
+        rating_count=F('rating_count') + count_delta,
+        counters_updated_at=Now(),
+    )
+
+
+def rebuild_interest_counts():
+    """Recalcula Concert.interest_count a partir de la tabla Interest."""
+    counts = (
+        Interest.objects.filter(concert=OuterRef('pk'))
+        .order_by().values('concert')
+        .annotate(n=Count('pk')).values('n')
+    )
+    return Concert.objects.update(interest_count=Coalesce(Subquery(counts), Value(0)), counters_updated_at=Now())
+
+
+def rebuild_rating_totals():
+    """Recalcula Concert.rating_sum/rating_count a partir de Attendance."""
+    rated = Attendance.objects.filter(concert=OuterRef('pk'), rating__isnull=False).order_by().values('concert')
+    return Concert.objects.update(
+        rating_sum=Coalesce(Subquery(rated.annotate(total=Sum('rating')).values('total')), Value(0)),
+        rating_count=Coalesce(Subquery(rated.annotate(n=Count('pk')).values('n')), Value(0)),
+        counters_updated_at=Now(),
+    )
@@ -0,0 +1,226 @@
+"""
+Actualizaciones en vivo (Server-Sent Events) de interés y calificaciones.
+
+Las vistas síncronas publican eventos con `publish_concert()` una vez hecha la
+transacción; el hub los reparte a los streams abiertos en el proceso que se
+hayan suscrito a ese concierto. El backend es configurable con
+settings.LIVE_UPDATES_BACKEND:
+
+- 'fans.live.LocalBackend' (por defecto): reparte solo dentro del proceso.
+- 'fans.live.FileBackend': sustituto local de un broker para despliegues con
+  varios workers; cada evento se añade a un archivo compartido
+  (settings.LIVE_UPDATES_SPOOL) que todos los workers leen. Rota solo al
+  superar LIVE_UPDATES_SPOOL_MAX_BYTES.
+
+El stream solo tiene sentido servido por encoreanalytics.asgi; bajo WSGI se
+desactiva (settings.LIVE_UPDATES = False) y las páginas vuelven a hacer polling.
+"""
+import asyncio
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# eventos pendientes por suscriptor antes de descartar (cliente lento)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, hub, concert_ids):
+        self.hub = hub
+        self.concert_ids = set(concert_ids)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        # llamado desde cualquier hilo: encolar en el loop del suscriptor
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def __aenter__(self):
+        self.hub.add(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.hub.remove(self)
+
+
+class Hub:
+    """Registro en memoria de suscripciones por concierto."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_concert = {}
+
+    def subscribe(self, concert_ids):
+        return Subscription(self, concert_ids)
+
+    def add(self, sub):
+        with self._lock:
+            for concert_id in sub.concert_ids:
+                self._by_concert.setdefault(concert_id, set()).add(sub)
+
+    def remove(self, sub):
+        with self._lock:
+            for concert_id in sub.concert_ids:
+                subs = self._by_concert.get(concert_id)
+                if subs:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._by_concert[concert_id]
+
+    def dispatch(self, event):
+        with self._lock:
+            subs = list(self._by_concert.get(event.get('concert_id'), ()))
+        for sub in subs:
+            sub.deliver(event)
+
+
+class LocalBackend:
+    def __init__(self, hub, **options):
+        self.hub = hub
+
+    def publish(self, event):
+        self.hub.dispatch(event)
+
+    def start(self):
+        pass
+
+
+class FileBackend:
+    """Broker mínimo basado en un archivo de eventos (JSON lines) compartido.
+
+    Al pasar de `max_bytes` el publicador que lo detecta renombra el archivo a
+    `<path>.1` (se conserva una generación) y los siguientes eventos van a uno
+    nuevo. Publicar y rotar se hace con flock sobre el archivo, así que ningún
+    evento se escribe en la generación vieja después del renombrado; los
+    lectores terminan de leerla por su descriptor abierto y pasan a la nueva.
+    Un lector que tarde más de una generación entera en volver a mirar pierde
+    la intermedia: `max_bytes` debe dar para muchos intervalos de sondeo.
+    Sin fcntl (Windows) no se rota: el archivo debe rotarse por fuera.
+    """
+
+    def __init__(self, hub, path=None, poll_interval=0.5, max_bytes=None, **options):
+        self.hub = hub
+        self.path = path or getattr(settings, 'LIVE_UPDATES_SPOOL', None) or os.path.join(settings.BASE_DIR, 'live_updates.jsonl')
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes or getattr(settings, 'LIVE_UPDATES_SPOOL_MAX_BYTES', 10 * 1024 * 1024)
+        self._task = None
+
+    def _is_current(self, fd):
+        try:
+            return os.stat(self.path).st_ino == os.fstat(fd).st_ino
+        except FileNotFoundError:
+            return False
+
+    def publish(self, event):
+        line = (json.dumps(event) + '\n').encode()
+        while True:
+            # O_APPEND: escrituras pequeñas de varios procesos no se intercalan
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                    if not self._is_current(fd):
+                        # otro proceso rotó entre el open y el lock
+                        continue
+                    if os.fstat(fd).st_size >= self.max_bytes:
+                        os.replace(self.path, f'{self.path}.1')
+                        continue
+                os.write(fd, line)
+                return
+            finally:
+                # cerrar libera el flock
+                os.close(fd)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._tail())
+
+    def _open(self, at_end=False):
+        try:
+            fh = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+        if at_end:
+            fh.seek(0, os.SEEK_END)
+        return fh
+
+    def _drain(self, fh):
+        if os.fstat(fh.fileno()).st_size < fh.tell():
+            # truncado por fuera (p. ej. logrotate con copytruncate)
+            fh.seek(0)
+        chunk = fh.read()
+        # procesar solo líneas completas; el resto se relee en la siguiente vuelta
+        end = chunk.rfind(b'\n') + 1
+        if end < len(chunk):
+            fh.seek(end - len(chunk), os.SEEK_CUR)
+        for line in chunk[:end].splitlines():
+            try:
+                self.hub.dispatch(json.loads(line))
+            except ValueError:
+                continue
+
+    async def _tail(self):
+        fh = self._open(at_end=True)
+        try:
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                if fh is None:
+                    # aún no existe (o se acaba de rotar): la nueva generación se lee desde el principio
+                    fh = self._open()
+                    continue
+                self._drain(fh)
+                if not self._is_current(fh.fileno()):
+                    # rotado: ya nadie escribe en esta generación, se lee lo que quede
+                    self._drain(fh)
+                    fh.close()
+                    fh = self._open()
+                    if fh is not None:
+                        self._drain(fh)
+        finally:
+            if fh is not None:
+                fh.close()
+
+
+hub = Hub()
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'LIVE_UPDATES_BACKEND', 'fans.live.LocalBackend')
+        options = getattr(settings, 'LIVE_UPDATES_OPTIONS', {})
+        _backend = import_string(path)(hub, **options)
+    return _backend
+
+
+def is_enabled():
+    return getattr(settings, 'LIVE_UPDATES', False)
+
+
+def publish_concert(concert_id, **fields):
+    """Publica el nuevo estado de un concierto (interest_count, avg_rating, rating_count...)."""
+    if not is_enabled():
+        return
+    get_backend().publish({'concert_id': concert_id, **fields})
+
+
+def format_event(event):
+    return f"event: concert\ndata: {json.dumps(event)}\n\n"
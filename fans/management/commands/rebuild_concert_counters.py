@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from fans import counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores desnormalizados de Concert a partir de las tablas de fans.'
+
+    def handle(self, *args, **options):
+        updated = counters.rebuild_interest_counts()
+        self.stdout.write(f'interest_count: {updated} conciertos actualizados')
+        updated = counters.rebuild_rating_totals()
+        self.stdout.write(f'rating_sum/rating_count: {updated} conciertos actualizados')
+        self.stdout.write(self.style.SUCCESS('Contadores recalculados.'))
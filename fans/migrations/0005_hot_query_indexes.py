@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conciertos', '0008_hot_query_indexes'),
+        ('fans', '0004_fan_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('rating__isnull', False)), fields=['concert', 'rating'], name='attendance_rated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interest',
+            index=models.Index(fields=['-created_at'], name='interest_created_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 from core.models import City
 from conciertos.models import Concert
@@ -32,6 +33,10 @@ class Attendance(models.Model):
     
     class Meta:
         unique_together = ('fan', 'concert')
+        indexes = [
+            # agregados de calificación por concierto: solo filas calificadas, sin tocar la tabla
+            models.Index(fields=['concert', 'rating'], name='attendance_rated_idx', condition=Q(rating__isnull=False)),
+        ]
     
 class Interest(models.Model):
     fan = models.ForeignKey(Fan, on_delete=models.CASCADE, related_name='interests')
@@ -40,3 +45,7 @@ class Interest(models.Model):
     
     class Meta:
         unique_together = ('fan', 'concert')
+        indexes = [
+            # últimos intereses (dashboard): ORDER BY created_at DESC LIMIT n
+            models.Index(fields=['-created_at'], name='interest_created_idx'),
+        ]
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters
+from .models import Attendance, Interest
+
+
+@receiver(post_save, sender=Interest)
+def interest_post_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.add_interest(instance.concert_id)
+
+
+@receiver(post_delete, sender=Interest)
+def interest_post_delete(sender, instance, **kwargs):
+    counters.add_interest(instance.concert_id, delta=-1)
+
+
+@receiver(pre_save, sender=Attendance)
+def attendance_pre_save(sender, instance, raw=False, **kwargs):
+    # guardar el estado anterior para aplicar solo la diferencia en post_save
+    instance._counters_old = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._counters_old = Attendance.objects.filter(pk=instance.pk).values('concert_id', 'rating').first()
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_counters_old', None)
+    if old and old['concert_id'] != instance.concert_id:
+        counters.apply_rating(old['concert_id'], old['rating'], None)
+        old = None
+    counters.apply_rating(instance.concert_id, old['rating'] if old else None, instance.rating)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_post_delete(sender, instance, **kwargs):
+    counters.apply_rating(instance.concert_id, instance.rating, None)
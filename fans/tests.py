@@ -1,8 +1,15 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import Fan
-from core.models import City
+from .models import Fan, Interest, Attendance
+from core.models import City, Artist, Venue
+from conciertos.models import Concert
 
 
 class RegisterCreatesUserAndFanTest(TestCase):
@@ -35,3 +42,184 @@ class RegisterCreatesUserAndFanTest(TestCase):
 		self.assertIsNotNone(fan)
 		# Si existe el atributo user en Fan (OneToOne) debe apuntar al user
 		self.assertEqual(fan.user, user)
+
+
+class InterestCounterTest(TestCase):
+	def setUp(self):
+		city = City.objects.create(name='TestCity', country='TestCountry')
+		venue = Venue.objects.create(name='TestVenue', city=city)
+		artist = Artist.objects.create(name='TestArtist', country='TestCountry', genre='Rock')
+		self.concert = Concert.objects.create(artist=artist, venue=venue, start_datetime=timezone.now())
+		self.user = User.objects.create_user('fan', 'fan@example.com', 'complexpassword123')
+		Fan.objects.create(user=self.user, full_name='Fan', email='fan@example.com')
+		self.client.force_login(self.user)
+
+	def test_toggle_interest_maintains_counter(self):
+		url = reverse('toggle_interest', args=[self.concert.pk])
+		data = self.client.post(url).json()
+		self.assertEqual((data['action'], data['count']), ('added', 1))
+		self.concert.refresh_from_db()
+		self.assertEqual(self.concert.interest_count, 1)
+
+		data = self.client.post(url).json()
+		self.assertEqual((data['action'], data['count']), ('removed', 0))
+		count = self.client.get(reverse('interest_count', args=[self.concert.pk])).json()['count']
+		self.assertEqual(count, 0)
+
+	def test_rebuild_command_repairs_counter(self):
+		Interest.objects.create(fan=self.user.fan, concert=self.concert)
+		Concert.objects.filter(pk=self.concert.pk).update(interest_count=7)
+		call_command('rebuild_concert_counters', stdout=StringIO())
+		self.concert.refresh_from_db()
+		self.assertEqual(self.concert.interest_count, 1)
+
+
+class RatingTotalsTest(TestCase):
+	def setUp(self):
+		city = City.objects.create(name='TestCity', country='TestCountry')
+		venue = Venue.objects.create(name='TestVenue', city=city)
+		artist = Artist.objects.create(name='TestArtist', country='TestCountry', genre='Rock')
+		self.concert = Concert.objects.create(artist=artist, venue=venue, start_datetime=timezone.now(), status='completed')
+		self.user = User.objects.create_user('fan', 'fan@example.com', 'complexpassword123')
+		Fan.objects.create(user=self.user, full_name='Fan', email='fan@example.com')
+		other = Fan.objects.create(full_name='Otro', email='otro@example.com')
+		Attendance.objects.create(fan=other, concert=self.concert, rating=4)
+		self.client.force_login(self.user)
+
+	def test_rate_concert_applies_delta(self):
+		url = reverse('rate_concert', args=[self.concert.pk])
+		data = self.client.post(url, {'rating': 8}).json()
+		self.assertEqual((data['avg'], data['count']), (6, 2))
+		# cambiar la calificación ajusta la suma sin sumar otra asistencia
+		data = self.client.post(url, {'rating': 10}).json()
+		self.assertEqual((data['avg'], data['count']), (7, 2))
+		self.concert.refresh_from_db()
+		self.assertEqual((self.concert.rating_sum, self.concert.rating_count), (14, 2))
+
+		self.user.fan.attendances.all().delete()
+		self.concert.refresh_from_db()
+		self.assertEqual(self.concert.avg_rating, 4)
+
+
+class InterestCountsBatchTest(TestCase):
+	def setUp(self):
+		city = City.objects.create(name='TestCity', country='TestCountry')
+		venue = Venue.objects.create(name='TestVenue', city=city)
+		artist = Artist.objects.create(name='TestArtist', country='TestCountry', genre='Rock')
+		self.concerts = [
+			Concert.objects.create(artist=artist, venue=venue, start_datetime=timezone.now())
+			for _ in range(3)
+		]
+		fan = Fan.objects.create(full_name='Fan', email='fan@example.com')
+		Interest.objects.create(fan=fan, concert=self.concerts[0])
+
+	def test_batch_counts_and_not_modified(self):
+		url = reverse('interest_counts')
+		ids = ','.join(str(c.pk) for c in self.concerts)
+		with self.assertNumQueries(1):
+			data = self.client.get(url, {'ids': ids}).json()
+		self.assertEqual(data['counts'][str(self.concerts[0].pk)], 1)
+		self.assertEqual(data['counts'][str(self.concerts[1].pk)], 0)
+
+		resp = self.client.get(url, {'ids': ids, 'since': data['version']})
+		self.assertEqual(resp.status_code, 304)
+		self.assertEqual(self.client.get(url, {'ids': 'x'}).status_code, 400)
+
+
+class LiveUpdatesHubTest(TestCase):
+	def test_hub_delivers_only_subscribed_concerts(self):
+		import asyncio
+		from .live import Hub
+
+		async def scenario():
+			hub = Hub()
+			async with hub.subscribe({1, 2}) as sub:
+				hub.dispatch({'concert_id': 3, 'interest_count': 9})
+				hub.dispatch({'concert_id': 2, 'interest_count': 5})
+				event = await asyncio.wait_for(sub.get(), timeout=1)
+			hub.dispatch({'concert_id': 2, 'interest_count': 6})
+			return event, hub._by_concert
+
+		event, remaining = asyncio.run(scenario())
+		self.assertEqual(event, {'concert_id': 2, 'interest_count': 5})
+		self.assertEqual(remaining, {})
+
+	def test_file_backend_rotates_without_losing_events(self):
+		import asyncio
+		import os
+		import tempfile
+		from .live import FileBackend
+
+		class Collector:
+			def __init__(self):
+				self.events = []
+
+			def dispatch(self, event):
+				self.events.append(event['n'])
+
+		async def scenario(path):
+			hub = Collector()
+			backend = FileBackend(hub, path=path, poll_interval=0.01, max_bytes=200)
+			backend.publish({'concert_id': 1, 'n': -1})  # anterior al lector: no se entrega
+			backend.start()
+			await asyncio.sleep(0.05)
+			for n in range(30):
+				backend.publish({'concert_id': 1, 'n': n})
+				if n % 3 == 0:
+					await asyncio.sleep(0.03)
+			await asyncio.sleep(0.1)
+			backend._task.cancel()
+			return hub.events
+
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, 'spool.jsonl')
+			events = asyncio.run(scenario(path))
+			self.assertEqual(events, list(range(30)))
+			self.assertLessEqual(os.path.getsize(path), 200 + 40)
+			self.assertTrue(os.path.exists(path + '.1'))
+
+	def test_stream_disabled_without_setting(self):
+		resp = self.client.get(reverse('concert_stream'), {'ids': '1'})
+		self.assertEqual(resp.status_code, 404)
+
+
+class ListQueryCountTest(TestCase):
+	"""Las listas de fans y puntuaciones hacen el mismo número de consultas con 10 o 500 filas."""
+
+	def setUp(self):
+		self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+		self.city = City.objects.create(name='Bogotá', country='Colombia')
+
+	def seed(self, n):
+		start = Fan.objects.count()
+		artists = Artist.objects.bulk_create([
+			Artist(name=f'Artista {i}', country='Colombia', genre='Rock') for i in range(start, n)
+		])
+		venues = Venue.objects.bulk_create([Venue(name=f'Venue {i}', city=self.city) for i in range(start, n)])
+		concerts = Concert.objects.bulk_create([
+			Concert(artist=a, venue=v, start_datetime=timezone.now()) for a, v in zip(artists, venues)
+		])
+		fans = Fan.objects.bulk_create([
+			Fan(full_name=f'Fan {i}', email=f'fan{i}@example.com', city=self.city) for i in range(start, n)
+		])
+		Attendance.objects.bulk_create([
+			Attendance(fan=f, concert=c, rating=5) for f, c in zip(fans, concerts)
+		])
+
+	def count_queries(self, url):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def assertConstantQueries(self, url):
+		self.seed(10)
+		small = self.count_queries(url)
+		self.seed(500)
+		self.assertEqual(self.count_queries(url), small)
+
+	def test_fan_list(self):
+		self.assertConstantQueries(reverse('fan_list'))
+
+	def test_attendance_list(self):
+		self.assertConstantQueries(reverse('attendance_list'))
@@ -18,5 +18,7 @@ urlpatterns = [
     # AJAX endpoints for toggling interest and getting counts
     path('concert/<int:concert_id>/toggle_interest/', views.toggle_interest, name='toggle_interest'),
     path('concert/<int:concert_id>/interest_count/', views.interest_count, name='interest_count'),
+    path('concerts/interest_counts/', views.interest_counts, name='interest_counts'),
+    path('concerts/stream/', views.concert_stream, name='concert_stream'),
     path('concert/<int:concert_id>/rate/', views.rate_concert, name='rate_concert'),
 ]
\ No newline at end of file
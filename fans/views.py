@@ -1,3 +1,7 @@
+import asyncio
+import hashlib
+import json
+
 from django.shortcuts import render, redirect
 from django.views.generic import ListView, CreateView
 from django.urls import reverse_lazy
@@ -6,36 +10,36 @@ from django.contrib.auth import login
 from .forms import UserRegisterForm, FanProfileForm
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
-from django.db.models import Q
-from django.db import transaction
+from django.db import transaction, IntegrityError
 from django import forms
 from core.models import City
-from django.http import JsonResponse
+from core import metrics
+from core.pagination import KeysetPaginationMixin
+from search import engine as search_engine
+from django.http import JsonResponse, Http404, HttpResponseNotModified, StreamingHttpResponse
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib.admin.views.decorators import staff_member_required
 from conciertos.models import Concert
 from .models import Interest
+from . import live
 # Create your views here.
 
 # ----- FAN -----
 @method_decorator(staff_member_required, name='dispatch')
-class FanListView(ListView):
+class FanListView(KeysetPaginationMixin, ListView):
     model = Fan
     template_name = 'fans/fan_list.html'
     context_object_name = 'fans'
-    qeryset = Fan.objects.all().order_by('full_name')
+    queryset = Fan.objects.select_related('city').order_by('full_name')
+    keyset_fields = ('full_name', 'id')
     
-    def get_queryset(self):
-        qs = super().get_queryset()
+    def get_search_ranking(self):
+        # Buscar por nombre o ciudad en el índice de búsqueda (ordenado por relevancia)
         q = self.request.GET.get('query_fans', '').strip()
-        if q:
-            # Buscar por nombre o ciudad (case-insensitive)
-            qs = qs.filter(
-                Q(full_name__icontains=q) | Q(city__name__icontains=q)
-            ).order_by('full_name')
-        return qs
+        return search_engine.query('fan', q) if q else None
 
 class FanCreateView(CreateView):
     model = Fan
@@ -45,10 +49,15 @@ class FanCreateView(CreateView):
     
 
 # ----- ATTENDANCE -----
-class AttendanceListView(ListView):
+class AttendanceListView(KeysetPaginationMixin, ListView):
     model = Attendance
     template_name = 'fans/attendance_list.html'
     context_object_name = 'attendances'
+    paginate_by = 50
+    # Attendance -> Concert.__str__ sigue artist y venue; traerlos en el mismo JOIN
+    queryset = Attendance.objects.select_related('fan', 'concert__artist', 'concert__venue')
+    # más recientes primero
+    keyset_fields = ('-id',)
 
 class AttendanceCreateView(CreateView):
     model = Attendance
@@ -61,6 +70,7 @@ class InterestListView(ListView):
     model = Interest
     template_name = 'fans/interest_list.html'
     context_object_name = 'interests'
+    queryset = Interest.objects.select_related('fan', 'concert__artist', 'concert__venue')
 
 class InterestCreateView(CreateView):
     model = Interest
@@ -164,26 +174,111 @@ def toggle_interest(request, concert_id):
     except Exception:
         return JsonResponse({'status': 'error', 'detail': 'Fan profile not found'}, status=400)
 
-    concert = get_object_or_404(Concert, pk=concert_id)
+    concert = get_object_or_404(Concert.objects.only('pk'), pk=concert_id)
 
-    existing = Interest.objects.filter(fan=fan, concert=concert).first()
-    if existing:
-        existing.delete()
-        action = 'removed'
-    else:
-        Interest.objects.create(fan=fan, concert=concert)
-        action = 'added'
+    # El Interest y el contador Concert.interest_count (F() desde fans/signals.py)
+    # se escriben en la misma transacción; no se vuelve a contar la tabla Interest.
+    with transaction.atomic():
+        deleted, _ = Interest.objects.filter(fan=fan, concert=concert).delete()
+        if deleted:
+            action = 'removed'
+        else:
+            try:
+                with transaction.atomic():
+                    Interest.objects.create(fan=fan, concert=concert)
+            except IntegrityError:
+                # doble clic concurrente: el otro request ya lo creó
+                pass
+            action = 'added'
+        count = Concert.objects.values_list('interest_count', flat=True).get(pk=concert.pk)
+        transaction.on_commit(lambda: live.publish_concert(concert.pk, interest_count=count))
 
-    count = Interest.objects.filter(concert=concert).count()
     return JsonResponse({'status': 'ok', 'action': action, 'count': count})
 
 
 def interest_count(request, concert_id):
-    concert = get_object_or_404(Concert, pk=concert_id)
-    count = Interest.objects.filter(concert=concert).count()
+    count = Concert.objects.filter(pk=concert_id).values_list('interest_count', flat=True).first()
+    if count is None:
+        raise Http404('Concierto no encontrado')
     return JsonResponse({'status': 'ok', 'count': count})
 
 
+# máximo de conciertos por petición y segundos que se reutiliza una respuesta en caché
+INTEREST_COUNTS_MAX_IDS = 200
+INTEREST_COUNTS_CACHE_SECONDS = 2
+
+
+def interest_counts(request):
+    """Conteos de interés de varios conciertos en una sola consulta.
+
+    GET ?ids=1,2,3[&since=<version>]. Devuelve {'status':'ok','version': str, 'counts': {id: n}}
+    o 304 si `since` (o If-None-Match) coincide con la versión actual.
+    """
+    try:
+        ids = sorted({int(i) for i in request.GET.get('ids', '').split(',') if i.strip()})
+    except ValueError:
+        return JsonResponse({'status': 'error', 'detail': 'ids inválidos'}, status=400)
+    if len(ids) > INTEREST_COUNTS_MAX_IDS:
+        return JsonResponse({'status': 'error', 'detail': f'máximo {INTEREST_COUNTS_MAX_IDS} conciertos'}, status=400)
+
+    key_ids = ','.join(map(str, ids))
+    cache_key = 'interest_counts:' + hashlib.md5(key_ids.encode()).hexdigest()
+    payload = cache.get(cache_key)
+    metrics.record_cache('interest_counts', hit=payload is not None)
+    if payload is None:
+        counts = dict(Concert.objects.filter(pk__in=ids).values_list('pk', 'interest_count'))
+        version = hashlib.md5(json.dumps(sorted(counts.items())).encode()).hexdigest()[:16]
+        payload = {'version': version, 'counts': {str(pk): n for pk, n in counts.items()}}
+        cache.set(cache_key, payload, INTEREST_COUNTS_CACHE_SECONDS)
+
+    etag = f'"{payload["version"]}"'
+    since = request.GET.get('since') or request.headers.get('If-None-Match', '').strip('"')
+    if since == payload['version']:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'status': 'ok', **payload})
+    response['ETag'] = etag
+    response['Cache-Control'] = f'max-age={INTEREST_COUNTS_CACHE_SECONDS}'
+    return response
+
+
+# segundos entre comentarios keep-alive en el stream
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+async def concert_stream(request):
+    """Stream SSE con los cambios de interés/calificación de los conciertos `?ids=1,2,3`.
+
+    Requiere servir la app con encoreanalytics.asgi y settings.LIVE_UPDATES = True.
+    """
+    if not live.is_enabled():
+        return JsonResponse({'status': 'error', 'detail': 'Live updates disabled'}, status=404)
+    try:
+        ids = {int(i) for i in request.GET.get('ids', '').split(',') if i.strip()}
+    except ValueError:
+        return JsonResponse({'status': 'error', 'detail': 'ids inválidos'}, status=400)
+    if not ids or len(ids) > INTEREST_COUNTS_MAX_IDS:
+        return JsonResponse({'status': 'error', 'detail': f'entre 1 y {INTEREST_COUNTS_MAX_IDS} conciertos'}, status=400)
+
+    async def events():
+        backend = live.get_backend()
+        backend.start()
+        yield 'retry: 5000\n\n'
+        async with live.hub.subscribe(ids) as sub:
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield live.format_event(event)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def rate_concert(request, concert_id):
     """AJAX endpoint para puntuar un concierto finalizado. Espera POST con 'rating' (1-10).
@@ -199,28 +294,30 @@ def rate_concert(request, concert_id):
     except Exception:
         return JsonResponse({'status': 'error', 'detail': 'Fan profile not found'}, status=400)
 
-    concert = get_object_or_404(Concert, pk=concert_id)
-    # only allow rating for completed concerts
-    if concert.status != 'completed':
-        return JsonResponse({'status': 'error', 'detail': 'Sólo se pueden puntuar conciertos finalizados.'}, status=400)
+    # Bloquear la fila del concierto para que raters concurrentes se serialicen:
+    # la signal de Attendance aplica solo el delta (nuevo - anterior) a rating_sum/rating_count.
+    with transaction.atomic():
+        concert = get_object_or_404(Concert.objects.select_for_update().only('pk', 'status'), pk=concert_id)
+        # only allow rating for completed concerts
+        if concert.status != 'completed':
+            return JsonResponse({'status': 'error', 'detail': 'Sólo se pueden puntuar conciertos finalizados.'}, status=400)
 
-    rating = request.POST.get('rating')
-    try:
-        rating_int = int(rating)
-        if rating_int < 1 or rating_int > 10:
-            raise ValueError()
-    except Exception:
-        return JsonResponse({'status': 'error', 'detail': 'Valor de puntuación inválido.'}, status=400)
-
-    # create or update Attendance
-    att, created = Attendance.objects.get_or_create(fan=fan, concert=concert)
-    att.rating = rating_int
-    att.save()
-
-    # compute new aggregate
-    from django.db.models import Avg, Count
-    agg = Attendance.objects.filter(concert=concert, rating__isnull=False).aggregate(avg=Avg('rating'), count=Count('pk'))
-    avg = agg['avg'] or 0
-    count = agg['count'] or 0
+        rating = request.POST.get('rating')
+        try:
+            rating_int = int(rating)
+            if rating_int < 1 or rating_int > 10:
+                raise ValueError()
+        except Exception:
+            return JsonResponse({'status': 'error', 'detail': 'Valor de puntuación inválido.'}, status=400)
+
+        # create or update Attendance
+        att, created = Attendance.objects.get_or_create(fan=fan, concert=concert, defaults={'rating': rating_int})
+        if not created and att.rating != rating_int:
+            att.rating = rating_int
+            att.save(update_fields=['rating'])
+
+        rating_sum, count = Concert.objects.values_list('rating_sum', 'rating_count').get(pk=concert.pk)
+        avg = rating_sum / count if count else 0
+        transaction.on_commit(lambda: live.publish_concert(concert.pk, avg_rating=avg, rating_count=count))
 
     return JsonResponse({'status': 'ok', 'rating': rating_int, 'avg': avg, 'count': count})
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        # mantener los documentos de búsqueda sincronizados al guardar/borrar
+        from . import signals  # noqa: F401
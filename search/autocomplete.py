@@ -0,0 +1,285 @@
+"""
+Índice en memoria por prefijo para /api/autocomplete/<entidad>/.
+
+Por cada entidad de core/choices.py (artista, ciudad, venue, gira, canción) se
+guarda una lista ordenada de claves (texto, pk): el nombre normalizado con
+search.documents.normalize (sin acentos, en minúsculas) desde cada una de sus
+palabras, para que "stones" encuentre "The Rolling Stones". Una consulta es
+un bisect al inicio y otro al final del rango del prefijo; de ese rango salen
+los `limit` más populares (conciertos del artista, venue, gira o ciudad;
+veces que se tocó la canción). El top de los prefijos con muchas
+coincidencias (los de una letra, ya al construir) se guarda hasta que cambia
+una fila que empieza por ese prefijo.
+
+Cada proceso construye el índice de una entidad la primera vez que se
+consulta. Los signals de search/signals.py lo actualizan al confirmar la
+transacción; las escrituras de otros procesos y los cambios de popularidad
+llegan al reconstruirlo, cuando tiene más de AUTOCOMPLETE_MAX_AGE segundos
+(también las cargas de import_concerts y generate_dataset, que corren en su
+propio proceso). Los caminos masivos dentro de la aplicación, sin signals,
+deben llamar a `refresh()`.
+
+Las consultas leen el índice sin bloqueos. Cada cambio es un delta sobre el
+mismo índice (insort de sus claves y caducidad de los tops afectados) bajo
+el cerrojo de escritura de ese índice; una lectura simultánea puede no ver
+todavía la fila, pero nunca devuelve una que no empiece por el prefijo. La
+reconstrucción por antigüedad corre en un hilo aparte mientras las consultas
+siguen usando el índice viejo; los cambios que llegan entretanto se vuelven a
+aplicar sobre el nuevo antes de publicarlo.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
+
+from core.choices import SOURCES, source_queryset
+from .documents import normalize
+
+# expresión de popularidad de cada entidad (los rollups de analytics donde existen)
+POPULARITY = {
+    'artist': lambda: F('stats__concert_count'),
+    'city': lambda: F('concert_stats__concert_count'),
+    'venue': lambda: Count('concerts'),
+    'tour': lambda: Count('concerts'),
+    'song': lambda: F('play_stats__play_count'),
+}
+
+# por encima de estas coincidencias se guarda el top del prefijo
+_MEMO_MIN = 256
+# mayor que cualquier carácter de un texto normalizado ([0-9a-z ])
+_END = '\uffff'
+
+logger = logging.getLogger(__name__)
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def _max_age():
+    return getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 300)
+
+
+def _limit():
+    return getattr(settings, 'AUTOCOMPLETE_LIMIT', 20)
+
+
+def _keys(name):
+    words = normalize(name).split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class PrefixIndex:
+    def __init__(self, entity):
+        self.entity = entity
+        self.built_at = time.monotonic()
+        # [(clave, pk)] ordenada
+        self.keys = []
+        # pk -> (etiqueta, popularidad, nombre normalizado)
+        self.items = {}
+        self.memo = {}
+        # serializa los cambios y las escrituras en `memo`; las búsquedas no lo toman
+        self.write_lock = threading.RLock()
+        self.version = 0
+
+    def load(self):
+        name = SOURCES[self.entity][2]
+        qs = source_queryset(self.entity).annotate(popularity=Coalesce(POPULARITY[self.entity](), Value(0)))
+        keys = []
+        for obj in qs.iterator(chunk_size=2000):
+            value = getattr(obj, name)
+            self.items[obj.pk] = (str(obj), obj.popularity, normalize(value))
+            keys.extend((key, obj.pk) for key in _keys(value))
+        keys.sort()
+        self.keys = keys
+        # los prefijos de una letra son los de rangos más largos: su top se calcula ya
+        for first in sorted({key[0] for key, _ in keys}):
+            self.search(first, _limit())
+        return self
+
+    def _discard(self, pk):
+        item = self.items.pop(pk, None)
+        if item is None:
+            return None
+        for key in _keys(item[2]):
+            i = bisect.bisect_left(self.keys, (key, pk))
+            if i < len(self.keys) and self.keys[i] == (key, pk):
+                del self.keys[i]
+        return item
+
+    def update(self, objects):
+        name = SOURCES[self.entity][2]
+        with self.write_lock:
+            self.version += 1
+            for obj in objects:
+                old = self._discard(obj.pk)
+                # la popularidad se conserva hasta la siguiente reconstrucción
+                value = getattr(obj, name)
+                self.items[obj.pk] = (str(obj), old[1] if old else 0, normalize(value))
+                for key in _keys(value):
+                    bisect.insort(self.keys, (key, obj.pk))
+                self._forget(value, old)
+
+    def remove(self, pks):
+        with self.write_lock:
+            self.version += 1
+            for pk in pks:
+                self._forget('', self._discard(pk))
+
+    def _forget(self, value, old):
+        # solo caduca el top de los prefijos que el cambio puede alterar
+        keys = _keys(value) | (_keys(old[2]) if old else set())
+        for memo_key in [m for m in self.memo if any(key.startswith(m[0]) for key in keys)]:
+            del self.memo[memo_key]
+
+    def _range(self, prefix):
+        return bisect.bisect_left(self.keys, (prefix,)), bisect.bisect_left(self.keys, (prefix + _END,))
+
+    def search(self, prefix, limit):
+        """[(pk, etiqueta)] de los `limit` más populares cuyo nombre tiene una palabra que empieza por `prefix`."""
+        memo = self.memo.get((prefix, limit))
+        if memo is not None:
+            return memo
+        version = self.version
+        lo, hi = self._range(prefix)
+        # con un cambio a la vez el rango puede haberse desplazado: se revisa la clave
+        items = {}
+        for key, pk in self.keys[lo:hi]:
+            item = self.items.get(pk)
+            if item is not None and key.startswith(prefix):
+                items[pk] = item
+        top = heapq.nsmallest(limit, items, key=lambda pk: (-items[pk][1], items[pk][2], pk))
+        result = [(pk, items[pk][0]) for pk in top]
+        if hi - lo >= _MEMO_MIN:
+            with self.write_lock:
+                # un top calculado mientras cambiaba el índice no se guarda
+                if self.version == version:
+                    self.memo[(prefix, limit)] = result
+        return result
+
+
+
+class _Slot:
+    """Índice publicado de una entidad y estado de su reconstrucción."""
+
+    def __init__(self, entity):
+        self.entity = entity
+        # solo protege `index` y `pending`
+        self.lock = threading.Lock()
+        # lo tiene el hilo que construye el índice
+        self.build_lock = threading.Lock()
+        self.index = None
+        # pks cambiados durante una construcción (None si no hay ninguna en curso)
+        self.pending = None
+
+    def build(self):
+        """Construye el índice y lo publica con los cambios llegados mientras tanto (con build_lock)."""
+        with self.lock:
+            self.pending = set()
+        try:
+            index = PrefixIndex(self.entity).load()
+            while True:
+                with self.lock:
+                    pks, self.pending = self.pending, set()
+                    if not pks:
+                        self.index, self.pending = index, None
+                        return index
+                _reload(index, pks)
+        except BaseException:
+            with self.lock:
+                self.pending = None
+            raise
+
+    def rebuild(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception('No se pudo reconstruir el índice de autocompletado de %s', self.entity)
+        finally:
+            self.build_lock.release()
+            connection.close()
+
+
+def _slot(entity):
+    slot = _slots.get(entity)
+    if slot is None:
+        with _slots_lock:
+            slot = _slots.setdefault(entity, _Slot(entity))
+    return slot
+
+
+def _spawn(target):
+    threading.Thread(target=target, name='autocomplete-rebuild', daemon=True).start()
+
+
+def _index(entity):
+    slot = _slot(entity)
+    index = slot.index
+    if index is None:
+        # la primera vez se espera a la construcción (una sola aunque lleguen varias consultas)
+        with slot.build_lock:
+            return slot.index or slot.build()
+    if time.monotonic() - index.built_at > _max_age() and slot.build_lock.acquire(blocking=False):
+        # se sigue sirviendo el índice viejo mientras otro hilo lo reconstruye
+        _spawn(slot.rebuild)
+    return index
+
+
+def _reload(index, pks):
+    # leer y aplicar con el cerrojo: dos recargas de la misma fila no se adelantan
+    with index.write_lock:
+        objects = list(source_queryset(index.entity).filter(pk__in=pks))
+        index.remove(set(pks) - {obj.pk for obj in objects})
+        index.update(objects)
+
+
+def _published(entity, pks):
+    """Índice de `entity` al que aplicar un cambio de `pks`, o None.
+
+    None si este proceso no lo tiene o si hay una construcción en curso, que
+    recarga esas filas antes de publicar el índice nuevo.
+    """
+    slot = _slots.get(entity)
+    if slot is None:
+        return None
+    with slot.lock:
+        if slot.pending is not None:
+            slot.pending.update(pks)
+            return None
+        return slot.index
+
+
+def query(entity, text, limit=None):
+    """[{'id', 'label'}] de `entity` para el texto escrito, de más a menos popular."""
+    prefix = normalize(text)
+    if not prefix:
+        return []
+    limit = limit or _limit()
+    return [{'id': pk, 'label': label} for pk, label in _index(entity).search(prefix, limit)]
+
+
+def refresh(entity, pks):
+    """Recarga del origen las filas `pks` en el índice de `entity`, si este proceso lo tiene."""
+    pks = set(pks)
+    index = _published(entity, pks)
+    if index is not None:
+        _reload(index, pks)
+
+
+def remove(entity, pks):
+    pks = set(pks)
+    index = _published(entity, pks)
+    if index is not None:
+        index.remove(pks)
+
+
+def reset(*entities):
+    """Descarta los índices (todos si no se indica); se reconstruyen en la siguiente consulta."""
+    with _slots_lock:
+        for entity in entities or list(_slots):
+            _slots.pop(entity, None)
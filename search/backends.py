@@ -0,0 +1,165 @@
+"""
+Backends de consulta sobre SearchDocument.
+
+- PostgresBackend: cada término debe tener similitud de palabra con
+  `document` (operador `%>` de pg_trgm, con el umbral SEARCH_WORD_SIMILARITY,
+  servido por el índice GIN gin_trgm_ops); los resultados se ordenan por la
+  similitud de palabra de la consulta completa.
+- InvertedIndexBackend: índice invertido en memoria (término -> ids) para SQLite
+  y los tests. Se construye perezosamente desde SearchDocument y se actualiza
+  desde los signals del mismo proceso, así que solo es fiable con un único
+  proceso escribiendo (desarrollo/tests). Los candidatos se verifican contra
+  SearchDocument antes de devolverlos, de modo que una escritura revertida
+  (rollback) no deja resultados fantasma.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .documents import tokenize
+from .models import SearchDocument
+
+
+class PostgresBackend:
+    def search(self, entity, text, limit):
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models import F, Value
+
+        terms = tokenize(text)
+        if not terms:
+            return []
+        qs = SearchDocument.objects.filter(entity=entity)
+        for term in terms:
+            # document %> term: word_similarity(term, document) >= umbral
+            qs = qs.filter(TrigramWordSimilar(F('document'), Value(term)))
+        qs = qs.annotate(rank=TrigramWordSimilarity(' '.join(terms), 'document'))
+        with transaction.atomic():
+            # SET LOCAL: el umbral dura lo que la transacción
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                    [str(getattr(settings, 'SEARCH_WORD_SIMILARITY', 0.6))],
+                )
+            return list(qs.order_by('-rank', 'object_id').values_list('object_id', flat=True)[:limit])
+
+    def update(self, entity, object_id, document):
+        pass
+
+    def remove(self, entity, object_ids):
+        pass
+
+    def reset(self):
+        pass
+
+
+class InvertedIndexBackend:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        # entidad -> término -> set(ids)
+        self._postings = defaultdict(lambda: defaultdict(set))
+        # entidad -> lista ordenada de términos (para búsqueda por prefijo con bisect)
+        self._terms = defaultdict(list)
+        # entidad -> id -> términos del documento (para borrar y desempatar por longitud)
+        self._docs = defaultdict(dict)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for entity, object_id, document in SearchDocument.objects.values_list('entity', 'object_id', 'document').iterator():
+                self._add(entity, object_id, document)
+            self._loaded = True
+
+    def _add(self, entity, object_id, document):
+        tokens = set(document.split())
+        postings = self._postings[entity]
+        terms = self._terms[entity]
+        for token in tokens:
+            if token not in postings:
+                bisect.insort(terms, token)
+            postings[token].add(object_id)
+        self._docs[entity][object_id] = tokens
+
+    def _discard(self, entity, object_id):
+        tokens = self._docs[entity].pop(object_id, None)
+        if tokens is None:
+            return
+        postings = self._postings[entity]
+        terms = self._terms[entity]
+        for token in tokens:
+            ids = postings[token]
+            ids.discard(object_id)
+            if not ids:
+                del postings[token]
+                terms.pop(bisect.bisect_left(terms, token))
+
+    def _matches(self, entity, term):
+        """ids cuyo documento tiene un término que empieza por `term`, con su puntuación."""
+        terms = self._terms[entity]
+        postings = self._postings[entity]
+        scores = {}
+        i = bisect.bisect_left(terms, term)
+        while i < len(terms) and terms[i].startswith(term):
+            # coincidencia exacta pesa más que un prefijo
+            weight = 2 if terms[i] == term else 1
+            for object_id in postings[terms[i]]:
+                if scores.get(object_id, 0) < weight:
+                    scores[object_id] = weight
+            i += 1
+        return scores
+
+    def search(self, entity, text, limit):
+        terms = tokenize(text)
+        if not terms:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            totals = None
+            for term in terms:
+                scores = self._matches(entity, term)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {pk: totals[pk] + s for pk, s in scores.items() if pk in totals}
+                if not totals:
+                    return []
+            docs = self._docs[entity]
+            ranked = sorted(totals, key=lambda pk: (-totals[pk], len(docs.get(pk, ())), pk))[:limit]
+        # descartar ids cuyo documento real ya no contiene los términos
+        current = dict(
+            SearchDocument.objects.filter(entity=entity, object_id__in=ranked).values_list('object_id', 'document')
+        )
+        return [pk for pk in ranked if pk in current and self._contains_all(current[pk], terms)]
+
+    @staticmethod
+    def _contains_all(document, terms):
+        tokens = document.split()
+        return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+    def update(self, entity, object_id, document):
+        if not self._loaded:
+            return
+        with self._lock:
+            self._discard(entity, object_id)
+            self._add(entity, object_id, document)
+
+    def remove(self, entity, object_ids):
+        if not self._loaded:
+            return
+        with self._lock:
+            for object_id in object_ids:
+                self._discard(entity, object_id)
+
+    def reset(self):
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._docs.clear()
+            self._loaded = False
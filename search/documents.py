@@ -0,0 +1,72 @@
+"""
+Definición de los documentos de búsqueda por entidad y su normalización.
+
+Cada entidad indica su modelo, cómo cargarlo sin N+1 y qué texto se indexa.
+"""
+import re
+import unicodedata
+
+from django.apps import apps
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """Quita acentos, pasa a minúsculas y deja solo palabras separadas por un espacio."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(' ', text.casefold()).strip()
+
+
+def tokenize(text):
+    return normalize(text).split()
+
+
+def _concert_text(concert):
+    city = concert.venue.city
+    return [concert.artist.name, concert.venue.name, city.name, city.country]
+
+
+def _tour_text(tour):
+    return [tour.name, tour.artist.name]
+
+
+def _artist_text(artist):
+    return [artist.name, artist.country, artist.genre]
+
+
+def _fan_text(fan):
+    return [fan.full_name, fan.city.name if fan.city else '']
+
+
+# entidad -> (modelo 'app.Model', select_related, función de texto)
+ENTITIES = {
+    'concert': ('conciertos.Concert', ('artist', 'venue__city'), _concert_text),
+    'tour': ('conciertos.Tour', ('artist',), _tour_text),
+    'artist': ('core.Artist', (), _artist_text),
+    'fan': ('fans.Fan', ('city',), _fan_text),
+}
+
+
+def get_model(entity):
+    return apps.get_model(ENTITIES[entity][0])
+
+
+def entity_for_model(model):
+    label = model._meta.label
+    for entity, (model_label, _, _) in ENTITIES.items():
+        if model_label == label:
+            return entity
+    return None
+
+
+def source_queryset(entity):
+    _, related, _ = ENTITIES[entity]
+    qs = get_model(entity)._default_manager.all()
+    return qs.select_related(*related) if related else qs
+
+
+def build_document(entity, obj):
+    return normalize(' '.join(part for part in ENTITIES[entity][2](obj) if part))
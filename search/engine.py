@@ -0,0 +1,90 @@
+"""
+API del subsistema de búsqueda.
+
+    from search import engine
+    ids = engine.query('concert', 'bogota rock')   # ids ordenados por relevancia
+
+El backend se elige con settings.SEARCH_BACKEND ('postgres', 'inverted' o
+'auto', que usa PostgreSQL cuando la base de datos lo es).
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import documents
+from .backends import InvertedIndexBackend, PostgresBackend
+from .models import SearchDocument
+
+_backends = {}
+
+
+def result_limit():
+    """Número máximo de resultados que devuelve una búsqueda (SEARCH_RESULT_LIMIT)."""
+    return getattr(settings, 'SEARCH_RESULT_LIMIT', 1000)
+
+
+def get_backend():
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'postgres' if connection.vendor == 'postgresql' else 'inverted'
+    if name not in _backends:
+        _backends[name] = PostgresBackend() if name == 'postgres' else InvertedIndexBackend()
+    return _backends[name]
+
+
+def query(entity, text, limit=None):
+    """Devuelve los ids de `entity` que coinciden con `text`, del más al menos relevante.
+
+    Como mucho `limit` (result_limit() por defecto): si se devuelven tantos,
+    puede haber más coincidencias.
+    """
+    return get_backend().search(entity, text, limit or result_limit())
+
+
+def index_objects(entity, objects):
+    """Crea o actualiza el documento de búsqueda de cada objeto."""
+    docs = [
+        SearchDocument(entity=entity, object_id=obj.pk, document=documents.build_document(entity, obj))
+        for obj in objects
+    ]
+    if not docs:
+        return 0
+    SearchDocument.objects.bulk_create(
+        docs, batch_size=1000,
+        update_conflicts=True, unique_fields=['entity', 'object_id'], update_fields=['document'],
+    )
+    backend = get_backend()
+    for doc in docs:
+        backend.update(entity, doc.object_id, doc.document)
+    return len(docs)
+
+
+def index_queryset(entity, queryset=None, chunk_size=2000):
+    """Indexa un queryset de la entidad por lotes (con los select_related necesarios)."""
+    qs = documents.source_queryset(entity)
+    if queryset is not None:
+        qs = qs.filter(pk__in=queryset.values('pk'))
+    total = 0
+    batch = []
+    for obj in qs.iterator(chunk_size=chunk_size):
+        batch.append(obj)
+        if len(batch) >= chunk_size:
+            total += index_objects(entity, batch)
+            batch = []
+    return total + index_objects(entity, batch)
+
+
+def remove_objects(entity, object_ids):
+    object_ids = list(object_ids)
+    SearchDocument.objects.filter(entity=entity, object_id__in=object_ids).delete()
+    get_backend().remove(entity, object_ids)
+
+
+def rebuild():
+    """Regenera todos los documentos de búsqueda desde las tablas fuente."""
+    totals = {}
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for entity in documents.ENTITIES:
+            totals[entity] = index_queryset(entity)
+    get_backend().reset()
+    return totals
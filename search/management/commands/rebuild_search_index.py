@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from search import engine
+
+
+class Command(BaseCommand):
+    help = 'Regenera los documentos de búsqueda de conciertos, giras, artistas y fans.'
+
+    def handle(self, *args, **options):
+        totals = engine.rebuild()
+        for entity, count in totals.items():
+            self.stdout.write(f'{entity}: {count} documentos')
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda regenerado.'))
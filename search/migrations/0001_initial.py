@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+from search.documents import normalize
+
+
+def create_trigram_index(apps, schema_editor):
+    # índice GIN de trigramas solo en PostgreSQL; en SQLite se usa el índice invertido en memoria
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS search_document_trgm_idx '
+        'ON search_searchdocument USING gin (document gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_document_trgm_idx')
+
+
+def populate_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    sources = {
+        'concert': (
+            apps.get_model('conciertos', 'Concert').objects.select_related('artist', 'venue__city'),
+            lambda c: [c.artist.name, c.venue.name, c.venue.city.name, c.venue.city.country],
+        ),
+        'tour': (
+            apps.get_model('conciertos', 'Tour').objects.select_related('artist'),
+            lambda t: [t.name, t.artist.name],
+        ),
+        'artist': (
+            apps.get_model('core', 'Artist').objects.all(),
+            lambda a: [a.name, a.country, a.genre],
+        ),
+        'fan': (
+            apps.get_model('fans', 'Fan').objects.select_related('city'),
+            lambda f: [f.full_name, f.city.name if f.city else ''],
+        ),
+    }
+    for entity, (qs, text) in sources.items():
+        batch = []
+        for obj in qs.iterator(chunk_size=2000):
+            batch.append(SearchDocument(
+                entity=entity, object_id=obj.pk,
+                document=normalize(' '.join(p for p in text(obj) if p)),
+            ))
+            if len(batch) >= 2000:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('conciertos', '0007_concert_rating_totals'),
+        ('core', '0002_alter_artist_debut_year_alter_artist_genre'),
+        ('fans', '0004_fan_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('document', models.TextField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('entity', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
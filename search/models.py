@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """Texto normalizado (sin acentos, en minúsculas) por el que se busca una entidad.
+
+    Se mantiene desde search/signals.py. En PostgreSQL la columna `document` lleva
+    un índice GIN con gin_trgm_ops (ver la migración inicial).
+    """
+    entity = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    document = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['entity', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity}:{self.object_id}"
@@ -0,0 +1,127 @@
+"""
+Sincroniza SearchDocument con las entidades buscables.
+
+Además del propio objeto se reindexan los documentos que copian texto de él:
+renombrar un artista, venue o ciudad actualiza sus conciertos, giras y fans.
+Solo cuando cambia alguno de los campos que copia cada documento (comparando
+con los valores cargados o con `update_fields`); los dependientes, que pueden
+ser miles, se reindexan por lotes al confirmar la transacción.
+
+También mantienen el índice de autocompletado de este proceso
+(search/autocomplete.py), una vez confirmada la transacción.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from conciertos.models import Concert, Song, Tour
+from core.models import Artist, City, Venue
+from fans.models import Fan
+from . import autocomplete, documents, engine
+
+AUTOCOMPLETE_ENTITIES = {Artist: 'artist', City: 'city', Venue: 'venue', Tour: 'tour', Song: 'song'}
+
+
+# modelo -> {entidad: campos del modelo que copia su documento}
+INDEXED_FIELDS = {
+    Artist: {'artist': ('name', 'country', 'genre'), 'concert': ('name',), 'tour': ('name',)},
+    Venue: {'concert': ('name', 'city_id')},
+    City: {'concert': ('name', 'country'), 'fan': ('name',)},
+    Concert: {'concert': ('artist_id', 'venue_id')},
+    Tour: {'tour': ('name', 'artist_id')},
+    Fan: {'fan': ('full_name', 'city_id')},
+}
+
+# (modelo, entidad dependiente) -> documentos que copian texto de la fila `pk`
+DEPENDENTS = {
+    (Artist, 'concert'): lambda pk: Concert.objects.filter(artist_id=pk),
+    (Artist, 'tour'): lambda pk: Tour.objects.filter(artist_id=pk),
+    (Venue, 'concert'): lambda pk: Concert.objects.filter(venue_id=pk),
+    (City, 'concert'): lambda pk: Concert.objects.filter(venue__city_id=pk),
+    (City, 'fan'): lambda pk: Fan.objects.filter(city_id=pk),
+}
+
+_UNKNOWN = object()
+
+
+def _tracked(sender):
+    return {field for fields in INDEXED_FIELDS[sender].values() for field in fields}
+
+
+def _remember(instance):
+    # un campo diferido no está en __dict__: cuenta como cambiado
+    instance._search_loaded = {field: instance.__dict__.get(field, _UNKNOWN) for field in _tracked(type(instance))}
+
+
+def _changed(instance, fields, update_fields):
+    if update_fields is not None:
+        saved = set(update_fields)
+        return any(field in saved or field.removesuffix('_id') in saved for field in fields)
+    loaded = getattr(instance, '_search_loaded', {})
+    return any(loaded.get(field, _UNKNOWN) != getattr(instance, field) for field in fields)
+
+
+@receiver(post_init, sender=Concert)
+@receiver(post_init, sender=Tour)
+@receiver(post_init, sender=Artist)
+@receiver(post_init, sender=Fan)
+@receiver(post_init, sender=Venue)
+@receiver(post_init, sender=City)
+def remember_indexed_fields(sender, instance, **kwargs):
+    _remember(instance)
+
+
+@receiver(post_save, sender=Concert)
+@receiver(post_save, sender=Tour)
+@receiver(post_save, sender=Artist)
+@receiver(post_save, sender=Fan)
+@receiver(post_save, sender=Venue)
+@receiver(post_save, sender=City)
+def index_on_save(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    own = documents.entity_for_model(sender)
+    for entity, fields in INDEXED_FIELDS[sender].items():
+        if entity == own:
+            if created or _changed(instance, fields, update_fields):
+                engine.index_queryset(entity, sender.objects.filter(pk=instance.pk))
+        elif not created and _changed(instance, fields, update_fields):
+            dependents = DEPENDENTS[(sender, entity)](instance.pk)
+            transaction.on_commit(lambda entity=entity, dependents=dependents: engine.index_queryset(entity, dependents))
+    _remember(instance)
+
+
+@receiver(post_delete, sender=Concert)
+@receiver(post_delete, sender=Tour)
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=Fan)
+def remove_on_delete(sender, instance, **kwargs):
+    entity = {Concert: 'concert', Tour: 'tour', Artist: 'artist', Fan: 'fan'}[sender]
+    engine.remove_objects(entity, [instance.pk])
+
+
+@receiver(post_save, sender=Artist)
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Venue)
+@receiver(post_save, sender=Tour)
+@receiver(post_save, sender=Song)
+def autocomplete_on_save(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.refresh(AUTOCOMPLETE_ENTITIES[sender], [pk]))
+    # etiquetas que copian el nombre: "Gira - Artista" y "Venue (Ciudad)"
+    if sender is Artist and not created:
+        transaction.on_commit(lambda: autocomplete.refresh('tour', Tour.objects.filter(artist_id=pk).values_list('pk', flat=True)))
+    if sender is City and not created:
+        transaction.on_commit(lambda: autocomplete.refresh('venue', Venue.objects.filter(city_id=pk).values_list('pk', flat=True)))
+
+
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=City)
+@receiver(post_delete, sender=Venue)
+@receiver(post_delete, sender=Tour)
+@receiver(post_delete, sender=Song)
+def autocomplete_on_delete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.remove(AUTOCOMPLETE_ENTITIES[sender], [pk]))
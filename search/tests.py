@@ -0,0 +1,162 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from analytics.models import ArtistStats
+from core.models import Artist, City, Venue
+from conciertos.models import Concert
+from . import autocomplete, engine
+from .documents import normalize
+
+
+class SearchIndexTest(TestCase):
+	def setUp(self):
+		engine.get_backend().reset()
+		self.bogota = City.objects.create(name='Bogotá', country='Colombia')
+		self.lima = City.objects.create(name='Lima', country='Perú')
+		self.venue_bog = Venue.objects.create(name='Movistar Arena', city=self.bogota)
+		self.venue_lim = Venue.objects.create(name='Estadio Nacional', city=self.lima)
+		self.shakira = Artist.objects.create(name='Shakira', country='Colombia', genre='Pop')
+		self.soda = Artist.objects.create(name='Soda Stereo', country='Argentina', genre='Rock')
+		self.c1 = Concert.objects.create(artist=self.shakira, venue=self.venue_bog, start_datetime=timezone.now())
+		self.c2 = Concert.objects.create(artist=self.soda, venue=self.venue_lim, start_datetime=timezone.now())
+
+	def test_normalize_folds_accents_and_case(self):
+		self.assertEqual(normalize('  BOGOTÁ, Perú!  '), 'bogota peru')
+
+	def test_query_matches_prefixes_across_fields(self):
+		self.assertEqual(engine.query('concert', 'bogota'), [self.c1.pk])
+		self.assertEqual(engine.query('concert', 'PERU sod'), [self.c2.pk])
+		self.assertEqual(engine.query('concert', 'shakira lima'), [])
+
+	def test_related_rename_reindexes_dependents(self):
+		self.lima.name = 'Cusco'
+		# los dependientes se reindexan al confirmar la transacción
+		with self.captureOnCommitCallbacks(execute=True):
+			self.lima.save()
+		self.assertEqual(engine.query('concert', 'cusco'), [self.c2.pk])
+		self.assertEqual(engine.query('concert', 'lima'), [])
+		self.c2.delete()
+		self.assertEqual(engine.query('concert', 'cusco'), [])
+
+	def test_saves_without_indexed_changes_skip_reindex(self):
+		def documents_written(save):
+			# también las consultas de los callbacks de on_commit
+			with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+				save()
+			return sum(q['sql'].startswith('INSERT INTO "search_searchdocument"') for q in ctx.captured_queries)
+
+		artist = Artist.objects.get(pk=self.shakira.pk)
+		artist.debut_year = 1991
+		self.assertEqual(documents_written(artist.save), 0)
+		self.assertEqual(documents_written(lambda: artist.save(update_fields=['debut_year'])), 0)
+		city = City.objects.get(pk=self.bogota.pk)
+		self.assertEqual(documents_written(city.save), 0)
+		# solo cambia el país: el documento del artista sí, sus conciertos y giras no
+		artist.country = 'Barranquilla'
+		self.assertEqual(documents_written(artist.save), 1)
+		self.assertEqual(engine.query('artist', 'barranquilla'), [artist.pk])
+		# el nombre lo copian también su concierto (la gira no existe: sin escritura)
+		artist.name = 'Shak'
+		self.assertEqual(documents_written(artist.save), 2)
+		self.assertEqual(engine.query('concert', 'shak bogota'), [self.c1.pk])
+
+	def test_exact_term_ranks_before_prefix(self):
+		sod = Artist.objects.create(name='Sod', country='Chile', genre='Rock')
+		self.assertEqual(engine.query('artist', 'sod'), [sod.pk, self.soda.pk])
+
+	def test_concert_list_uses_search(self):
+		resp = self.client.get(reverse('concert_list'), {'query_concerts': 'bogota'})
+		self.assertEqual([c.pk for c in resp.context['concerts']], [self.c1.pk])
+
+
+class AutocompleteTest(TestCase):
+	def setUp(self):
+		autocomplete.reset()
+		self.bjork = Artist.objects.create(name='Björk', country='Islandia', genre='Pop')
+		self.bjorn = Artist.objects.create(name='Björn Again', country='Australia', genre='Pop')
+		self.stones = Artist.objects.create(name='The Rolling Stones', country='Reino Unido', genre='Rock')
+		ArtistStats.objects.update_or_create(artist=self.bjorn, defaults={'concert_count': 10})
+
+	def labels(self, entity, q):
+		return [r['label'] for r in autocomplete.query(entity, q)]
+
+	def test_prefix_is_accent_folded_and_ranked_by_popularity(self):
+		self.assertEqual(self.labels('artist', 'BJO'), ['Björn Again', 'Björk'])
+		self.assertEqual(self.labels('artist', 'bjork'), ['Björk'])
+		# cualquier palabra del nombre, no solo la primera
+		self.assertEqual(self.labels('artist', 'stones'), ['The Rolling Stones'])
+		self.assertEqual(self.labels('artist', 'rolling st'), ['The Rolling Stones'])
+		self.assertEqual(self.labels('artist', '  '), [])
+
+	def test_endpoint_is_served_from_memory(self):
+		url = reverse('autocomplete', args=['artist'])
+		self.client.get(url, {'q': 'b'})
+		with self.assertNumQueries(0):
+			resp = self.client.get(url, {'q': 'bj'})
+		self.assertEqual(resp.json()['results'][0], {'id': self.bjorn.pk, 'label': 'Björn Again'})
+
+	def test_signals_update_index_after_commit(self):
+		self.labels('artist', 'b')
+		self.labels('tour', 'g')
+		with self.captureOnCommitCallbacks(execute=True):
+			bjarni = Artist.objects.create(name='Bjarni', country='Noruega', genre='Folk')
+			bjarni.tours.create(name='Gira del norte')
+		self.assertIn('Bjarni', self.labels('artist', 'bj'))
+		with self.captureOnCommitCallbacks(execute=True):
+			bjarni.name = 'Sigrid'
+			bjarni.save()
+		self.assertNotIn('Bjarni', self.labels('artist', 'bj'))
+		self.assertEqual(self.labels('tour', 'norte'), ['Gira del norte - Sigrid'])
+		with self.captureOnCommitCallbacks(execute=True):
+			bjarni.delete()
+		self.assertEqual(self.labels('artist', 'sig'), [])
+		self.assertEqual(self.labels('tour', 'norte'), [])
+
+	def test_writes_apply_deltas_in_place(self):
+		self.labels('artist', 'b')
+		index = autocomplete._slots['artist'].index
+		keys = index.keys
+		with self.captureOnCommitCallbacks(execute=True):
+			Artist.objects.create(name='Bjarni', country='Noruega', genre='Folk')
+		# el mismo índice y la misma lista, con las claves nuevas en orden
+		self.assertIs(autocomplete._slots['artist'].index, index)
+		self.assertIs(index.keys, keys)
+		self.assertEqual(keys, sorted(keys))
+		self.assertIn('Bjarni', self.labels('artist', 'bj'))
+
+	@override_settings(AUTOCOMPLETE_MAX_AGE=-1)
+	def test_stale_index_is_served_while_rebuilding(self):
+		self.labels('artist', 'b')
+		# cambio sin signals: solo lo recoge la reconstrucción
+		Artist.objects.filter(pk=self.bjork.pk).update(name='Bjarke')
+		with mock.patch.object(autocomplete, '_spawn') as spawn, self.assertNumQueries(0):
+			self.assertIn('Björk', self.labels('artist', 'bj'))
+			self.assertIn('Björk', self.labels('artist', 'bj'))
+		# una sola reconstrucción a la vez
+		self.assertEqual(spawn.call_count, 1)
+		slot = autocomplete._slots['artist']
+		slot.build()
+		slot.build_lock.release()
+		with mock.patch.object(autocomplete, '_spawn'):
+			self.assertEqual(self.labels('artist', 'bja'), ['Bjarke'])
+
+	def test_changes_during_a_rebuild_are_replayed(self):
+		self.labels('artist', 'b')
+		slot = autocomplete._slots['artist']
+		load = autocomplete.PrefixIndex.load
+
+		def load_then_write(index):
+			load(index)
+			# llega un cambio confirmado que la carga ya no vio
+			Artist.objects.filter(pk=self.stones.pk).update(name='Bjørn Stones')
+			autocomplete.refresh('artist', [self.stones.pk])
+			return index
+
+		with mock.patch.object(autocomplete.PrefixIndex, 'load', load_then_write):
+			slot.build()
+		self.assertIn('Bjørn Stones', self.labels('artist', 'bj'))